@@ -1,3 +1,4 @@
+import atexit
 import signal
 import dash
 from dash import dcc, html
@@ -7,92 +8,629 @@ import webbrowser
 from threading import Timer
 import dash_bootstrap_components as dbc
 from dash.exceptions import PreventUpdate
-from datetime import datetime
 import os
-from modules.calculations import (
-    call_price,
-    put_price,
-    call_delta,
-    put_delta,
-    gamma,
-    vega,
-    call_theta,
-    put_theta,
-    call_rho,
-    put_rho,
+import base64
+from modules.calculations import greeks
+from modules.pricing import (
+    FAN_PERCENTILES,
+    confidence_interval,
+    price_from_terminal,
+    simulate_terminal_prices,
+    simulate_terminal_prices_adaptive,
 )
-from modules.simulations import (
-    generate_scenarios,
-    calculate_call_payoffs,
-    calculate_put_payoffs,
-    simulate_scenario,
+from modules.qmc import simulate_qmc_terminal_prices
+from modules.exotics import price_exotic_streaming
+from modules.mc_greeks import GREEK_NAMES, MonteCarloGreeks
+from modules.models import MODELS, describe_model
+from modules.parallel import parallel_simulate_terminal_prices
+from modules.portfolio import Portfolio
+from modules.risk import (
+    HORIZONS,
+    load_historical_shocks,
+    portfolio_risk,
+    simulate_shocks,
+)
+from modules.cache import ResultCache, make_key
+from modules.shared_store import SharedResultStore
+from modules.storage import PathStore
+from modules.jobs import JobManager
+from modules.instrumentation import (
+    RequestProfiler,
+    StageMetrics,
+    register_instrumentation,
 )
 from modules.plots import (
     plot_price_paths,
-    plot_payoff_distribution,
+    plot_payoff_histogram,
+    plot_pnl_histogram,
     plot_greeks,
 )
-import pandas as pd
-from fpdf import FPDF
-import plotly.io as pio
 import socket
 
 app = dash.Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP])
+# WSGI application for production servers (gunicorn app:server)
+server = app.server
+
+# Memory budget (bytes) of the streaming Monte Carlo pricer used by the callbacks
+MEMORY_BUDGET = int(os.environ.get("OPTION_APP_MEMORY_BUDGET", 256 * 2**20))
+# Worker processes used for Monte Carlo pricing (1 keeps pricing in-process)
+NUM_WORKERS = int(os.environ.get("OPTION_APP_WORKERS", 1))
+# Simulation results published to shared memory for the other worker processes of a
+# multi-process server; set OPTION_APP_SHARED_STORE to the index file they share
+SHARED_STORE = (
+    SharedResultStore(
+        os.environ["OPTION_APP_SHARED_STORE"],
+        max_bytes=int(os.environ.get("OPTION_APP_SHARED_BYTES", 1024 * 2**20)),
+    )
+    if os.environ.get("OPTION_APP_SHARED_STORE")
+    else None
+)
+# Simulation results shared by the callbacks, bounded in bytes, optionally on disk too
+RESULT_CACHE = ResultCache(
+    max_bytes=int(os.environ.get("OPTION_APP_CACHE_BYTES", 512 * 2**20)),
+    disk_dir=os.environ.get("OPTION_APP_CACHE_DIR"),
+    shared=SHARED_STORE,
+)
+# Simulated paths stored on disk (memory-mapped) when "store" is ticked in the layout
+PATH_STORE = PathStore(
+    os.environ.get(
+        "OPTION_APP_PATH_STORE",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "stored_paths"),
+    )
+)
+# Background jobs (long simulations, report exports) with their state in SQLite; point
+# OPTION_APP_JOB_DB to a file to share the job table between app processes
+JOBS = JobManager(
+    os.environ.get("OPTION_APP_JOB_DB", ":memory:"),
+    max_workers=int(os.environ.get("OPTION_APP_JOB_WORKERS", 2)),
+)
+# Per-stage timings (and tracemalloc peaks with OPTION_APP_TRACE_MEMORY=1), served on
+# /metrics and, with OPTION_APP_DEBUG_PANEL=1, in a debug panel below the graphs
+METRICS = StageMetrics(trace_memory=os.environ.get("OPTION_APP_TRACE_MEMORY") == "1")
+DEBUG_PANEL = os.environ.get("OPTION_APP_DEBUG_PANEL") == "1"
+PROFILER = register_instrumentation(
+    app.server,
+    METRICS,
+    RequestProfiler(output_dir=os.environ.get("OPTION_APP_PROFILE_DIR")),
+    ignore=("metrics-panel", "profile-report", "simulation-progress", "export-result"),
+)
+# Jointly simulated spot/volatility shocks of the P&L widget, and the CSV of daily
+# historical moves (price_change and volatility_change columns) it can use instead
+RISK_SCENARIOS = int(os.environ.get("OPTION_APP_RISK_SCENARIOS", 100000))
+RISK_RETURNS = os.environ.get("OPTION_APP_RISK_RETURNS")
+
+
+# Log-price bins per time step of the percentile fan bands
+FAN_BINS = 200
+
+# Figures produced by the figure stage: widget value, graph id and stage store
+WIDGET_GRAPHS = {
+    "price_paths": ("price-paths-graph", "simulation-store"),
+    "call_payoff": ("call-payoff-distribution-graph", "pricing-store"),
+    "put_payoff": ("put-payoff-distribution-graph", "pricing-store"),
+    "call_exotic": ("call-exotic-graph", "exotic-store"),
+    "put_exotic": ("put-exotic-graph", "exotic-store"),
+    "call_greeks": ("call-greeks-graph", "greeks-store"),
+    "put_greeks": ("put-greeks-graph", "greeks-store"),
+    "pnl_distribution": ("pnl-distribution-graph", "risk-store"),
+}
+
+# Path-dependent payoffs offered by the exotic widgets
+EXOTIC_LABELS = {
+    "asian_arithmetic": "Asiatique arithmétique",
+    "asian_geometric": "Asiatique géométrique",
+    "barrier": "Barrière",
+    "lookback": "Lookback (strike flottant)",
+}
+BARRIER_LABELS = {
+    "up-and-out": "Up-and-out (désactivante haussière)",
+    "up-and-in": "Up-and-in (activante haussière)",
+    "down-and-out": "Down-and-out (désactivante baissière)",
+    "down-and-in": "Down-and-in (activante baissière)",
+}
+
+# Market shocks offered by the P&L widget
+RISK_SHOCK_LABELS = {
+    "simulated": "Chocs simulés (spot et volatilité corrélés)",
+    "historical": "Chocs historiques (fichier de rendements)",
+}
+
+# Dynamics of the underlying offered for the path stage, with the parameter inputs of
+# each model (input id "<model>-<parameter>")
+MODEL_LABELS = {
+    "gbm": "Black-Scholes (mouvement brownien géométrique)",
+    "heston": "Heston (volatilité stochastique)",
+    "merton": "Merton (diffusion à sauts)",
+}
+MODEL_PARAMETERS = {
+    "heston": {
+        "kappa": "Vitesse de retour à la moyenne de la variance",
+        "theta": "Variance de long terme",
+        "xi": "Volatilité de la variance",
+        "rho": "Corrélation sous-jacent / variance",
+    },
+    "merton": {
+        "intensity": "Fréquence des sauts (par an)",
+        "jump_mean": "Moyenne du log-saut",
+        "jump_std": "Écart type du log-saut",
+    },
+}
+
+
+# Function to describe the model selected in the layout as accepted by
+# models.get_model: None for GBM, else its name and the parameters filled in (an empty
+# input keeps the model default)
+def model_spec(model, params):
+    if model in (None, "gbm"):
+        return None
+    return dict(
+        {name: value for name, value in params.items() if value is not None},
+        name=model,
+    )
+
+
+# Function to collect the inputs of the path stage. Variance reduction, the path
+# store and the model (see model_spec) only apply to the pseudo-random generator, so
+# they are dropped from the QMC parameters. precision (adaptive mode: target standard error and/or relative
+# tolerance, with the strike and control variate they apply to) only applies to
+# pseudo-random runs that are not stored.
+def simulation_params(
+    S0,
+    T,
+    r,
+    sigma,
+    num_simulations,
+    num_steps,
+    generator,
+    variance_reduction,
+    seed,
+    fan=False,
+    store=False,
+    precision=None,
+    model=None,
+):
+    return {
+        "S0": S0,
+        "T": T,
+        "r": r,
+        "sigma": sigma,
+        "num_simulations": num_simulations,
+        "num_steps": num_steps,
+        "generator": generator,
+        "variance_reduction": (
+            sorted(variance_reduction or []) if generator != "qmc" else []
+        ),
+        "seed": seed,
+        "fan": bool(fan),
+        "store": bool(store) and generator != "qmc",
+        "precision": precision if generator != "qmc" and not store else None,
+        "model": model if generator != "qmc" else None,
+    }
+
+
+# Function to simulate the underlying with the generator selected in the layout.
+# Only terminal prices and display paths are kept, so the strike and the control
+# variate can change without a new simulation. Percentile fan bands (fan) are
+# streamed from every simulated path, which then needs full paths. Stored runs
+# (store) keep every path on disk in PATH_STORE and are reused by parameter hash.
+# Adaptive runs (precision) draw up to num_simulations paths, in-process, and stop as
+# soon as the requested precision is reached. model selects the dynamics of the
+# pseudo-random generators (GBM when None).
+@METRICS.timed("simulation")
+def run_simulation(
+    S0,
+    T,
+    r,
+    sigma,
+    num_simulations,
+    num_steps,
+    generator,
+    variance_reduction,
+    seed,
+    fan=False,
+    store=False,
+    precision=None,
+    model=None,
+    progress=None,
+):
+    T_years = T / 12  # Convert months to years
+    fan_bins = FAN_BINS if fan else None
+    if precision:
+        return simulate_terminal_prices_adaptive(
+            S0,
+            precision["K"],
+            r,
+            sigma,
+            T_years,
+            num_steps,
+            precision["target_std_error"],
+            precision["relative_tolerance"],
+            max_simulations=num_simulations,
+            memory_budget=MEMORY_BUDGET,
+            terminal_only=not fan,
+            seed=seed,
+            antithetic="antithetic" in variance_reduction,
+            moment_matching="moment_matching" in variance_reduction,
+            control_variate=(
+                None
+                if precision["control_variate"] == "none"
+                else precision["control_variate"]
+            ),
+            fan_bins=fan_bins,
+            progress=progress,
+            model=model,
+        )
+    if store:
+        key = PATH_STORE.get_or_create(
+            S0,
+            r,
+            sigma,
+            T_years,
+            num_steps,
+            num_simulations,
+            num_workers=NUM_WORKERS,
+            progress=progress,
+            seed=seed,
+            antithetic="antithetic" in variance_reduction,
+            moment_matching="moment_matching" in variance_reduction,
+            model=model,
+        )
+        return PATH_STORE.simulation(key, fan_bins=fan_bins)
+    if generator == "qmc":
+        return simulate_qmc_terminal_prices(
+            S0,
+            r,
+            sigma,
+            T_years,
+            num_steps,
+            num_simulations,
+            MEMORY_BUDGET,
+            seed=seed,
+            fan_bins=fan_bins,
+            progress=progress,
+        )
+    options = {
+        "antithetic": "antithetic" in variance_reduction,
+        "moment_matching": "moment_matching" in variance_reduction,
+        "terminal_only": not fan,
+        "fan_bins": fan_bins,
+        "progress": progress,
+        "model": model,
+    }
+    if NUM_WORKERS > 1:
+        return parallel_simulate_terminal_prices(
+            S0,
+            r,
+            sigma,
+            T_years,
+            num_steps,
+            num_simulations,
+            seed=seed,
+            num_workers=NUM_WORKERS,
+            memory_budget=MEMORY_BUDGET,
+            **options,
+        )
+    return simulate_terminal_prices(
+        S0,
+        r,
+        sigma,
+        T_years,
+        num_steps,
+        num_simulations,
+        MEMORY_BUDGET,
+        seed=seed,
+        **options,
+    )
+
+
+# Path stage: the simulation for the given parameters (seed included), from
+# RESULT_CACHE when this parameter set has been simulated before
+def get_simulation(params, progress=None):
+    return RESULT_CACHE.get_or_compute(
+        make_key(stage="simulation", **params),
+        lambda: run_simulation(**params, progress=progress),
+    )
+
+
+# Background job running the path stage. Progress reports the paths simulated so far
+# and running MC prices for strike K (undiscounted payoff sums of the chunks seen).
+def simulation_job(progress, params, K):
+    discount = np.exp(-params["r"] * params["T"] / 12)
+    sums = {"call": 0.0, "put": 0.0}
+
+    def report(done, total, terminal_chunk):
+        estimate = None
+        if K is not None:
+            sums["call"] += float(np.maximum(terminal_chunk - K, 0).sum())
+            sums["put"] += float(np.maximum(K - terminal_chunk, 0).sum())
+            estimate = {
+                f"{option_type}_price": discount * total_payoff / done
+                for option_type, total_payoff in sums.items()
+            }
+        progress(done, total, estimate)
+
+    progress(0, params["num_simulations"])
+    get_simulation(params, report)
+
+
+# Payoff and price stage: MC prices, standard errors, 95% confidence intervals and
+# payoff histograms of the simulation for strike K and the selected control variate,
+# with Monte Carlo Greeks estimated in the same pass (their estimators assume GBM
+# dynamics, so other models are priced without them)
+def get_pricing(params, K, control_variate):
+    def compute():
+        simulation = get_simulation(params)
+        T_years = params["T"] / 12
+        mc_greeks = None
+        if params["model"] is None:
+            mc_greeks = MonteCarloGreeks(
+                params["S0"],
+                K,
+                params["r"],
+                params["sigma"],
+                T_years,
+                batch_means=simulation["batch_means"],
+            )
+        with METRICS.stage("pricing"):
+            result = price_from_terminal(
+                simulation,
+                params["S0"],
+                K,
+                params["r"],
+                params["sigma"],
+                T_years,
+                None if control_variate == "none" else control_variate,
+                greeks=mc_greeks,
+            )
+            for option_type in ("call", "put"):
+                result[f"{option_type}_ci"] = confidence_interval(
+                    result[f"{option_type}_price"], result[f"{option_type}_std_error"]
+                )
+            result["converged"] = simulation.get("converged")
+            return result
+
+    return RESULT_CACHE.get_or_compute(
+        make_key(stage="pricing", K=K, control_variate=control_variate, **params),
+        compute,
+    )
 
 
-class PDFReport(FPDF):
-    def header(self):
-        self.set_font("Arial", "B", 14)
-        self.cell(0, 10, "Rapport de Simulation d'Options", 0, 1, "C")
-        self.ln(10)
+# Exotic stage: path-dependent call and put prices, Greeks and payoff histograms for
+# strike K, under GBM dynamics whatever the model of the path stage.
+# Payoffs come from running aggregates updated while paths are generated (pseudo-random,
+# with the seed, path count and variance reduction of the path stage), so no path
+# matrix is kept whatever the number of steps.
+def get_exotic(params, K, exotic):
+    def compute():
+        with METRICS.stage("exotic"):
+            return price_exotic_streaming(
+                params["S0"],
+                K,
+                params["r"],
+                params["sigma"],
+                params["T"] / 12,
+                params["num_steps"],
+                params["num_simulations"],
+                exotic["payoff"],
+                exotic["barrier"],
+                exotic["barrier_type"],
+                memory_budget=MEMORY_BUDGET,
+                num_paths_to_display=0,
+                seed=params["seed"],
+                antithetic="antithetic" in params["variance_reduction"],
+                moment_matching="moment_matching" in params["variance_reduction"],
+                greeks=MonteCarloGreeks(
+                    params["S0"],
+                    K,
+                    params["r"],
+                    params["sigma"],
+                    params["T"] / 12,
+                    exotic["payoff"],
+                    exotic["barrier"],
+                    exotic["barrier_type"],
+                    batch_means="moment_matching" in params["variance_reduction"],
+                ),
+            )
+
+    return RESULT_CACHE.get_or_compute(
+        make_key(stage="exotic", K=K, **exotic, **params), compute
+    )
+
 
-    def footer(self):
-        self.set_y(-15)
-        self.set_font("Arial", "I", 8)
-        self.cell(0, 10, f"Page {self.page_no()}", 0, 0, "C")
+# Greeks stage: closed-form Greeks along the first displayed path for strike K
+def get_greeks(params, K):
+    def compute():
+        price_paths = get_simulation(params)["price_paths"]
+        with METRICS.stage("greeks"):
+            return greeks(
+                price_paths[:, 0], K, params["T"] / 12, params["r"], params["sigma"]
+            )
+
+    return RESULT_CACHE.get_or_compute(make_key(stage="greeks", K=K, **params), compute)
 
-    def chapter_title(self, title):
-        self.set_font("Arial", "B", 12)
-        self.set_fill_color(200, 220, 255)
-        self.cell(0, 10, title, 0, 1, "L", 1)
-        self.ln(5)
 
-    def chapter_body(self, body):
-        self.set_font("Arial", "", 12)
-        self.multi_cell(0, 10, body)
-        self.ln()
+# Risk stage: VaR, expected shortfall, per-position ES contributions and P&L histogram
+# at each horizon of HORIZONS for the call and the put priced on the page (one of
+# each at strike K), by full Black-Scholes revaluation over RISK_SCENARIOS simulated
+# spot/volatility shocks (spot volatility sigma, seed of the path stage) or over the
+# historical moves of RISK_RETURNS
+def get_risk(params, K, risk):
+    def compute():
+        portfolio = Portfolio(
+            [True, False],
+            params["S0"],
+            K,
+            params["T"] / 12,
+            params["r"],
+            params["sigma"],
+        )
+        results = {}
+        with METRICS.stage("risk"):
+            for horizon_days in HORIZONS:
+                if risk["shocks"] == "historical":
+                    shocks = load_historical_shocks(RISK_RETURNS, horizon_days)
+                else:
+                    shocks = simulate_shocks(
+                        RISK_SCENARIOS,
+                        horizon_days,
+                        params["sigma"],
+                        seed=params["seed"],
+                    )
+                results[horizon_days] = portfolio_risk(
+                    portfolio,
+                    *shocks,
+                    risk["confidence"],
+                    horizon_days,
+                    MEMORY_BUDGET,
+                    bins=50,
+                )
+        return results
 
-    def add_graph(self, image_path, title):
-        self.chapter_title(title)
-        self.image(image_path, w=170)
-        self.ln()
+    return RESULT_CACHE.get_or_compute(
+        make_key(stage="risk", K=K, **risk, **params), compute
+    )
+
+
+# Function to build the figure of a widget from the stage data it depends on
+def build_figure(widget, stage):
+    # Stage inputs come from the cache (or are computed and timed on their own)
+    if widget == "price_paths":
+        get_simulation(stage["params"])
+    elif widget in ("call_payoff", "put_payoff"):
+        get_pricing(stage["params"], stage["K"], stage["control_variate"])
+    elif widget in ("call_exotic", "put_exotic"):
+        get_exotic(stage["params"], stage["K"], stage["exotic"])
+    elif widget == "pnl_distribution":
+        get_risk(stage["params"], stage["K"], stage["risk"])
+    else:
+        get_greeks(stage["params"], stage["K"])
+    with METRICS.stage(f"figure:{widget}"):
+        return _build_figure(widget, stage)
+
+
+def _build_figure(widget, stage):
+    if widget == "price_paths":
+        simulation = get_simulation(stage["params"])
+        fan = simulation["path_fan"]
+        return plot_price_paths(
+            simulation["price_paths"],
+            bands=None if fan is None else fan.percentiles(FAN_PERCENTILES),
+            percentiles=FAN_PERCENTILES,
+        )
+    if widget in ("call_payoff", "put_payoff"):
+        option_type = widget.split("_")[0]
+        pricing = get_pricing(stage["params"], stage["K"], stage["control_variate"])
+        return plot_payoff_histogram(*pricing[f"{option_type}_histogram"], option_type)
+    if widget in ("call_exotic", "put_exotic"):
+        option_type = widget.split("_")[0]
+        exotic = get_exotic(stage["params"], stage["K"], stage["exotic"])
+        label = EXOTIC_LABELS[stage["exotic"]["payoff"]]
+        if stage["exotic"]["payoff"] == "barrier":
+            label = (
+                f"{BARRIER_LABELS[stage['exotic']['barrier_type']]} "
+                f"{stage['exotic']['barrier']}"
+            )
+        if stage["params"]["model"] is not None:
+            label += " (dynamique GBM)"
+        return plot_payoff_histogram(
+            *exotic[f"{option_type}_histogram"],
+            option_type,
+            title=(
+                f"{option_type.capitalize()} {label}: prix Monte Carlo "
+                f"{exotic[f'{option_type}_price']:.4f} "
+                f"(erreur standard {exotic[f'{option_type}_std_error']:.4f})<br>"
+                + ", ".join(
+                    f"{greek.capitalize()} {exotic[f'{option_type}_{greek}']:.4f} "
+                    f"± {exotic[f'{option_type}_{greek}_std_error']:.4f}"
+                    for greek in GREEK_NAMES
+                )
+            ),
+        )
+    if widget == "pnl_distribution":
+        risk = get_risk(stage["params"], stage["K"], stage["risk"])
+        labels = {horizon_days: f"{horizon_days} j" for horizon_days in HORIZONS}
+        return plot_pnl_histogram(
+            {labels[days]: risk[days]["histogram"] for days in HORIZONS},
+            {labels[days]: risk[days]["var"] for days in HORIZONS},
+            title=(
+                f"P&L d'un call et d'un put (K = {stage['K']}), "
+                f"VaR / ES à {stage['risk']['confidence']:.2%}<br>"
+                + "; ".join(
+                    f"{labels[days]} ({risk[days]['num_scenarios']} scénarios): "
+                    f"VaR {risk[days]['var']:.2f}, "
+                    f"ES {risk[days]['es']:.2f} "
+                    f"(call {risk[days]['contributions'][0]:.2f}, "
+                    f"put {risk[days]['contributions'][1]:.2f})"
+                    for days in HORIZONS
+                )
+            ),
+        )
+    option_type = widget.split("_")[0]
+    spot_greeks = get_greeks(stage["params"], stage["K"])
+    return plot_greeks(
+        get_simulation(stage["params"])["price_paths"],
+        {
+            "Delta": spot_greeks[f"{option_type}_delta"],
+            "Gamma": spot_greeks["gamma"],
+            "Vega": spot_greeks["vega"],
+            "Theta": spot_greeks[f"{option_type}_theta"],
+            "Rho": spot_greeks[f"{option_type}_rho"],
+        },
+        option_type,
+    )
 
 
-def generate_pdf_report(simulation_data, graphs):
-    pdf = PDFReport()
-    pdf.add_page()
+# Function to build the optional debug panel: rolling stage percentiles refreshed
+# every few seconds and a single-request cProfile capture
+def debug_panel():
+    return dbc.Container(
+        [
+            html.H3("Instrumentation", className="text-center mt-4"),
+            dcc.Interval(id="metrics-interval", interval=3000),
+            html.Pre(id="metrics-panel"),
+            dbc.Button(
+                "Profiler la prochaine requête",
+                id="profile-button",
+                color="secondary",
+                className="mb-2",
+            ),
+            html.Pre(id="profile-report"),
+        ]
+    )
 
-    # Title page
-    pdf.set_font("Arial", "B", 16)
-    pdf.cell(0, 10, "", 0, 1, "C")
-    pdf.ln(10)
-    pdf.set_font("Arial", "", 12)
-    pdf.cell(0, 10, f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", 0, 1, "C")
-    pdf.ln(20)
 
-    # Summary
-    pdf.chapter_title("Résumé de la Simulation")
-    for key, value in simulation_data.items():
-        pdf.chapter_body(f"{key}: {value}")
+# Function to format the metrics summary as a fixed-width table
+def format_metrics(summary):
+    lines = [
+        f"{'Étape':60s} {'n':>6s} {'p50 ms':>9s} {'p90 ms':>9s} {'p99 ms':>9s} "
+        f"{'pic Mo':>8s}"
+    ]
+    for name, stage in summary.items():
+        peak = stage.get("peak_memory_max")
+        lines.append(
+            f"{name[:60]:60s} {stage['count']:6d} {stage['p50'] * 1e3:9.1f} "
+            f"{stage['p90'] * 1e3:9.1f} {stage['p99'] * 1e3:9.1f} "
+            f"{'' if peak is None else f'{peak / 2**20:8.1f}':>8s}"
+        )
+    return "\n".join(lines)
 
-    # Add graphs
-    for title, image_path in graphs.items():
-        if os.path.exists(image_path):
-            pdf.add_graph(image_path, title)
 
-    pdf_output = "rapport_simulation.pdf"
-    pdf.output(pdf_output)
-    return pdf_output
+# Function to list the runs of PATH_STORE as dropdown options, labelled by the start
+# of their parameter hash and their parameters
+def stored_run_options():
+    options = []
+    for run in PATH_STORE.list_runs():
+        params = run["params"]
+        options.append(
+            {
+                "label": f"{run['key'][:10]} · S0={params['S0']} σ={params['sigma']} "
+                f"T={round(params['T'] * 12, 10)} mois "
+                f"N={params['num_simulations']} pas={params['num_steps']} "
+                f"graine={run['seed']}",
+                "value": run["key"],
+            }
+        )
+    return options
 
 
 def serve_layout():
@@ -122,14 +660,23 @@ def serve_layout():
                                                 "Prix initial de l'actif sous-jacent"
                                             ),
                                             dbc.Input(
-                                                id="S0", type="number", value=100
+                                                debounce=True,
+                                                id="S0",
+                                                type="number",
+                                                value=100,
                                             ),
                                             dbc.Label("Prix d'exercice"),
-                                            dbc.Input(id="K", type="number", value=100),
+                                            dbc.Input(
+                                                debounce=True,
+                                                id="K",
+                                                type="number",
+                                                value=100,
+                                            ),
                                             dbc.Label(
                                                 "Temps jusqu'à l'échéance (en mois)"
                                             ),
                                             dbc.Input(
+                                                debounce=True,
                                                 id="T",
                                                 type="number",
                                                 value=12,
@@ -138,24 +685,178 @@ def serve_layout():
                                             ),
                                             dbc.Label("Taux d'intérêt sans risque"),
                                             dbc.Input(
-                                                id="r", type="number", value=0.05
+                                                debounce=True,
+                                                id="r",
+                                                type="number",
+                                                value=0.05,
                                             ),
                                             dbc.Label("Volatilité"),
                                             dbc.Input(
-                                                id="sigma", type="number", value=0.2
+                                                debounce=True,
+                                                id="sigma",
+                                                type="number",
+                                                value=0.2,
                                             ),
                                             dbc.Label(
                                                 "Nombre de simulations Monte Carlo"
                                             ),
                                             dbc.Input(
+                                                debounce=True,
                                                 id="num_simulations",
                                                 type="number",
                                                 value=10000,
                                                 step=1000,
                                             ),
+                                            dcc.Checklist(
+                                                id="adaptive",
+                                                options=[
+                                                    {
+                                                        "label": "Précision adaptative (le nombre de simulations devient un maximum)",
+                                                        "value": "adaptive",
+                                                    },
+                                                ],
+                                                value=[],
+                                                labelStyle={"display": "block"},
+                                            ),
+                                            dbc.Label("Erreur standard cible"),
+                                            dbc.Input(
+                                                debounce=True,
+                                                id="target-std-error",
+                                                type="number",
+                                                value=0.01,
+                                                min=0,
+                                            ),
+                                            dbc.Label(
+                                                "Tolérance relative (demi-largeur de l'IC à 95 %)"
+                                            ),
+                                            dbc.Input(
+                                                debounce=True,
+                                                id="relative-tolerance",
+                                                type="number",
+                                                min=0,
+                                            ),
                                             dbc.Label("Nombre de pas de temps"),
                                             dbc.Input(
-                                                id="num_steps", type="number", value=252
+                                                debounce=True,
+                                                id="num_steps",
+                                                type="number",
+                                                value=252,
+                                            ),
+                                            dbc.Label("Graine aléatoire"),
+                                            dbc.Input(
+                                                debounce=True,
+                                                id="seed",
+                                                type="number",
+                                                value=42,
+                                            ),
+                                            dbc.Label("Réduction de variance"),
+                                            dcc.Checklist(
+                                                id="variance-reduction",
+                                                options=[
+                                                    {
+                                                        "label": "Variables antithétiques",
+                                                        "value": "antithetic",
+                                                    },
+                                                    {
+                                                        "label": "Appariement des moments",
+                                                        "value": "moment_matching",
+                                                    },
+                                                ],
+                                                value=[],
+                                                labelStyle={"display": "block"},
+                                            ),
+                                            dbc.Label("Variable de contrôle"),
+                                            dcc.Dropdown(
+                                                id="control-variate",
+                                                options=[
+                                                    {
+                                                        "label": "Aucune",
+                                                        "value": "none",
+                                                    },
+                                                    {
+                                                        "label": "Spot terminal actualisé",
+                                                        "value": "spot",
+                                                    },
+                                                ],
+                                                value="none",
+                                                clearable=False,
+                                            ),
+                                            dbc.Label("Modèle du sous-jacent"),
+                                            dcc.Dropdown(
+                                                id="model",
+                                                options=[
+                                                    {"label": label, "value": value}
+                                                    for value, label in MODEL_LABELS.items()
+                                                ],
+                                                value="gbm",
+                                                clearable=False,
+                                            ),
+                                            *[
+                                                html.Div(
+                                                    [
+                                                        component
+                                                        for name, label in parameters.items()
+                                                        for component in (
+                                                            dbc.Label(label),
+                                                            dbc.Input(
+                                                                debounce=True,
+                                                                id=f"{model}-{name}",
+                                                                type="number",
+                                                                value=MODELS[
+                                                                    model
+                                                                ]().params()[name],
+                                                            ),
+                                                        )
+                                                    ],
+                                                    id=f"{model}-params",
+                                                    style={"display": "none"},
+                                                )
+                                                for model, parameters in MODEL_PARAMETERS.items()
+                                            ],
+                                            dbc.Label("Générateur"),
+                                            dcc.Dropdown(
+                                                id="generator",
+                                                options=[
+                                                    {
+                                                        "label": "Monte Carlo",
+                                                        "value": "mc",
+                                                    },
+                                                    {
+                                                        "label": "Quasi-Monte Carlo (Sobol)",
+                                                        "value": "qmc",
+                                                    },
+                                                ],
+                                                value="mc",
+                                                clearable=False,
+                                            ),
+                                            dcc.Checklist(
+                                                id="path-fan",
+                                                options=[
+                                                    {
+                                                        "label": "Bandes de percentiles (toutes les trajectoires)",
+                                                        "value": "fan",
+                                                    },
+                                                ],
+                                                value=[],
+                                                labelStyle={"display": "block"},
+                                                className="mt-2",
+                                            ),
+                                            dcc.Checklist(
+                                                id="path-store",
+                                                options=[
+                                                    {
+                                                        "label": "Enregistrer les trajectoires sur disque",
+                                                        "value": "store",
+                                                    },
+                                                ],
+                                                value=[],
+                                                labelStyle={"display": "block"},
+                                            ),
+                                            dbc.Label("Simulations enregistrées"),
+                                            dcc.Dropdown(
+                                                id="stored-runs",
+                                                options=stored_run_options(),
+                                                placeholder="Recharger une simulation",
                                             ),
                                         ]
                                     ),
@@ -175,6 +876,14 @@ def serve_layout():
                                                 "label": "Distribution des Payoffs (Put)",
                                                 "value": "put_payoff",
                                             },
+                                            {
+                                                "label": "Option Exotique (Call)",
+                                                "value": "call_exotic",
+                                            },
+                                            {
+                                                "label": "Option Exotique (Put)",
+                                                "value": "put_exotic",
+                                            },
                                             {
                                                 "label": "Greeks (Call)",
                                                 "value": "call_greeks",
@@ -183,6 +892,10 @@ def serve_layout():
                                                 "label": "Greeks (Put)",
                                                 "value": "put_greeks",
                                             },
+                                            {
+                                                "label": "Distribution des P&L (VaR / ES)",
+                                                "value": "pnl_distribution",
+                                            },
                                         ],
                                         value=[
                                             "price_paths",
@@ -190,19 +903,90 @@ def serve_layout():
                                             "put_payoff",
                                             "call_greeks",
                                             "put_greeks",
+                                            "pnl_distribution",
                                         ],
                                         labelStyle={"display": "block"},
                                     ),
+                                    dbc.Label("Option exotique"),
+                                    dcc.Dropdown(
+                                        id="exotic-payoff",
+                                        options=[
+                                            {"label": label, "value": value}
+                                            for value, label in EXOTIC_LABELS.items()
+                                        ],
+                                        value="asian_arithmetic",
+                                        clearable=False,
+                                    ),
+                                    dbc.Label("Type de barrière"),
+                                    dcc.Dropdown(
+                                        id="barrier-type",
+                                        options=[
+                                            {"label": label, "value": value}
+                                            for value, label in BARRIER_LABELS.items()
+                                        ],
+                                        value="up-and-out",
+                                        clearable=False,
+                                    ),
+                                    dbc.Label("Niveau de barrière"),
+                                    dbc.Input(
+                                        debounce=True,
+                                        id="barrier",
+                                        type="number",
+                                        value=120,
+                                    ),
+                                    dbc.Label("Niveau de confiance (VaR / ES)"),
+                                    dbc.Input(
+                                        debounce=True,
+                                        id="risk-confidence",
+                                        type="number",
+                                        value=0.99,
+                                        min=0.5,
+                                        max=0.9999,
+                                        step=0.0001,
+                                    ),
+                                    dbc.Label("Chocs de marché"),
+                                    dcc.Dropdown(
+                                        id="risk-shocks",
+                                        options=[
+                                            {
+                                                "label": label,
+                                                "value": value,
+                                                # Historical shocks need a returns file
+                                                "disabled": value == "historical"
+                                                and RISK_RETURNS is None,
+                                            }
+                                            for value, label in RISK_SHOCK_LABELS.items()
+                                        ],
+                                        value="simulated",
+                                        clearable=False,
+                                    ),
                                 ],
                                 width=4,
                             ),
                             dbc.Col(
                                 [
+                                    dbc.Progress(
+                                        id="simulation-progress",
+                                        value=0,
+                                        striped=True,
+                                        className="mb-1",
+                                    ),
+                                    html.Div(id="simulation-status"),
+                                    dbc.Button(
+                                        "Annuler la simulation",
+                                        id="cancel-simulation",
+                                        color="warning",
+                                        size="sm",
+                                        className="mb-2",
+                                    ),
                                     dcc.Graph(id="price-paths-graph"),
                                     dcc.Graph(id="call-payoff-distribution-graph"),
                                     dcc.Graph(id="put-payoff-distribution-graph"),
+                                    dcc.Graph(id="call-exotic-graph"),
+                                    dcc.Graph(id="put-exotic-graph"),
                                     dcc.Graph(id="call-greeks-graph"),
                                     dcc.Graph(id="put-greeks-graph"),
+                                    dcc.Graph(id="pnl-distribution-graph"),
                                     html.Div(id="simulation-results"),
                                     dbc.Button(
                                         "Exporter Rapport",
@@ -211,6 +995,28 @@ def serve_layout():
                                         className="mt-4",
                                     ),
                                     html.Div(id="export-result"),
+                                    dcc.Download(id="export-download"),
+                                    dcc.Store(id="simulation-job"),
+                                    dcc.Store(id="export-job"),
+                                    dcc.Interval(
+                                        id="simulation-interval",
+                                        interval=500,
+                                        disabled=True,
+                                    ),
+                                    dcc.Interval(
+                                        id="export-interval",
+                                        interval=500,
+                                        disabled=True,
+                                    ),
+                                    dcc.Store(id="simulation-store"),
+                                    dcc.Store(id="pricing-store"),
+                                    dcc.Store(id="greeks-store"),
+                                    dcc.Store(id="exotic-store"),
+                                    dcc.Store(id="risk-store"),
+                                ]
+                                + [
+                                    dcc.Store(id=f"{graph_id}-rendered")
+                                    for graph_id, _ in WIDGET_GRAPHS.values()
                                 ],
                                 width=8,
                             ),
@@ -219,6 +1025,7 @@ def serve_layout():
                 ]
             )
         ]
+        + ([debug_panel()] if DEBUG_PANEL else [])
     )
 
 
@@ -226,154 +1033,573 @@ app.layout = serve_layout
 
 
 @app.callback(
+    Output("simulation-job", "data"),
+    Input("S0", "value"),
+    Input("T", "value"),
+    Input("r", "value"),
+    Input("sigma", "value"),
+    Input("num_simulations", "value"),
+    Input("num_steps", "value"),
+    Input("generator", "value"),
+    Input("variance-reduction", "value"),
+    Input("seed", "value"),
+    Input("path-fan", "value"),
+    Input("path-store", "value"),
+    Input("adaptive", "value"),
+    Input("target-std-error", "value"),
+    Input("relative-tolerance", "value"),
+    Input("K", "value"),
+    Input("control-variate", "value"),
+    Input("model", "value"),
+    Input("heston-kappa", "value"),
+    Input("heston-theta", "value"),
+    Input("heston-xi", "value"),
+    Input("heston-rho", "value"),
+    Input("merton-intensity", "value"),
+    Input("merton-jump_mean", "value"),
+    Input("merton-jump_std", "value"),
+    State("simulation-job", "data"),
+)
+def update_simulation(
+    S0,
+    T,
+    r,
+    sigma,
+    num_simulations,
+    num_steps,
+    generator,
+    variance_reduction,
+    seed,
+    path_fan,
+    path_store,
+    adaptive,
+    target_std_error,
+    relative_tolerance,
+    K,
+    control_variate,
+    model,
+    heston_kappa,
+    heston_theta,
+    heston_xi,
+    heston_rho,
+    merton_intensity,
+    merton_jump_mean,
+    merton_jump_std,
+    previous_job,
+):
+    if None in (S0, T, r, sigma, num_simulations, num_steps):
+        raise PreventUpdate
+    precision = None
+    if "adaptive" in (adaptive or []) and (target_std_error or relative_tolerance):
+        precision = {
+            "target_std_error": target_std_error or None,
+            "relative_tolerance": relative_tolerance or None,
+            "K": K,
+            "control_variate": control_variate,
+        }
+    # The strike and control variate only change the simulation of adaptive runs
+    triggered = dash.callback_context.triggered_id
+    if precision is None and triggered in ("K", "control-variate"):
+        raise PreventUpdate
+    params = simulation_params(
+        S0,
+        T,
+        r,
+        sigma,
+        num_simulations,
+        num_steps,
+        generator,
+        variance_reduction,
+        seed,
+        "fan" in (path_fan or []),
+        "store" in (path_store or []),
+        precision,
+        model_spec(
+            model,
+            {
+                "heston": {
+                    "kappa": heston_kappa,
+                    "theta": heston_theta,
+                    "xi": heston_xi,
+                    "rho": heston_rho,
+                },
+                "merton": {
+                    "intensity": merton_intensity,
+                    "jump_mean": merton_jump_mean,
+                    "jump_std": merton_jump_std,
+                },
+            }.get(model, {}),
+        ),
+    )
+    key = make_key(stage="simulation", **params)
+    # A simulation still running for earlier inputs is no longer needed
+    if previous_job and previous_job["id"] and previous_job["key"] != key:
+        JOBS.cancel(previous_job["id"])
+    job_id = None
+    if key not in RESULT_CACHE:
+        job_id = JOBS.submit("simulation", key, simulation_job, params, K)
+    return {"id": job_id, "params": params, "key": key}
+
+
+# Function to describe a running simulation job: progress bar value and label and a
+# status line with the running MC prices
+def simulation_progress(job):
+    percent = 100 * job["done"] / job["total"] if job["total"] else 0
+    label = f"{job['done']:,} / {job['total']:,} trajectoires".replace(",", " ")
+    status = "Simulation en cours…"
+    if job["estimate"]:
+        status = (
+            f"Simulation en cours: Call ≈ {job['estimate']['call_price']:.4f}, "
+            f"Put ≈ {job['estimate']['put_price']:.4f}"
+        )
+    return percent, label, status
+
+
+# The simulation store is published once the simulation job is done; until then the
+# job is polled for its progress. The cancel button stops the running job.
+@app.callback(
+    Output("simulation-store", "data"),
+    Output("simulation-interval", "disabled"),
+    Output("simulation-progress", "value"),
+    Output("simulation-progress", "label"),
+    Output("simulation-status", "children"),
+    Input("simulation-job", "data"),
+    Input("simulation-interval", "n_intervals"),
+    Input("cancel-simulation", "n_clicks"),
+)
+def poll_simulation_job(simulation_job_data, n_intervals, cancel_clicks):
+    if simulation_job_data is None:
+        raise PreventUpdate
+    stage = {
+        "params": simulation_job_data["params"],
+        "key": simulation_job_data["key"],
+    }
+    job_id = simulation_job_data["id"]
+    if job_id is None:
+        return stage, True, 100, "", ""
+    if dash.callback_context.triggered_id == "cancel-simulation":
+        JOBS.cancel(job_id)
+    job = JOBS.get(job_id)
+    if job is None or job["status"] == "done":
+        return stage, True, 100, "", ""
+    if job["status"] == "failed":
+        return dash.no_update, True, 0, "", f"Échec de la simulation: {job['error']}"
+    if job["status"] == "cancelled" or job["cancel_requested"]:
+        return dash.no_update, True, 0, "", "Simulation annulée"
+    return (dash.no_update, False) + simulation_progress(job)
+
+
+@app.callback(
+    Output("stored-runs", "options"),
+    Input("simulation-store", "data"),
+)
+def update_stored_runs(simulation):
+    if simulation is None or not simulation["params"]["store"]:
+        raise PreventUpdate
+    return stored_run_options()
+
+
+# Selecting a stored run fills in its parameters; the path stage then finds the run
+# in PATH_STORE by parameter hash instead of simulating it again
+@app.callback(
+    Output("S0", "value"),
+    Output("T", "value"),
+    Output("r", "value"),
+    Output("sigma", "value"),
+    Output("num_simulations", "value"),
+    Output("num_steps", "value"),
+    Output("seed", "value"),
+    Output("variance-reduction", "value"),
+    Output("generator", "value"),
+    Output("path-store", "value"),
+    Output("model", "value"),
     [
-        Output("price-paths-graph", "figure"),
-        Output("call-payoff-distribution-graph", "figure"),
-        Output("put-payoff-distribution-graph", "figure"),
-        Output("call-greeks-graph", "figure"),
-        Output("put-greeks-graph", "figure"),
-        Output("simulation-results", "children"),
-    ],
-    [
-        Input("S0", "value"),
-        Input("K", "value"),
-        Input("T", "value"),
-        Input("r", "value"),
-        Input("sigma", "value"),
-        Input("num_simulations", "value"),
-        Input("num_steps", "value"),
-        Input("widget-checklist", "value"),
+        Output(f"{model}-{name}", "value")
+        for model, parameters in MODEL_PARAMETERS.items()
+        for name in parameters
     ],
+    Input("stored-runs", "value"),
 )
-def update_graphs(S0, K, T, r, sigma, num_simulations, num_steps, selected_widgets):
-    T_years = T / 12  # Convert months to years
-    price_paths = generate_scenarios(S0, r, sigma, T_years, num_steps, num_simulations)
-    call_payoffs = calculate_call_payoffs(price_paths, K)
-    put_payoffs = calculate_put_payoffs(price_paths, K)
-    call_price_mc = np.exp(-r * T_years) * np.mean(call_payoffs)
-    put_price_mc = np.exp(-r * T_years) * np.mean(put_payoffs)
-
-    call_deltas = [call_delta(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-    call_gammas = [gamma(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-    call_vegas = [vega(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-    call_thetas = [call_theta(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-    call_rhos = [call_rho(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-
-    put_deltas = [put_delta(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-    put_gammas = [gamma(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-    put_vegas = [vega(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-    put_thetas = [put_theta(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-    put_rhos = [put_rho(s, K, T_years, r, sigma) for s in price_paths[:, 0]]
-
-    option_portfolio = [
-        {"type": "call", "S": 100, "K": 100, "T": 1, "r": 0.05, "sigma": 0.2},
-        {"type": "put", "S": 100, "K": 100, "T": 1, "r": 0.05, "sigma": 0.2},
-    ]
+def load_stored_run(key):
+    metadata = PATH_STORE.metadata(key) if key else None
+    if metadata is None:
+        raise PreventUpdate
+    params = metadata["params"]
+    model = describe_model(
+        dict(metadata.get("model_params", {}), name=metadata.get("model", "gbm"))
+    )
+    return (
+        params["S0"],
+        round(params["T"] * 12, 10),
+        params["r"],
+        params["sigma"],
+        params["num_simulations"],
+        params["num_steps"],
+        metadata["seed"],
+        [name for name in ("antithetic", "moment_matching") if metadata[name]],
+        "mc",
+        ["store"],
+        model["name"],
+        [
+            model[name] if model["name"] == model_name else dash.no_update
+            for model_name, parameters in MODEL_PARAMETERS.items()
+            for name in parameters
+        ],
+    )
 
-    market_conditions = [
-        {"price_change": 0.1, "volatility_change": 0.05},
-        {"price_change": -0.1, "volatility_change": -0.05},
-    ]
 
-    simulated_values = simulate_scenario(option_portfolio, market_conditions)
+# Only the inputs of the selected model are shown
+@app.callback(
+    Output("heston-params", "style"),
+    Output("merton-params", "style"),
+    Input("model", "value"),
+)
+def update_model_inputs(model):
+    return (
+        {"display": "block" if model == "heston" else "none"},
+        {"display": "block" if model == "merton" else "none"},
+    )
 
-    figures = {
-        "price_paths": plot_price_paths(price_paths),
-        "call_payoff": plot_payoff_distribution(call_payoffs, "call"),
-        "put_payoff": plot_payoff_distribution(put_payoffs, "put"),
-        "call_greeks": plot_greeks(
-            price_paths,
-            {
-                "Delta": call_deltas,
-                "Gamma": call_gammas,
-                "Vega": call_vegas,
-                "Theta": call_thetas,
-                "Rho": call_rhos,
-            },
-            "call",
-        ),
-        "put_greeks": plot_greeks(
-            price_paths,
-            {
-                "Delta": put_deltas,
-                "Gamma": put_gammas,
-                "Vega": put_vegas,
-                "Theta": put_thetas,
-                "Rho": put_rhos,
-            },
-            "put",
+
+@app.callback(
+    Output("pricing-store", "data"),
+    Input("simulation-store", "data"),
+    Input("K", "value"),
+    Input("control-variate", "value"),
+)
+def update_pricing(simulation, K, control_variate):
+    if simulation is None or K is None:
+        raise PreventUpdate
+    get_pricing(simulation["params"], K, control_variate)
+    return {
+        "params": simulation["params"],
+        "K": K,
+        "control_variate": control_variate,
+        "key": make_key(
+            stage="pricing",
+            K=K,
+            control_variate=control_variate,
+            **simulation["params"],
         ),
     }
 
-    return (
-        figures.get("price_paths") if "price_paths" in selected_widgets else {},
-        figures.get("call_payoff") if "call_payoff" in selected_widgets else {},
-        figures.get("put_payoff") if "put_payoff" in selected_widgets else {},
-        figures.get("call_greeks") if "call_greeks" in selected_widgets else {},
-        figures.get("put_greeks") if "put_greeks" in selected_widgets else {},
-        f"Valeurs simulées du portefeuille pour différents scénarios de marché: {simulated_values}",
+
+@app.callback(
+    Output("greeks-store", "data"),
+    Input("simulation-store", "data"),
+    Input("K", "value"),
+)
+def update_greeks_stage(simulation, K):
+    if simulation is None or K is None:
+        raise PreventUpdate
+    # Greeks are only computed by the figure callbacks of selected widgets
+    return {
+        "params": simulation["params"],
+        "K": K,
+        "key": make_key(stage="greeks", K=K, **simulation["params"]),
+    }
+
+
+@app.callback(
+    Output("exotic-store", "data"),
+    Input("simulation-store", "data"),
+    Input("K", "value"),
+    Input("exotic-payoff", "value"),
+    Input("barrier-type", "value"),
+    Input("barrier", "value"),
+)
+def update_exotic_stage(simulation, K, payoff, barrier_type, barrier):
+    if simulation is None or K is None:
+        raise PreventUpdate
+    if payoff == "barrier" and barrier is None:
+        raise PreventUpdate
+    exotic = {
+        "payoff": payoff,
+        # The barrier only matters to barrier payoffs
+        "barrier": barrier if payoff == "barrier" else None,
+        "barrier_type": barrier_type if payoff == "barrier" else None,
+    }
+    # Exotic prices are only computed by the figure callbacks of selected widgets
+    return {
+        "params": simulation["params"],
+        "K": K,
+        "exotic": exotic,
+        "key": make_key(stage="exotic", K=K, **exotic, **simulation["params"]),
+    }
+
+
+@app.callback(
+    Output("risk-store", "data"),
+    Input("simulation-store", "data"),
+    Input("K", "value"),
+    Input("risk-confidence", "value"),
+    Input("risk-shocks", "value"),
+)
+def update_risk_stage(simulation, K, confidence, shocks):
+    if simulation is None or K is None or confidence is None:
+        raise PreventUpdate
+    if not 0 < confidence < 1:
+        raise PreventUpdate
+    risk = {"confidence": confidence, "shocks": shocks}
+    # VaR and ES are only computed by the figure callback of the P&L widget
+    return {
+        "params": simulation["params"],
+        "K": K,
+        "risk": risk,
+        "key": make_key(stage="risk", K=K, **risk, **simulation["params"]),
+    }
+
+
+# Function to register the callback drawing the figure of one widget. The figure is
+# rebuilt only when the widget is selected and its stage data changed since the
+# figure on screen was drawn; unselected widgets skip the computation entirely.
+def register_figure_callback(widget, graph_id, store_id):
+    @app.callback(
+        Output(graph_id, "figure"),
+        Output(f"{graph_id}-rendered", "data"),
+        Input(store_id, "data"),
+        Input("widget-checklist", "value"),
+        State(f"{graph_id}-rendered", "data"),
     )
+    def update_figure(stage, selected_widgets, rendered_key):
+        if widget not in (selected_widgets or []):
+            if rendered_key is None:
+                raise PreventUpdate
+            return {}, None
+        if stage is None or stage["key"] == rendered_key:
+            raise PreventUpdate
+        return build_figure(widget, stage), stage["key"]
+
+    return update_figure
+
+
+for widget, (graph_id, store_id) in WIDGET_GRAPHS.items():
+    register_figure_callback(widget, graph_id, store_id)
 
 
 @app.callback(
-    Output("export-result", "children"),
-    Input("export-button", "n_clicks"),
-    State("S0", "value"),
-    State("K", "value"),
-    State("T", "value"),
-    State("r", "value"),
-    State("sigma", "value"),
-    State("num_simulations", "value"),
-    State("num_steps", "value"),
+    Output("simulation-results", "children"),
+    Input("pricing-store", "data"),
 )
-def export_report(n_clicks, S0, K, T, r, sigma, num_simulations, num_steps):
-    if n_clicks:
-        T_years = T / 12  # Convert months to years
-        price_paths = generate_scenarios(
-            S0, r, sigma, T_years, num_steps, num_simulations
+def update_results(pricing_stage):
+    if pricing_stage is None:
+        raise PreventUpdate
+    result = get_pricing(
+        pricing_stage["params"], pricing_stage["K"], pricing_stage["control_variate"]
+    )
+
+    closed_form = greeks(
+        pricing_stage["params"]["S0"],
+        pricing_stage["K"],
+        pricing_stage["params"]["T"] / 12,
+        pricing_stage["params"]["r"],
+        pricing_stage["params"]["sigma"],
+    )
+    # Monte Carlo Greeks (standard error) next to Black-Scholes, vega and rho per 1%
+    # and theta per day; their estimators assume GBM dynamics
+    greeks_table = html.P(
+        "Greeks Monte Carlo disponibles uniquement pour le modèle Black-Scholes (GBM)"
+    )
+    if pricing_stage["params"]["model"] is None:
+        greeks_table = dbc.Table(
+            [
+                html.Thead(
+                    html.Tr(
+                        [html.Th("Greek")]
+                        + [
+                            html.Th(f"{option_type.capitalize()} {source}")
+                            for option_type in ("call", "put")
+                            for source in ("Monte Carlo", "Black-Scholes")
+                        ]
+                    )
+                ),
+                html.Tbody(
+                    [
+                        html.Tr(
+                            [html.Td(greek.capitalize())]
+                            + [
+                                cell
+                                for option_type in ("call", "put")
+                                for cell in (
+                                    html.Td(
+                                        f"{result[f'{option_type}_{greek}']:.4f} "
+                                        f"(± {result[f'{option_type}_{greek}_std_error']:.4f})"
+                                    ),
+                                    html.Td(
+                                        f"{closed_form.get(f'{option_type}_{greek}', closed_form.get(greek)):.4f}"
+                                    ),
+                                )
+                            ]
+                        )
+                        for greek in GREEK_NAMES
+                    ]
+                ),
+            ],
+            size="sm",
+            bordered=True,
+        )
+
+    paths_used = f"Trajectoires utilisées: {result['num_simulations']}"
+    if result["converged"] is not None:
+        paths_used += (
+            " (précision cible atteinte)"
+            if result["converged"]
+            else " (maximum atteint avant la précision cible)"
         )
-        call_payoffs = calculate_call_payoffs(price_paths, K)
-        put_payoffs = calculate_put_payoffs(price_paths, K)
-        call_price_mc = np.exp(-r * T_years) * np.mean(call_payoffs)
-        put_price_mc = np.exp(-r * T_years) * np.mean(put_payoffs)
-
-        simulation_data = {
-            "Prix Initial": S0,
-            "Prix d'Exercice": K,
-            "Temps jusqu'à l'Échéance (mois)": T,
-            "Taux d'Intérêt": r,
-            "Volatilité": sigma,
-            "Nombre de Simulations": num_simulations,
-            "Nombre de Pas de Temps": num_steps,
-            "Prix Call Monte Carlo": round(call_price_mc, 2),
-            "Prix Put Monte Carlo": round(put_price_mc, 2),
-        }
 
+    return html.Div(
+        [
+            html.P(
+                f"Prix Call Monte Carlo: {result['call_price']:.4f} "
+                f"(erreur standard {result['call_std_error']:.4f}, "
+                f"IC 95 % [{result['call_ci'][0]:.4f}; {result['call_ci'][1]:.4f}], "
+                f"facteur de réduction de variance "
+                f"{result['call_variance_reduction_factor']:.1f})"
+            ),
+            html.P(
+                f"Prix Put Monte Carlo: {result['put_price']:.4f} "
+                f"(erreur standard {result['put_std_error']:.4f}, "
+                f"IC 95 % [{result['put_ci'][0]:.4f}; {result['put_ci'][1]:.4f}], "
+                f"facteur de réduction de variance "
+                f"{result['put_variance_reduction_factor']:.1f})"
+            ),
+            html.P(paths_used),
+            greeks_table,
+        ]
+    )
+
+
+# Background job exporting the PDF report of a pricing stage; figures, images and
+# the PDF are its three progress steps. The report is built from the cached pricing
+# stage the user is looking at, and images and PDF stay in memory, so concurrent
+# exports never share files. Returns the message shown in the layout and the PDF,
+# base64-encoded, for the download.
+def export_job(progress, pricing_stage):
+    # Image and PDF export are rarely used and slow to import: load them on demand
+    import plotly.io as pio
+    from modules.report import generate_pdf_report
+
+    params = pricing_stage["params"]
+    result = get_pricing(params, pricing_stage["K"], pricing_stage["control_variate"])
+    call_price_mc = result["call_price"]
+    put_price_mc = result["put_price"]
+
+    simulation_data = {
+        "Prix Initial": params["S0"],
+        "Prix d'Exercice": pricing_stage["K"],
+        "Temps jusqu'à l'Échéance (mois)": params["T"],
+        "Taux d'Intérêt": params["r"],
+        "Volatilité": params["sigma"],
+        "Nombre de Simulations": result["num_simulations"],
+        "Nombre de Pas de Temps": params["num_steps"],
+        "Prix Call Monte Carlo": round(call_price_mc, 2),
+        "Prix Put Monte Carlo": round(put_price_mc, 2),
+        "Facteur de Réduction de Variance (Call)": round(
+            result["call_variance_reduction_factor"], 1
+        ),
+        "Facteur de Réduction de Variance (Put)": round(
+            result["put_variance_reduction_factor"], 1
+        ),
+    }
+
+    progress(0, 3)
+    with METRICS.stage("export:figures"):
         figures = {
-            "Trajectoires de Prix": plot_price_paths(price_paths),
-            "Distribution des Payoffs (Call)": plot_payoff_distribution(
-                call_payoffs, "call"
+            "Trajectoires de Prix": plot_price_paths(result["price_paths"]),
+            "Distribution des Payoffs (Call)": plot_payoff_histogram(
+                *result["call_histogram"], "call"
             ),
-            "Distribution des Payoffs (Put)": plot_payoff_distribution(
-                put_payoffs, "put"
+            "Distribution des Payoffs (Put)": plot_payoff_histogram(
+                *result["put_histogram"], "put"
             ),
         }
+    progress(1, 3)
 
-        graph_files = {}
-        for title, fig in figures.items():
-            filename = f"{title.replace(' ', '_').lower()}.png"
-            pio.write_image(fig, filename)
-            graph_files[title] = filename
+    # kaleido keeps its renderer process alive between calls, so only the first
+    # export of the server pays for starting it
+    with METRICS.stage("export:images"):
+        images = {
+            title: pio.to_image(fig, format="png") for title, fig in figures.items()
+        }
+    progress(2, 3)
 
-        pdf_output = generate_pdf_report(simulation_data, graph_files)
+    with METRICS.stage("export:pdf"):
+        pdf = generate_pdf_report(simulation_data, images)
+    progress(3, 3)
+
+    filename = f"rapport_simulation_{pricing_stage['key'][:12]}.pdf"
+    return {
+        "message": f"Rapport exporté: {filename}",
+        "filename": filename,
+        "content": base64.b64encode(pdf).decode("ascii"),
+    }
 
-        # Clean up image files after generating the PDF
-        for file in graph_files.values():
-            if os.path.exists(file):
-                os.remove(file)
 
-        return f"Rapport exporté: {pdf_output}"
-    return ""
+@app.callback(
+    Output("export-job", "data"),
+    Input("export-button", "n_clicks"),
+    State("pricing-store", "data"),
+)
+def export_report(n_clicks, pricing_stage):
+    if not n_clicks or not pricing_stage:
+        raise PreventUpdate
+    return {
+        "id": JOBS.submit(
+            "export", f"export:{pricing_stage['key']}", export_job, pricing_stage
+        )
+    }
+
+
+@app.callback(
+    Output("export-result", "children"),
+    Output("export-interval", "disabled"),
+    Output("export-download", "data"),
+    Input("export-job", "data"),
+    Input("export-interval", "n_intervals"),
+)
+def poll_export_job(export, n_intervals):
+    if export is None:
+        raise PreventUpdate
+    job = JOBS.get(export["id"])
+    if job is None:
+        return "", True, None
+    if job["status"] in ("queued", "running"):
+        return f"Export en cours ({job['done']}/3)…", False, None
+    if job["status"] == "done":
+        report = job["result"]
+        download = {
+            "content": report["content"],
+            "filename": report["filename"],
+            "type": "application/pdf",
+            "base64": True,
+        }
+        return report["message"], True, download
+    if job["status"] == "failed":
+        return f"Échec de l'export: {job['error']}", True, None
+    return "Export annulé", True, None
+
+
+if DEBUG_PANEL:
+
+    @app.callback(
+        Output("metrics-panel", "children"),
+        Input("metrics-interval", "n_intervals"),
+    )
+    def update_metrics_panel(n_intervals):
+        return format_metrics(METRICS.summary())
+
+    @app.callback(
+        Output("profile-report", "children"),
+        Input("profile-button", "n_clicks"),
+        Input("metrics-interval", "n_intervals"),
+    )
+    def update_profile_report(n_clicks, n_intervals):
+        if dash.callback_context.triggered_id == "profile-button":
+            PROFILER.arm()
+            return "Profilage armé: la prochaine requête sera profilée."
+        if PROFILER.report is None:
+            raise PreventUpdate
+        return PROFILER.report
 
 
 def find_free_port():
@@ -388,16 +1614,28 @@ def open_browser(port):
     webbrowser.open_new(f"http://127.0.0.1:{port}/")
 
 
-if __name__ == "__main__":
-    port = find_free_port()
-    Timer(1, open_browser, args=[port]).start()
-    app.run_server(debug=True, port=port)
+# Function to cancel the background jobs and release the shared-memory results of
+# this process. It runs at interpreter exit rather than from signal handlers, so it
+# also runs in the workers of a WSGI server (whose own signal handlers stay in
+# place), including workers forked after the app was imported.
+def handle_exit():
+    JOBS.shutdown()
+    if SHARED_STORE is not None:
+        SHARED_STORE.close()
+
 
+atexit.register(handle_exit)
 
-def handle_exit(*args):
+
+# Function to stop the development server on SIGTERM; SystemExit unwinds it and runs
+# the exit handlers (SIGINT already does so through KeyboardInterrupt)
+def stop_server(*args):
     print("Stopping server...")
-    app.server.shutdown()
+    raise SystemExit(0)
 
 
-signal.signal(signal.SIGINT, handle_exit)
-signal.signal(signal.SIGTERM, handle_exit)
+if __name__ == "__main__":
+    signal.signal(signal.SIGTERM, stop_server)
+    port = find_free_port()
+    Timer(1, open_browser, args=[port]).start()
+    app.run_server(debug=True, port=port)
@@ -0,0 +1,121 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(APP_DIR, "benchmarks", "results", "import_times.json")
+
+# Cold import budgets in seconds (cumulative import time in a fresh interpreter)
+IMPORT_BUDGETS = {
+    "app": 2.5,
+    "modules.batch": 0.8,
+    "modules.cache": 0.5,
+    "modules.calculations": 0.8,
+    "modules.exotics": 0.8,
+    "modules.implied_vol": 0.8,
+    "modules.instrumentation": 0.5,
+    "modules.jobs": 0.5,
+    "modules.mc_greeks": 0.8,
+    "modules.models": 0.5,
+    "modules.parallel": 0.8,
+    "modules.plots": 0.8,
+    "modules.portfolio": 0.8,
+    "modules.pricing": 0.8,
+    "modules.qmc": 0.8,
+    "modules.risk": 0.8,
+    "modules.shared_store": 0.5,
+    "modules.simulations": 0.8,
+    "modules.storage": 0.8,
+}
+# Heavy dependencies only needed by rarely used features, which must be imported on
+# first use rather than at startup
+DEFERRED_MODULES = ("fpdf", "pandas", "plotly.io", "scipy.optimize", "scipy.stats")
+# The computational modules must not pull in the web stack either
+WEB_MODULES = ("dash", "flask", "plotly")
+UI_MODULES = ("app", "modules.plots")
+
+
+# Function to import module in a fresh interpreter with -X importtime. Returns the
+# cumulative import time (seconds) of every module it loaded, best of repeat runs,
+# and the names of all loaded modules.
+def import_times(module, repeat=3):
+    code = f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+    best = {}
+    for _ in range(repeat):
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=APP_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        for line in completed.stderr.splitlines():
+            if not line.startswith("import time:") or "cumulative" in line:
+                continue
+            _, cumulative, name = line[len("import time:") :].split("|")
+            name, seconds = name.strip(), int(cumulative) / 1e6
+            best[name] = min(seconds, best.get(name, seconds))
+    loaded = json.loads(completed.stdout.splitlines()[-1])
+    return best, loaded
+
+
+# Function to check each module against its budget (scaled by scale) and the list of
+# modules it may not load. Returns one record per module and the failure messages.
+def check_startup(budgets=IMPORT_BUDGETS, scale=1.0, repeat=3):
+    records, failures = [], []
+    for module, budget in budgets.items():
+        times, loaded = import_times(module, repeat)
+        forbidden = DEFERRED_MODULES
+        if module not in UI_MODULES:
+            forbidden += WEB_MODULES
+        eager = sorted(name for name in forbidden if name in loaded)
+        seconds = times[module]
+        records.append(
+            {
+                "module": module,
+                "seconds": seconds,
+                "budget": budget * scale,
+                "eager_imports": eager,
+                "slowest": sorted(times.items(), key=lambda item: -item[1])[1:11],
+            }
+        )
+        if seconds > budget * scale:
+            failures.append(
+                f"{module} takes {seconds:.3f} s to import "
+                f"(budget {budget * scale:.3f} s)"
+            )
+        if eager:
+            failures.append(f"{module} imports {', '.join(eager)} at startup")
+    return records, failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Check the cold import time of the app and its modules"
+    )
+    parser.add_argument("--scale", type=float, default=1.0, help="budget multiplier")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per module")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    args = parser.parse_args(argv)
+
+    records, failures = check_startup(scale=args.scale, repeat=args.repeat)
+    for record in records:
+        print(
+            f"{record['module']:30s} {record['seconds'] * 1e3:9.1f} ms "
+            f"(budget {record['budget'] * 1e3:7.1f} ms)"
+        )
+        for name, seconds in record["slowest"][:5]:
+            print(f"    {name:50s} {seconds * 1e3:9.1f} ms")
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(records, file, indent=2)
+    print(f"Import times written to {args.output}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
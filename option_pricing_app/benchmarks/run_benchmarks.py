@@ -0,0 +1,392 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.calculations import greeks
+from modules.implied_vol import implied_volatility
+from modules.plots import plot_payoff_distribution, plot_price_paths
+from modules.portfolio import Portfolio
+from modules.pricing import price_european_streaming
+from modules.risk import portfolio_risk, simulate_shocks
+from modules.simulations import generate_scenarios, simulate_scenario
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "results", "baseline.json")
+
+# Parameter sweeps per suite; "quick" keeps a local run under a minute
+SWEEPS = {
+    "full": {
+        "num_simulations": [1000, 10000, 100000],
+        "num_steps": [52, 252],
+        "portfolio_size": [100, 10000, 1000000],
+        # simulate_scenario takes a list of option dicts, so books stay smaller
+        "scenario_portfolio_size": [100, 10000],
+        "num_scenarios": 100,
+        # Full revaluation in VaR/ES costs about 0.1 s per million option prices
+        # here, so the risk books are capped below the scenario books
+        "risk_portfolio_size": [100, 1000],
+        "risk_scenarios": 100000,
+        "repeat": 5,
+    },
+    "quick": {
+        "num_simulations": [1000, 10000],
+        "num_steps": [52],
+        "portfolio_size": [100, 10000],
+        "scenario_portfolio_size": [100],
+        "num_scenarios": 20,
+        "risk_portfolio_size": [100],
+        "risk_scenarios": 10000,
+        "repeat": 3,
+    },
+}
+
+
+# Function to time a callable: returns the wall times of repeat calls (after one
+# warm-up call) and the peak traced memory of a separate call, in bytes
+def measure(function, repeat):
+    function()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    return times, peak
+
+
+# Function to build a reproducible random option book of the given size
+def random_book(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return {
+        "S": rng.uniform(80, 120, size),
+        "K": rng.uniform(80, 120, size),
+        "T": rng.uniform(0.1, 2, size),
+        "r": 0.03,
+        "sigma": rng.uniform(0.1, 0.5, size),
+        "is_call": rng.random(size) < 0.5,
+    }
+
+
+# Function to list the benchmark cases of a sweep as (name, params, unit, units,
+# callable) tuples; units is the amount of work per call used for the throughput
+def benchmark_cases(sweep):
+    cases = []
+    for num_simulations in sweep["num_simulations"]:
+        for num_steps in sweep["num_steps"]:
+            params = {"num_simulations": num_simulations, "num_steps": num_steps}
+            cases.append(
+                (
+                    "generate_scenarios",
+                    params,
+                    "paths",
+                    num_simulations,
+                    lambda n=num_simulations, m=num_steps: generate_scenarios(
+                        100, 0.05, 0.2, 1, m, n, seed=0
+                    ),
+                )
+            )
+            cases.append(
+                (
+                    "price_european_streaming",
+                    params,
+                    "paths",
+                    num_simulations,
+                    lambda n=num_simulations, m=num_steps: price_european_streaming(
+                        100, 100, 0.05, 0.2, 1, m, n, terminal_only=False, seed=0
+                    ),
+                )
+            )
+            # Stochastic-volatility and jump paths, to compare with GBM above
+            for model in ("heston", "merton"):
+                cases.append(
+                    (
+                        "generate_scenarios",
+                        dict(params, model=model),
+                        "paths",
+                        num_simulations,
+                        lambda n=num_simulations, m=num_steps, model=model: (
+                            generate_scenarios(
+                                100, 0.05, 0.2, 1, m, n, seed=0, model=model
+                            )
+                        ),
+                    )
+                )
+
+    for size in sweep["portfolio_size"]:
+        book = random_book(size)
+        cases.append(
+            (
+                "greeks",
+                {"portfolio_size": size},
+                "options",
+                size,
+                lambda book=book: greeks(
+                    book["S"], book["K"], book["T"], book["r"], book["sigma"]
+                ),
+            )
+        )
+        values = greeks(book["S"], book["K"], book["T"], book["r"], book["sigma"])
+        prices = np.where(book["is_call"], values["call_price"], values["put_price"])
+        cases.append(
+            (
+                "implied_volatility",
+                {"portfolio_size": size},
+                "options",
+                size,
+                lambda book=book, prices=prices: implied_volatility(
+                    prices, book["S"], book["K"], book["T"], book["r"], book["is_call"]
+                ),
+            )
+        )
+
+    num_scenarios = sweep["num_scenarios"]
+    rng = np.random.default_rng(1)
+    market_conditions = [
+        {"price_change": price_change, "volatility_change": volatility_change}
+        for price_change, volatility_change in zip(
+            rng.normal(0, 0.1, num_scenarios), rng.normal(0, 0.02, num_scenarios)
+        )
+    ]
+    for size in sweep["scenario_portfolio_size"]:
+        book = random_book(size)
+        option_portfolio = [
+            {
+                "type": "call" if is_call else "put",
+                "S": S,
+                "K": K,
+                "T": T,
+                "r": book["r"],
+                "sigma": sigma,
+            }
+            for is_call, S, K, T, sigma in zip(
+                book["is_call"], book["S"], book["K"], book["T"], book["sigma"]
+            )
+        ]
+        cases.append(
+            (
+                "simulate_scenario",
+                {"portfolio_size": size, "num_scenarios": num_scenarios},
+                "option revaluations",
+                size * num_scenarios,
+                lambda portfolio=option_portfolio: simulate_scenario(
+                    portfolio, market_conditions
+                ),
+            )
+        )
+
+    # VaR/ES with component contributions revalues the book twice per scenario
+    risk_scenarios = sweep["risk_scenarios"]
+    shocks = simulate_shocks(risk_scenarios, horizon_days=10, seed=2)
+    for size in sweep["risk_portfolio_size"]:
+        book = random_book(size)
+        portfolio = Portfolio(
+            book["is_call"], book["S"], book["K"], book["T"], book["r"], book["sigma"]
+        )
+        cases.append(
+            (
+                "portfolio_risk",
+                {"portfolio_size": size, "num_scenarios": risk_scenarios},
+                "option revaluations",
+                2 * size * risk_scenarios,
+                lambda portfolio=portfolio: portfolio_risk(
+                    portfolio, *shocks, horizon_days=10, bins=50
+                ),
+            )
+        )
+
+    for num_simulations in sweep["num_simulations"]:
+        for num_steps in sweep["num_steps"]:
+            paths = generate_scenarios(100, 0.05, 0.2, 1, num_steps, num_simulations)
+            bands = np.percentile(paths, (5, 25, 50, 75, 95), axis=1)
+            payoffs = np.maximum(paths[-1] - 100, 0)
+            params = {"num_simulations": num_simulations, "num_steps": num_steps}
+            # Figures are serialized as Dash would before sending them to the browser
+            cases.append(
+                (
+                    "plot_price_paths",
+                    params,
+                    "figures",
+                    1,
+                    lambda paths=paths, bands=bands: plot_price_paths(
+                        paths, bands=bands
+                    ).to_json(),
+                )
+            )
+            cases.append(
+                (
+                    "plot_payoff_distribution",
+                    params,
+                    "figures",
+                    1,
+                    lambda payoffs=payoffs: plot_payoff_distribution(
+                        payoffs, "call"
+                    ).to_json(),
+                )
+            )
+
+    cases.append(("generate_pdf_report", {}, "reports", 1, pdf_report_case()))
+    return cases
+
+
+# Function to build the PDF report benchmark: three PNG graphs rendered once in memory
+# with matplotlib (no browser or kaleido needed), the report built in memory
+def pdf_report_case():
+    import io
+    import matplotlib
+
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from modules.report import generate_pdf_report
+
+    paths = generate_scenarios(100, 0.05, 0.2, 1, 252, 10, seed=0)
+    graphs = {}
+    for index in range(3):
+        buffer = io.BytesIO()
+        fig, ax = plt.subplots()
+        ax.plot(paths)
+        fig.savefig(buffer, format="png")
+        plt.close(fig)
+        graphs[f"Graphique {index}"] = buffer.getvalue()
+    simulation_data = {"Prix Initial": 100, "Prix d'Exercice": 100}
+
+    return lambda: generate_pdf_report(simulation_data, graphs)
+
+
+# Function to identify a result across runs
+def case_key(result):
+    params = ",".join(
+        f"{name}={value}" for name, value in sorted(result["params"].items())
+    )
+    return f"{result['name']}[{params}]"
+
+
+# Function to run every benchmark case (optionally only names containing a filter)
+def run_benchmarks(suite="full", only=None, repeat=None):
+    sweep = SWEEPS[suite]
+    repeat = repeat or sweep["repeat"]
+    results = []
+    for name, params, unit, units, function in benchmark_cases(sweep):
+        if only and not any(pattern in name for pattern in only):
+            continue
+        times, peak = measure(function, repeat)
+        median = float(np.median(times))
+        result = {
+            "name": name,
+            "params": params,
+            "repeat": repeat,
+            "wall_time_min": min(times),
+            "wall_time_median": median,
+            "peak_memory_bytes": peak,
+            "throughput": units / median if median > 0 else float("inf"),
+            "throughput_unit": f"{unit}/s",
+        }
+        print(
+            f"{case_key(result):70s} {median * 1e3:10.2f} ms "
+            f"{peak / 2**20:9.1f} MiB {result['throughput']:14.0f} {unit}/s"
+        )
+        results.append(result)
+    return {
+        "metadata": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "suite": suite,
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+        },
+        "results": results,
+    }
+
+
+# Function to compare results with a baseline run. A case regresses when its median
+# wall time (or peak memory) exceeds the baseline by more than threshold (0.2 = 20%).
+# Returns the comparison rows and whether any case regressed.
+def compare_results(results, baseline, threshold=0.2):
+    baseline_cases = {case_key(result): result for result in baseline["results"]}
+    rows = []
+    regressed = False
+    for result in results["results"]:
+        key = case_key(result)
+        if key not in baseline_cases:
+            continue
+        reference = baseline_cases[key]
+        time_ratio = result["wall_time_median"] / reference["wall_time_median"]
+        memory_ratio = (result["peak_memory_bytes"] + 1) / (
+            reference["peak_memory_bytes"] + 1
+        )
+        row_regressed = time_ratio > 1 + threshold or memory_ratio > 1 + threshold
+        regressed = regressed or row_regressed
+        rows.append(
+            {
+                "case": key,
+                "time_ratio": time_ratio,
+                "memory_ratio": memory_ratio,
+                "regressed": row_regressed,
+            }
+        )
+    return rows, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark the option pricing hot paths"
+    )
+    parser.add_argument("--suite", choices=sorted(SWEEPS), default="full")
+    parser.add_argument("--only", nargs="*", help="run cases whose name contains these")
+    parser.add_argument("--repeat", type=int, help="timed calls per case")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="store this run as the baseline instead of comparing against it",
+    )
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.suite, args.only, args.repeat)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline to compare against (run with --save-baseline first)")
+        return 0
+
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    rows, regressed = compare_results(results, baseline, args.threshold)
+    for row in rows:
+        flag = "REGRESSION" if row["regressed"] else "ok"
+        print(
+            f"{row['case']:70s} time x{row['time_ratio']:.2f} "
+            f"memory x{row['memory_ratio']:.2f} {flag}"
+        )
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
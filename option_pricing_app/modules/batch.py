@@ -0,0 +1,263 @@
+import csv
+import math
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+import numpy as np
+from modules.calculations import call_price, put_price
+from modules.pricing import price_european_streaming
+
+# Columns every parameter row must have (T in years)
+PARAMETER_COLUMNS = ("S0", "K", "T", "r", "sigma")
+# Per-row settings, taken from the run defaults where a row leaves them out
+ROW_SETTINGS = (
+    "num_simulations",
+    "num_steps",
+    "seed",
+    "antithetic",
+    "moment_matching",
+    "control_variate",
+)
+RESULT_COLUMNS = (
+    ("row",)
+    + PARAMETER_COLUMNS
+    + ROW_SETTINGS
+    + (
+        "mc_call",
+        "mc_call_std_error",
+        "mc_put",
+        "mc_put_std_error",
+        "bs_call",
+        "bs_put",
+        "call_z_score",
+        "put_z_score",
+        "seconds",
+    )
+)
+
+
+# Function to read a parameter table (CSV, JSON records or Parquet) as a list of
+# row dicts; pandas is only imported here
+def load_parameter_table(path):
+    import pandas as pd
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        frame = pd.read_csv(path)
+    elif extension == ".json":
+        frame = pd.read_json(path, orient="records")
+    elif extension in (".parquet", ".pq"):
+        frame = pd.read_parquet(path)
+    else:
+        raise ValueError(f"Unsupported parameter file format: {extension}")
+    missing = [column for column in PARAMETER_COLUMNS if column not in frame.columns]
+    if missing:
+        raise ValueError(f"Parameter table is missing columns: {missing}")
+    return frame.to_dict("records")
+
+
+# Function to fill in the settings a row leaves out (missing or NaN) from defaults.
+# Rows without a seed get one spawned from the run seed and their row number, so a
+# resumed run prices every row exactly as an uninterrupted one would.
+def row_settings(row_number, row, defaults, base_seed):
+    settings = {}
+    for name in ROW_SETTINGS:
+        value = row.get(name)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            value = defaults.get(name)
+        settings[name] = value
+    if settings["seed"] is None:
+        sequence = np.random.SeedSequence(base_seed, spawn_key=(row_number,))
+        settings["seed"] = int(sequence.generate_state(1)[0])
+    settings["num_simulations"] = int(settings["num_simulations"])
+    settings["num_steps"] = int(settings["num_steps"])
+    settings["seed"] = int(settings["seed"])
+    settings["antithetic"] = bool(settings["antithetic"])
+    settings["moment_matching"] = bool(settings["moment_matching"])
+    settings["control_variate"] = settings["control_variate"] or "none"
+    return settings
+
+
+# Function to price one parameter row by streaming Monte Carlo next to the closed
+# form; the z-scores measure the MC error in standard errors
+def price_row(task):
+    row_number, row, settings, memory_budget = task
+    S0, K, T, r, sigma = (float(row[column]) for column in PARAMETER_COLUMNS)
+    start = time.perf_counter()
+    result = price_european_streaming(
+        S0,
+        K,
+        r,
+        sigma,
+        T,
+        settings["num_steps"],
+        settings["num_simulations"],
+        memory_budget,
+        num_paths_to_display=0,
+        seed=settings["seed"],
+        antithetic=settings["antithetic"],
+        moment_matching=settings["moment_matching"],
+        control_variate=(
+            None
+            if settings["control_variate"] == "none"
+            else settings["control_variate"]
+        ),
+    )
+    record = {"row": row_number, "S0": S0, "K": K, "T": T, "r": r, "sigma": sigma}
+    record.update(settings)
+    record["num_simulations"] = result["num_simulations"]
+    for option_type, closed_form in (("call", call_price), ("put", put_price)):
+        mc_price = float(result[f"{option_type}_price"])
+        std_error = float(result[f"{option_type}_std_error"])
+        bs_price = float(closed_form(S0, K, T, r, sigma))
+        record[f"mc_{option_type}"] = mc_price
+        record[f"mc_{option_type}_std_error"] = std_error
+        record[f"bs_{option_type}"] = bs_price
+        record[f"{option_type}_z_score"] = (
+            (mc_price - bs_price) / std_error if std_error > 0 else 0.0
+        )
+    record["seconds"] = time.perf_counter() - start
+    return record
+
+
+# Function to price tasks in-process (one worker) or on a process pool, yielding
+# records in completion order. At most max_pending tasks are in flight, so results
+# never pile up in memory.
+def iter_priced_rows(tasks, num_workers=1, max_pending=None):
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    if num_workers <= 1:
+        for task in tasks:
+            yield price_row(task)
+        return
+    max_pending = max_pending or 2 * num_workers
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        pending = set()
+        for task in tasks:
+            if len(pending) >= max_pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+            pending.add(executor.submit(price_row, task))
+        for future in pending:
+            yield future.result()
+
+
+# CSV results file appended one batch at a time. On resume, a last line cut short by
+# a crash is dropped and the rows already written are skipped.
+class CsvResultWriter:
+    def __init__(self, path, columns=RESULT_COLUMNS, resume=True):
+        self.path = path
+        self.columns = columns
+        self.completed = set()
+        if resume and os.path.exists(path):
+            with open(path, "rb+") as file:
+                content = file.read()
+                if content and not content.endswith(b"\n"):
+                    file.truncate(content.rfind(b"\n") + 1)
+            with open(path, newline="") as file:
+                self.completed = {int(row["row"]) for row in csv.DictReader(file)}
+        elif os.path.exists(path):
+            os.remove(path)
+        self._new = not os.path.exists(path) or os.path.getsize(path) == 0
+
+    def write(self, records):
+        with open(self.path, "a", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=self.columns)
+            if self._new:
+                writer.writeheader()
+                self._new = False
+            writer.writerows(records)
+            file.flush()
+            os.fsync(file.fileno())
+
+
+# Parquet results written as a dataset directory of part files, one per batch. Parts
+# are written to a temporary name and renamed, so a crash never leaves a partial part.
+# Needs pyarrow, imported on first use.
+class ParquetResultWriter:
+    def __init__(self, path, columns=RESULT_COLUMNS, resume=True):
+        import pyarrow.parquet as pq
+
+        self.path = path
+        self.columns = columns
+        self.completed = set()
+        os.makedirs(path, exist_ok=True)
+        self._parts = sorted(
+            filename for filename in os.listdir(path) if filename.endswith(".parquet")
+        )
+        for filename in self._parts:
+            part = os.path.join(path, filename)
+            if resume:
+                table = pq.read_table(part, columns=["row"])
+                self.completed.update(table.column("row").to_pylist())
+            else:
+                os.remove(part)
+        if not resume:
+            self._parts = []
+
+    def write(self, records):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist(
+            [{column: record[column] for column in self.columns} for record in records]
+        )
+        filename = f"part-{len(self._parts):05d}.parquet"
+        temporary = os.path.join(self.path, f".{filename}.tmp")
+        pq.write_table(table, temporary)
+        os.replace(temporary, os.path.join(self.path, filename))
+        self._parts.append(filename)
+
+
+# Function to open the results writer matching the output extension
+def result_writer(path, resume=True):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return CsvResultWriter(path, resume=resume)
+    if extension in (".parquet", ".pq"):
+        return ParquetResultWriter(path, resume=resume)
+    raise ValueError(f"Unsupported results format: {extension}")
+
+
+# Function to price every row of a parameter table and stream the results to
+# output_path in batches of batch_size rows. With resume, rows already in the output
+# are skipped, so an interrupted run only redoes its last unwritten batch.
+# memory_budget (bytes) bounds each worker's simulation. Returns row counts.
+def run_batch(
+    rows,
+    output_path,
+    defaults,
+    seed=0,
+    num_workers=1,
+    batch_size=64,
+    memory_budget=64 * 2**20,
+    resume=True,
+    progress=None,
+):
+    writer = result_writer(output_path, resume)
+    tasks = (
+        (row_number, row, row_settings(row_number, row, defaults, seed), memory_budget)
+        for row_number, row in enumerate(rows)
+        if row_number not in writer.completed
+    )
+    skipped = sum(
+        1 for row_number in range(len(rows)) if row_number in writer.completed
+    )
+    priced = 0
+    batch = []
+    try:
+        for record in iter_priced_rows(tasks, num_workers):
+            batch.append(record)
+            if len(batch) >= batch_size:
+                writer.write(batch)
+                priced += len(batch)
+                batch = []
+                if progress is not None:
+                    progress(skipped + priced, len(rows))
+    finally:
+        # Keep whatever was priced before an interruption
+        if batch:
+            writer.write(batch)
+            priced += len(batch)
+    return {"rows": len(rows), "skipped": skipped, "priced": priced}
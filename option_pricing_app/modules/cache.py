@@ -0,0 +1,185 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+import threading
+from collections import OrderedDict
+import numpy as np
+
+
+# Function to normalize one parameter value so equal inputs give equal keys
+# (100 and 100.0, numpy and Python scalars, lists in any order)
+def _normalize(value):
+    if isinstance(value, (bool, np.bool_)) or value is None:
+        return None if value is None else bool(value)
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return repr(float(value))
+    if isinstance(value, (list, tuple, set)):
+        return sorted(_normalize(item) for item in value)
+    if isinstance(value, dict):
+        return {str(key): _normalize(item) for key, item in value.items()}
+    return str(value)
+
+
+# Function to build a cache key from normalized simulation parameters (seed included)
+def make_key(**params):
+    normalized = {name: _normalize(value) for name, value in params.items()}
+    payload = json.dumps(normalized, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# Function to estimate the memory footprint of a cached result in bytes
+def result_nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(
+            result_nbytes(key) + result_nbytes(item) for key, item in value.items()
+        )
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(result_nbytes(item) for item in value)
+    if hasattr(value, "__dict__"):
+        return sys.getsizeof(value) + result_nbytes(vars(value))
+    return sys.getsizeof(value)
+
+
+# Thread-safe LRU cache of simulation results evicting on a byte budget rather than
+# an entry count. With disk_dir, entries are also written to a local disk tier
+# (bounded by disk_max_bytes) and reloaded from it after eviction or a restart.
+# With shared (a shared_store.SharedResultStore), entries are also published to
+# shared memory, where the other processes of the server map them without copying.
+class ResultCache:
+    def __init__(
+        self, max_bytes=256 * 2**20, disk_dir=None, disk_max_bytes=None, shared=None
+    ):
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = disk_max_bytes
+        self.shared = shared
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._counters = {
+            "hits": 0,
+            "misses": 0,
+            "shared_hits": 0,
+            "disk_hits": 0,
+            "evictions": 0,
+        }
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def __contains__(self, key):
+        with self._lock:
+            return (
+                key in self._entries
+                or (self.shared is not None and key in self.shared)
+                or os.path.exists(self._disk_path(key))
+            )
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return self._entries[key][0]
+            if self.shared is not None:
+                value = self.shared.get(key)
+                if value is not None:
+                    self._counters["shared_hits"] += 1
+                    self._store(key, value)
+                    return value
+            value = self._load(key)
+            if value is not None:
+                self._counters["disk_hits"] += 1
+                self._store(key, value)
+                return value
+            self._counters["misses"] += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._store(key, value)
+            if self.shared is not None:
+                self.shared.put(key, value)
+            self._save(key, value)
+
+    # Function to return the cached value for key, computing and caching it on a miss
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters)
+            stats.update(entries=len(self._entries), bytes=self._bytes)
+            stats["max_bytes"] = self.max_bytes
+            return stats
+
+    def _store(self, key, value):
+        size = result_nbytes(value)
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        while self._entries and self._bytes + size > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self._counters["evictions"] += 1
+        self._entries[key] = (value, size)
+        self._bytes += size
+
+    def _disk_path(self, key):
+        if self.disk_dir is None:
+            return ""
+        return os.path.join(self.disk_dir, f"{key}.pkl")
+
+    def _save(self, key, value):
+        if self.disk_dir is None:
+            return
+        path = self._disk_path(key)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporary, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary, path)
+        if self.disk_max_bytes is not None:
+            self._trim_disk()
+
+    def _load(self, key):
+        path = self._disk_path(key)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        os.utime(path)
+        return value
+
+    # Function to delete the least recently used disk entries above disk_max_bytes
+    def _trim_disk(self):
+        files = []
+        for name in os.listdir(self.disk_dir):
+            if name.endswith(".pkl"):
+                path = os.path.join(self.disk_dir, name)
+                stat = os.stat(path)
+                files.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            os.remove(path)
+            total -= size
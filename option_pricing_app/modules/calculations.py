@@ -1,5 +1,7 @@
 import numpy as np
-from scipy.stats import norm
+from scipy.special import ndtr
+
+SQRT_2PI = np.sqrt(2 * np.pi)
 
 
 # Function to calculate d1
@@ -12,71 +14,92 @@ def d2(S, K, T, r, sigma):
     return d1(S, K, T, r, sigma) - sigma * np.sqrt(T)
 
 
+# Function to calculate prices and Greeks of calls and puts in a single pass.
+# d1/d2 and their pdf/cdf are evaluated once; all inputs broadcast against each other,
+# so any mix of scalars and arrays (e.g. spot x vol x time grids) is accepted.
+def greeks(S, K, T, r, sigma):
+    sqrt_T = np.sqrt(T)
+    sigma_sqrt_T = sigma * sqrt_T
+    d1_val = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / sigma_sqrt_T
+    d2_val = d1_val - sigma_sqrt_T
+    pdf_d1 = np.exp(-0.5 * d1_val**2) / SQRT_2PI
+    cdf_d1 = ndtr(d1_val)
+    cdf_d2 = ndtr(d2_val)
+    cdf_minus_d1 = ndtr(-d1_val)
+    cdf_minus_d2 = ndtr(-d2_val)
+    discounted_K = K * np.exp(-r * T)
+    theta_decay = -S * pdf_d1 * sigma / (2 * sqrt_T)
+    return {
+        "call_price": S * cdf_d1 - discounted_K * cdf_d2,
+        "put_price": discounted_K * cdf_minus_d2 - S * cdf_minus_d1,
+        "call_delta": cdf_d1,
+        "put_delta": cdf_d1 - 1,
+        "gamma": pdf_d1 / (S * sigma_sqrt_T),
+        # Vega and rho per 1% move, theta per day
+        "vega": S * pdf_d1 * sqrt_T / 100,
+        "call_theta": (theta_decay - r * discounted_K * cdf_d2) / 365,
+        "put_theta": (theta_decay + r * discounted_K * cdf_minus_d2) / 365,
+        "call_rho": T * discounted_K * cdf_d2 / 100,
+        "put_rho": -T * discounted_K * cdf_minus_d2 / 100,
+    }
+
+
+# Function to calculate Black-Scholes prices of calls (is_call True) and puts at once,
+# as w * (S N(w d1) - K exp(-rT) N(w d2)) with w = +1 for calls and -1 for puts
+def black_scholes_price(S, K, T, r, sigma, is_call):
+    sigma_sqrt_T = sigma * np.sqrt(T)
+    d1_val = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / sigma_sqrt_T
+    w = np.where(is_call, 1.0, -1.0)
+    return w * (
+        S * ndtr(w * d1_val) - K * np.exp(-r * T) * ndtr(w * (d1_val - sigma_sqrt_T))
+    )
+
+
 # Function to calculate call option price
 def call_price(S, K, T, r, sigma):
-    return S * norm.cdf(d1(S, K, T, r, sigma)) - K * np.exp(-r * T) * norm.cdf(
-        d2(S, K, T, r, sigma)
-    )
+    return greeks(S, K, T, r, sigma)["call_price"]
 
 
 # Function to calculate put option price
 def put_price(S, K, T, r, sigma):
-    return K * np.exp(-r * T) * norm.cdf(-d2(S, K, T, r, sigma)) - S * norm.cdf(
-        -d1(S, K, T, r, sigma)
-    )
+    return greeks(S, K, T, r, sigma)["put_price"]
 
 
 # Function to calculate call delta
 def call_delta(S, K, T, r, sigma):
-    return norm.cdf(d1(S, K, T, r, sigma))
+    return greeks(S, K, T, r, sigma)["call_delta"]
 
 
 # Function to calculate put delta
 def put_delta(S, K, T, r, sigma):
-    return call_delta(S, K, T, r, sigma) - 1
+    return greeks(S, K, T, r, sigma)["put_delta"]
 
 
 # Function to calculate gamma
 def gamma(S, K, T, r, sigma):
-    return norm.pdf(d1(S, K, T, r, sigma)) / (S * sigma * np.sqrt(T))
+    return greeks(S, K, T, r, sigma)["gamma"]
 
 
 # Function to calculate vega
 def vega(S, K, T, r, sigma):
-    return (
-        S * norm.pdf(d1(S, K, T, r, sigma)) * np.sqrt(T) / 100
-    )  # Divide by 100 to get vega in percentage
+    return greeks(S, K, T, r, sigma)["vega"]
 
 
 # Function to calculate call theta
 def call_theta(S, K, T, r, sigma):
-    d1_val = d1(S, K, T, r, sigma)
-    d2_val = d2(S, K, T, r, sigma)
-    term1 = -S * norm.pdf(d1_val) * sigma / (2 * np.sqrt(T))
-    term2 = r * K * np.exp(-r * T) * norm.cdf(d2_val)
-    return (term1 - term2) / 365  # Divide by 365 to get theta per day
+    return greeks(S, K, T, r, sigma)["call_theta"]
 
 
 # Function to calculate put theta
 def put_theta(S, K, T, r, sigma):
-    d1_val = d1(S, K, T, r, sigma)
-    d2_val = d2(S, K, T, r, sigma)
-    term1 = -S * norm.pdf(d1_val) * sigma / (2 * np.sqrt(T))
-    term2 = r * K * np.exp(-r * T) * norm.cdf(-d2_val)
-    return (term1 + term2) / 365  # Divide by 365 to get theta per day
+    return greeks(S, K, T, r, sigma)["put_theta"]
 
 
 # Function to calculate call rho
 def call_rho(S, K, T, r, sigma):
-    d2_val = d2(S, K, T, r, sigma)
-    return (
-        K * T * np.exp(-r * T) * norm.cdf(d2_val) / 100
-    )  # Divide by 100 to get rho in percentage
+    return greeks(S, K, T, r, sigma)["call_rho"]
 
 
 # Function to calculate put rho
 def put_rho(S, K, T, r, sigma):
-    d2_val = d2(S, K, T, r, sigma)
-    return (
-        -K * T * np.exp(-r * T) * norm.cdf(-d2_val) / 100
-    )  # Divide by 100 to get rho in percentage
+    return greeks(S, K, T, r, sigma)["put_rho"]
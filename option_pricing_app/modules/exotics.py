@@ -0,0 +1,300 @@
+import numpy as np
+from scipy.special import ndtr
+from modules.pricing import (
+    EuropeanStatistics,
+    add_payoffs,
+    payoff_histogram_edges,
+    streaming_chunk_size,
+)
+from modules.models import draw_normals
+
+EXOTIC_PAYOFFS = ("asian_arithmetic", "asian_geometric", "barrier", "lookback")
+BARRIER_TYPES = ("up-and-out", "up-and-in", "down-and-out", "down-and-in")
+# Per-path arrays of a streamed chunk: normals, log-price, price, the four running
+# aggregates and the call and put payoffs
+AGGREGATE_BUFFERS = 9
+# Additional per-path arrays for the call and put controls of a control variate
+CONTROL_BUFFERS = 2
+# Additional per-path arrays when Greeks are estimated: six more running aggregates
+# plus the temporaries of the Greek contributions
+GREEK_BUFFERS = 16
+
+
+# Running aggregates of a chunk of paths, updated one time step at a time: sums of the
+# prices and log-prices over the monitoring dates t_1..t_N (Asian averages), running
+# maximum and minimum with S0 included (lookbacks, barrier hits) and the last price.
+# With greeks, the aggregates needed by the Monte Carlo Greeks are kept too: sums of
+# S_i log(S_i / S0) and S_i t_i, the steps of the maximum and minimum, the first normal
+# draw and the sum of squared normal draws. Memory is a few arrays of the chunk size
+# whatever the number of steps.
+class PathAggregates:
+    def __init__(self, S0, size, dtype=np.float64, greeks=False):
+        self.S0 = S0
+        self.greeks = greeks
+        names = ["total", "log_total", "maximum", "minimum"]
+        if greeks:
+            names += ["price_log_total", "price_time_total"]
+            names += ["first_normal", "normal_sq_total"]
+        self._buffers = {name: np.empty(size, dtype=dtype) for name in names}
+        if greeks:
+            self._buffers["max_step"] = np.empty(size, dtype=np.intp)
+            self._buffers["min_step"] = np.empty(size, dtype=np.intp)
+        self.reset(size)
+
+    # Function to restart the aggregates for a chunk of size paths, reusing the buffers
+    def reset(self, size):
+        self.num_steps = 0
+        for name, buffer in self._buffers.items():
+            setattr(self, name, buffer[:size])
+            buffer[:size] = self.S0 if name in ("maximum", "minimum") else 0
+        self.terminal = None
+
+    # Function to record the standard normal draws of the next time step
+    def add_normals(self, normals):
+        if self.num_steps == 0:
+            self.first_normal[:] = normals
+        self.normal_sq_total += normals * normals
+
+    # Function to add the prices of the next time step (log_prices being log(S / S0))
+    def update(self, prices, log_prices, time=None):
+        self.num_steps += 1
+        self.total += prices
+        self.log_total += log_prices
+        if self.greeks:
+            self.price_log_total += prices * log_prices
+            self.price_time_total += time * prices
+            np.copyto(self.max_step, self.num_steps, where=prices > self.maximum)
+            np.copyto(self.min_step, self.num_steps, where=prices < self.minimum)
+        np.maximum(self.maximum, prices, out=self.maximum)
+        np.minimum(self.minimum, prices, out=self.minimum)
+        self.terminal = prices
+
+    def arithmetic_average(self):
+        return self.total / self.num_steps
+
+    def geometric_average(self):
+        return self.S0 * np.exp(self.log_total / self.num_steps)
+
+
+# Function to yield the aggregates of num_simulations GBM paths, chunk_size at a time,
+# evolving each chunk step by step so no (num_steps + 1, chunk_size) path array is
+# ever allocated. Normals are drawn row by row in the order generate_scenarios draws
+# its block, so both give the same paths for the same rng. The first
+# num_paths_to_display full paths are yielded with the first chunk (None afterwards).
+# greeks also keeps the aggregates of the Monte Carlo Greeks.
+def iter_path_aggregates(
+    S0,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    chunk_size,
+    rng,
+    num_paths_to_display=10,
+    dtype=np.float64,
+    antithetic=False,
+    moment_matching=False,
+    greeks=False,
+):
+    dt = T / num_steps
+    drift = (r - 0.5 * sigma**2) * dt
+    diffusion = sigma * np.sqrt(dt)
+    normals = np.empty(chunk_size, dtype=dtype)
+    log_prices = np.empty(chunk_size, dtype=dtype)
+    prices = np.empty(chunk_size, dtype=dtype)
+    aggregates = PathAggregates(S0, chunk_size, dtype, greeks)
+
+    done = 0
+    while done < num_simulations:
+        n = min(chunk_size, num_simulations - done)
+        aggregates.reset(n)
+        display_paths = None
+        if done == 0 and num_paths_to_display:
+            display_paths = np.empty((num_steps + 1, min(num_paths_to_display, n)))
+            display_paths[0] = S0
+        log_prices[:n] = 0
+        for step in range(1, num_steps + 1):
+            draw_normals(rng, normals[:n], antithetic, moment_matching)
+            if greeks:
+                aggregates.add_normals(normals[:n])
+            normals[:n] *= diffusion
+            normals[:n] += drift
+            log_prices[:n] += normals[:n]
+            np.exp(log_prices[:n], out=prices[:n])
+            prices[:n] *= S0
+            aggregates.update(prices[:n], log_prices[:n], step * dt)
+            if display_paths is not None:
+                display_paths[step] = prices[: display_paths.shape[1]]
+        yield aggregates, display_paths
+        done += n
+
+
+# Function to compute the call and put payoffs of a chunk from its aggregates. Asian
+# payoffs compare the arithmetic or geometric average with K; barrier payoffs are the
+# vanilla payoffs kept (knock-in) or cancelled (knock-out) once a monitoring date
+# reaches the barrier; lookbacks have a floating strike (S_T - min for the call,
+# max - S_T for the put), so K is not used.
+def exotic_payoffs(aggregates, payoff, K, barrier=None, barrier_type="up-and-out"):
+    if payoff == "lookback":
+        return (
+            aggregates.terminal - aggregates.minimum,
+            aggregates.maximum - aggregates.terminal,
+        )
+    if payoff == "asian_arithmetic":
+        underlying = aggregates.arithmetic_average()
+    elif payoff == "asian_geometric":
+        underlying = aggregates.geometric_average()
+    else:
+        underlying = aggregates.terminal
+    call_payoffs = np.maximum(underlying - K, 0)
+    put_payoffs = np.maximum(K - underlying, 0)
+    if payoff == "barrier":
+        if barrier_type.startswith("up"):
+            hit = aggregates.maximum >= barrier
+        else:
+            hit = aggregates.minimum <= barrier
+        if barrier_type.endswith("out"):
+            hit = ~hit
+        call_payoffs *= hit
+        put_payoffs *= hit
+    return call_payoffs, put_payoffs
+
+
+# Function to compute fixed histogram edges for the payoffs of an exotic option. Asian
+# and barrier payoffs are bounded like the vanilla ones; lookback payoffs span the
+# +/- 6 standard deviation range of the terminal price.
+def exotic_histogram_edges(S0, K, r, sigma, T, payoff, bins=50):
+    if payoff != "lookback":
+        return payoff_histogram_edges(S0, K, r, sigma, T, bins)
+    mean_log = np.log(S0) + (r - 0.5 * sigma**2) * T
+    spread = 6 * sigma * np.sqrt(T)
+    edges = np.linspace(
+        0, np.exp(mean_log + spread) - np.exp(mean_log - spread), bins + 1
+    )
+    return edges, edges.copy()
+
+
+# Function to price path-dependent calls and puts by streaming Monte Carlo. Payoffs
+# are evaluated from running aggregates updated during path generation, so memory is
+# O(chunk_size) with chunks sized from memory_budget (bytes) independently of
+# num_steps. Monitoring is discrete, on the simulation time steps. Antithetic pairs and
+# moment matching work as in price_european_streaming; results have the same format
+# (prices, standard errors, payoff histograms, display paths). progress, when given,
+# is called as progress(done, num_simulations) after every chunk. greeks, when given
+# (see mc_greeks.MonteCarloGreeks), is updated in the same pass and its estimates are
+# added to the result. control_variate "geometric_asian" uses the geometric Asian
+# payoffs of the same paths, whose means are known in closed form, as controls of
+# arithmetic Asian payoffs.
+def price_exotic_streaming(
+    S0,
+    K,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    payoff="asian_arithmetic",
+    barrier=None,
+    barrier_type="up-and-out",
+    memory_budget=64 * 2**20,
+    num_paths_to_display=10,
+    bins=50,
+    dtype=np.float64,
+    seed=None,
+    antithetic=False,
+    moment_matching=False,
+    min_batches=16,
+    progress=None,
+    greeks=None,
+    control_variate=None,
+):
+    if payoff not in EXOTIC_PAYOFFS:
+        raise ValueError(f"payoff must be one of {EXOTIC_PAYOFFS}")
+    if control_variate not in (None, "geometric_asian"):
+        raise ValueError("control_variate must be None or 'geometric_asian'")
+    if control_variate is not None and payoff != "asian_arithmetic":
+        raise ValueError("The geometric_asian control needs an asian_arithmetic payoff")
+    if payoff == "barrier":
+        if barrier_type not in BARRIER_TYPES:
+            raise ValueError(f"barrier_type must be one of {BARRIER_TYPES}")
+        if barrier is None:
+            raise ValueError("Barrier payoffs need a barrier level")
+    num_simulations, chunk_size = streaming_chunk_size(
+        memory_budget,
+        num_steps,
+        num_simulations,
+        dtype,
+        True,
+        antithetic,
+        moment_matching,
+        min_batches,
+        AGGREGATE_BUFFERS
+        + (0 if greeks is None else GREEK_BUFFERS)
+        + (0 if control_variate is None else CONTROL_BUFFERS),
+    )
+    call_edges, put_edges = exotic_histogram_edges(S0, K, r, sigma, T, payoff, bins)
+    call_mean = put_mean = None
+    if control_variate is not None:
+        growth = np.exp(r * T)
+        call_mean = geometric_asian_price(S0, K, T, r, sigma, num_steps) * growth
+        put_mean = geometric_asian_price(S0, K, T, r, sigma, num_steps, False) * growth
+    stats = EuropeanStatistics(
+        call_mean, put_mean, moment_matching, call_edges, put_edges
+    )
+    done = 0
+    for aggregates, display_paths in iter_path_aggregates(
+        S0,
+        r,
+        sigma,
+        T,
+        num_steps,
+        num_simulations,
+        chunk_size,
+        np.random.default_rng(seed),
+        num_paths_to_display,
+        dtype,
+        antithetic,
+        moment_matching,
+        greeks is not None,
+    ):
+        if display_paths is not None:
+            stats.price_paths = display_paths
+        if greeks is not None:
+            greeks.update(aggregates, antithetic)
+        call_payoffs, put_payoffs = exotic_payoffs(
+            aggregates, payoff, K, barrier, barrier_type
+        )
+        call_controls = put_controls = None
+        if control_variate is not None:
+            call_controls, put_controls = exotic_payoffs(
+                aggregates, "asian_geometric", K
+            )
+        add_payoffs(
+            stats, call_payoffs, put_payoffs, call_controls, put_controls, antithetic
+        )
+        done += aggregates.terminal.size
+        if progress is not None:
+            progress(done, num_simulations)
+    result = stats.result(r, T)
+    result["num_simulations"] = num_simulations
+    result["chunk_size"] = chunk_size
+    if greeks is not None:
+        result.update(greeks.result())
+    return result
+
+
+# Function to calculate the closed-form price of a geometric Asian call (is_call True)
+# or put averaging the prices at the num_steps dates t_i = i T / num_steps
+def geometric_asian_price(S0, K, T, r, sigma, num_steps, is_call=True):
+    dt = T / num_steps
+    mean = np.log(S0) + (r - 0.5 * sigma**2) * dt * (num_steps + 1) / 2
+    variance = sigma**2 * dt * (num_steps + 1) * (2 * num_steps + 1) / (6 * num_steps)
+    d2 = (mean - np.log(K)) / np.sqrt(variance)
+    d1 = d2 + np.sqrt(variance)
+    w = 1 if is_call else -1
+    return (
+        np.exp(-r * T)
+        * w
+        * (np.exp(mean + variance / 2) * ndtr(w * d1) - K * ndtr(w * d2))
+    )
@@ -0,0 +1,195 @@
+import numpy as np
+from scipy.special import ndtr
+from modules.calculations import SQRT_2PI
+
+# Per-quote solver status, reported as indices into IV_STATUS
+IV_STATUS = (
+    "converged",
+    "max_iterations",
+    "below_intrinsic",
+    "above_upper_bound",
+    "out_of_range",
+    "invalid_input",
+    "no_time_value",
+)
+CONVERGED, MAX_ITERATIONS, BELOW_INTRINSIC, ABOVE_UPPER_BOUND = 0, 1, 2, 3
+OUT_OF_RANGE, INVALID_INPUT, NO_TIME_VALUE = 4, 5, 6
+# In-the-money quotes are solved from their time value, price minus the parity
+# value; below this many float spacings of the price it has lost almost all of its
+# digits and no volatility can be recovered from it
+MIN_TIME_VALUE_ULPS = 256
+
+
+# Function to calculate Black-Scholes prices, vegas (per unit of volatility, the vega
+# of calculations.greeks times 100) and volgas of out-of-the-money quotes, the terms
+# of a Halley step on sigma. Quotes are given by log_moneyness = ln(S / K exp(-rT)),
+# sqrt_T and w = +1 for calls, -1 for puts, all precomputed once per chain.
+def _price_vega_volga(S, discounted_K, log_moneyness, sqrt_T, w, sigma):
+    sigma_sqrt_T = sigma * sqrt_T
+    d1_val = log_moneyness / sigma_sqrt_T + 0.5 * sigma_sqrt_T
+    d2_val = d1_val - sigma_sqrt_T
+    price = w * (S * ndtr(w * d1_val) - discounted_K * ndtr(w * d2_val))
+    vega = S * sqrt_T * np.exp(-0.5 * d1_val**2) / SQRT_2PI
+    return price, vega, vega * d1_val * d2_val / sigma
+
+
+# Function to compute initial guesses of sigma * sqrt(T) from out-of-the-money prices
+# normalized by sqrt(S K exp(-rT)) and absolute log-moneyness x = |ln(S / K exp(-rT))|.
+# Near the money the rational approximation of Corrado and Miller is used (falling
+# back to the inflection point sqrt(2 x) where its square root is negative). Far out
+# of the money it degrades, so there the leading asymptotic term of the normalized
+# price, b ~ s^3 / (sqrt(2 pi) x^2) exp(-x^2 / (2 s^2) - s^2 / 8), is inverted by one
+# fixed-point step from s = x / sqrt(-2 ln b).
+def initial_guess(normalized_price, log_moneyness):
+    b, x = normalized_price, np.abs(log_moneyness)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Corrado-Miller on the in-the-money call of normalized intrinsic value
+        # 2 sinh(x / 2); its excess over half the intrinsic value is b + sinh(x / 2)
+        half_intrinsic = np.sinh(0.5 * x)
+        excess = b + half_intrinsic
+        root = excess**2 - 4 * half_intrinsic**2 / np.pi
+        near = (
+            np.sqrt(2 * np.pi)
+            / (2 * np.cosh(0.5 * x))
+            * (excess + np.sqrt(np.maximum(root, 0)))
+        )
+        near = np.where(root >= 0, near, np.sqrt(2 * x))
+        log_b = -np.log(b)
+        far = x / np.sqrt(2 * log_b)
+        far = x / np.sqrt(
+            2 * (log_b + np.log(far**3 / (SQRT_2PI * x**2))) - 0.25 * far**2
+        )
+    use_far = (x > far) & np.isfinite(far) & (far > 0)
+    return np.where(use_far, far, near)
+
+
+# Function to iterate one block of out-of-the-money quotes (see implied_volatility),
+# writing volatilities, statuses and iteration counts at their chain positions
+def _solve_block(
+    quotes, sigma, status, iterations, tol, max_iter, sigma_min, sigma_max
+):
+    for iteration in range(1, max_iter + 1):
+        if quotes["index"].size == 0:
+            break
+        current, low, high = quotes["sigma"], quotes["low"], quotes["high"]
+        model, vega, volga = _price_vega_volga(
+            quotes["S"],
+            quotes["discounted_K"],
+            quotes["log_moneyness"],
+            quotes["sqrt_T"],
+            quotes["w"],
+            current,
+        )
+        # Prices increase with sigma, so the sign of the error tightens the bracket
+        too_high = model > quotes["target"]
+        np.copyto(high, current, where=too_high)
+        np.copyto(low, current, where=~too_high)
+        # Halley step on log(price), nearly linear in sigma far out of the money
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            slope = vega / model
+            newton = np.log(model / quotes["target"]) / slope
+            curvature = volga / model - slope**2
+            denominator = 1 - 0.5 * newton * curvature / slope
+            candidate = current - np.where(
+                denominator > 0.5, newton / denominator, newton
+            )
+        outside = ~((candidate >= low) & (candidate <= high))
+        candidate[outside] = 0.5 * (low[outside] + high[outside])
+
+        done = (np.abs(candidate - current) < tol) | (high - low < tol)
+        # A root pinned to the search bounds means the price needs a volatility
+        # outside [sigma_min, sigma_max]
+        pinned = done & ~(np.abs(newton) < tol)
+        pinned &= (candidate - sigma_min < tol) | (sigma_max - candidate < tol)
+        converged = done & ~pinned
+        sigma[quotes["index"][converged]] = candidate[converged]
+        status[quotes["index"][converged]] = CONVERGED
+        status[quotes["index"][pinned]] = OUT_OF_RANGE
+        iterations[quotes["index"]] = iteration
+
+        quotes["sigma"] = candidate
+        quotes = {name: values[~done] for name, values in quotes.items()}
+
+
+# Function to back out Black-Scholes implied volatilities of a whole chain of quotes
+# at once. All inputs broadcast against each other (is_call True for calls, False for
+# puts). Quotes outside the no-arbitrage bounds are masked out up front; the others
+# are solved on their out-of-the-money side (put-call parity), where prices keep
+# their relative precision; in-the-money quotes whose out-of-the-money value is lost
+# in the rounding of their price are flagged "no_time_value". Each iteration takes a Halley step on log(price) for
+# every unconverged quote of a block of block_size quotes (sized to stay in cache);
+# steps leaving the bracket [low, high] known to contain the root fall back to
+# bisection, and converged quotes leave the arrays. Returns the volatilities (NaN
+# where not converged), the per-quote status (indices into IV_STATUS) and the
+# iteration counts.
+def implied_volatility(
+    price,
+    S,
+    K,
+    T,
+    r,
+    is_call=True,
+    tol=1e-10,
+    max_iter=50,
+    sigma_min=1e-4,
+    sigma_max=5.0,
+    block_size=2**15,
+):
+    price, S, K, T, r, is_call = np.broadcast_arrays(
+        *(np.asarray(value, dtype=np.float64) for value in (price, S, K, T, r)),
+        np.asarray(is_call, dtype=bool),
+    )
+    shape = price.shape
+    price, S, K, T, r, is_call = (
+        value.ravel() for value in (price, S, K, T, r, is_call)
+    )
+    sigma = np.full(price.size, np.nan)
+    status = np.full(price.size, MAX_ITERATIONS, dtype=np.int8)
+    iterations = np.zeros(price.size, dtype=np.int32)
+
+    valid = np.isfinite(price) & (S > 0) & (K > 0) & (T > 0) & np.isfinite(r)
+    status[~valid] = INVALID_INPUT
+    with np.errstate(invalid="ignore", divide="ignore", over="ignore"):
+        discounted_K = K * np.exp(-r * T)
+        forward_value = S - discounted_K
+        lower_bound = np.maximum(np.where(is_call, forward_value, -forward_value), 0)
+        upper_bound = np.where(is_call, S, discounted_K)
+    below = valid & (price <= lower_bound)
+    above = valid & ~below & (price >= upper_bound)
+    status[below] = BELOW_INTRINSIC
+    status[above] = ABOVE_UPPER_BOUND
+
+    solvable = np.flatnonzero(valid & ~below & ~above)
+    for start in range(0, solvable.size, block_size):
+        index = solvable[start : start + block_size]
+        calls = forward_value[index] < 0
+        parity = np.where(calls == is_call[index], 0, np.abs(forward_value[index]))
+        target = price[index] - parity
+        lost = (parity > 0) & (target < MIN_TIME_VALUE_ULPS * np.spacing(price[index]))
+        status[index[lost]] = NO_TIME_VALUE
+        index, calls, target = index[~lost], calls[~lost], target[~lost]
+        block_S, block_K, block_T = S[index], discounted_K[index], T[index]
+        log_moneyness = np.log(block_S / block_K)
+        sqrt_T = np.sqrt(block_T)
+        guess = initial_guess(target / np.sqrt(block_S * block_K), log_moneyness)
+        quotes = {
+            "index": index,
+            "S": block_S,
+            "discounted_K": block_K,
+            "log_moneyness": log_moneyness,
+            "sqrt_T": sqrt_T,
+            "w": np.where(calls, 1.0, -1.0),
+            "target": target,
+            "low": np.full(index.size, sigma_min),
+            "high": np.full(index.size, sigma_max),
+            "sigma": np.clip(guess / sqrt_T, sigma_min, sigma_max),
+        }
+        _solve_block(
+            quotes, sigma, status, iterations, tol, max_iter, sigma_min, sigma_max
+        )
+
+    return {
+        "sigma": sigma.reshape(shape),
+        "status": status.reshape(shape),
+        "iterations": iterations.reshape(shape),
+    }
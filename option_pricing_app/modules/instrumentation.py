@@ -0,0 +1,214 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+import numpy as np
+
+LOCAL_ADDRESSES = ("127.0.0.1", "::1", "localhost")
+
+
+# Rolling wall-time (and optional tracemalloc peak-memory) samples per named stage,
+# keeping the last window samples of each. Stages may nest: an outer stage's peak
+# includes the peaks of the stages it contains. tracemalloc is process-wide, so
+# peaks of stages running concurrently in several threads overlap.
+class StageMetrics:
+    def __init__(self, window=1000, trace_memory=False):
+        self.window = window
+        self.trace_memory = trace_memory
+        self._samples = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def record(self, name, seconds, peak_bytes=None):
+        with self._lock:
+            if name not in self._samples:
+                self._samples[name] = {
+                    "count": 0,
+                    "seconds": deque(maxlen=self.window),
+                    "peak_bytes": deque(maxlen=self.window),
+                }
+            samples = self._samples[name]
+            samples["count"] += 1
+            samples["seconds"].append(seconds)
+            if peak_bytes is not None:
+                samples["peak_bytes"].append(peak_bytes)
+
+    # Context manager timing the enclosed block as one sample of stage name
+    @contextmanager
+    def stage(self, name):
+        tracing = self.trace_memory
+        if tracing and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        stack = self._local.__dict__.setdefault("stack", [])
+        if tracing:
+            current, peak = tracemalloc.get_traced_memory()
+            if stack:
+                # Keep the enclosing stage's peak before resetting it for this one
+                stack[-1][1] = max(stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            stack.append([current, current])
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            peak_bytes = None
+            if tracing:
+                baseline, inner_peak = stack.pop()
+                peak = max(tracemalloc.get_traced_memory()[1], inner_peak)
+                peak_bytes = peak - baseline
+                if stack:
+                    stack[-1][1] = max(stack[-1][1], peak)
+            self.record(name, seconds, peak_bytes)
+
+    # Decorator timing every call of the wrapped function as stage name
+    def timed(self, name):
+        def decorator(function):
+            @wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return function(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    # Function to summarize every stage: call count and mean, percentiles and maximum
+    # of the rolling wall times (seconds) and, when traced, of the peak memory (bytes)
+    def summary(self, percentiles=(50, 90, 99)):
+        with self._lock:
+            samples = {
+                name: (
+                    stage["count"],
+                    list(stage["seconds"]),
+                    list(stage["peak_bytes"]),
+                )
+                for name, stage in self._samples.items()
+            }
+        summary = {}
+        for name, (count, seconds, peak_bytes) in sorted(samples.items()):
+            seconds = np.asarray(seconds)
+            stage = {
+                "count": count,
+                "mean": float(seconds.mean()),
+                "max": float(seconds.max()),
+                "last": float(seconds[-1]),
+            }
+            for percentile, value in zip(
+                percentiles, np.percentile(seconds, percentiles)
+            ):
+                stage[f"p{percentile}"] = float(value)
+            if peak_bytes:
+                stage["peak_memory_p50"] = float(np.percentile(peak_bytes, 50))
+                stage["peak_memory_max"] = int(max(peak_bytes))
+            summary[name] = stage
+        return summary
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+# On-demand cProfile capture of a single request: arm() profiles the next callback
+# request; the report of the last capture is kept as text (and written to output_dir
+# when given)
+class RequestProfiler:
+    def __init__(self, output_dir=None, limit=40):
+        self.output_dir = output_dir
+        self.limit = limit
+        self.report = None
+        self._armed = False
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def arm(self):
+        with self._lock:
+            self._armed = True
+
+    def start(self):
+        with self._lock:
+            if not self._armed:
+                return
+            self._armed = False
+        self._local.profile = cProfile.Profile()
+        self._local.profile.enable()
+
+    def stop(self, label):
+        profile = getattr(self._local, "profile", None)
+        if profile is None:
+            return
+        profile.disable()
+        self._local.profile = None
+        stream = io.StringIO()
+        stats = pstats.Stats(profile, stream=stream)
+        stats.sort_stats("cumulative").print_stats(self.limit)
+        self.report = f"{label}\n{stream.getvalue()}"
+        if self.output_dir is not None:
+            os.makedirs(self.output_dir, exist_ok=True)
+            stats.dump_stats(
+                os.path.join(self.output_dir, f"profile_{int(time.time())}.prof")
+            )
+
+
+# Function to label a Dash callback request by the output(s) it updates
+def request_label(request):
+    payload = request.get_json(silent=True) or {}
+    return f"request:{payload.get('output', request.path)}"
+
+
+# Function to add instrumentation routes and request hooks to a Flask server:
+# every Dash callback request is timed (callback plus JSON serialization) and may be
+# profiled, except requests updating outputs listed in ignore (e.g. the debug panel
+# polling itself). /metrics serves the metrics summary as JSON and /debug/profile
+# arms (POST) or shows (GET) a single-request cProfile capture; both routes answer
+# local clients only.
+def register_instrumentation(server, metrics, profiler=None, ignore=()):
+    from flask import abort, g, jsonify, request
+
+    profiler = profiler or RequestProfiler()
+
+    def require_local():
+        if request.remote_addr not in LOCAL_ADDRESSES:
+            abort(403)
+
+    @server.before_request
+    def start_request_timer():
+        if not request.path.startswith("/_dash-update-component"):
+            return
+        label = request_label(request)
+        if any(output in label for output in ignore):
+            return
+        g.instrumentation = (label, time.perf_counter())
+        profiler.start()
+
+    @server.after_request
+    def stop_request_timer(response):
+        instrumentation = g.pop("instrumentation", None)
+        if instrumentation is not None:
+            label, start = instrumentation
+            metrics.record(label, time.perf_counter() - start)
+            profiler.stop(label)
+        return response
+
+    @server.route("/metrics")
+    def metrics_endpoint():
+        require_local()
+        return jsonify(metrics.summary())
+
+    @server.route("/debug/profile", methods=["GET", "POST"])
+    def profile_endpoint():
+        require_local()
+        if request.method == "POST":
+            profiler.arm()
+            return jsonify({"armed": True})
+        return server.response_class(
+            profiler.report or "No profile captured yet", mimetype="text/plain"
+        )
+
+    return profiler
@@ -0,0 +1,184 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_STATES = ("queued", "running", "done", "failed", "cancelled")
+ACTIVE_STATES = ("queued", "running")
+
+
+# Raised inside a job by its progress callback once the job has been cancelled
+class JobCancelled(Exception):
+    pass
+
+
+# Progress callback handed to a running job: progress(done, total, estimate) records
+# how far the job got (estimate is any JSON-serializable value, e.g. the running
+# price) and raises JobCancelled when the job was cancelled, so long loops that
+# report progress also stop at that point. Writes to the job table are throttled to
+# one every min_interval seconds.
+class JobProgress:
+    def __init__(self, manager, job_id, min_interval=0.2):
+        self.manager = manager
+        self.job_id = job_id
+        self.min_interval = min_interval
+        self._last_write = 0.0
+
+    def __call__(self, done, total, estimate=None):
+        now = time.monotonic()
+        if now - self._last_write >= self.min_interval or done >= total:
+            self._last_write = now
+            self.manager._update(
+                self.job_id,
+                done=int(done),
+                total=int(total),
+                estimate=json.dumps(estimate),
+            )
+        if self.manager.cancelled(self.job_id):
+            raise JobCancelled(self.job_id)
+
+
+# Background jobs run on a local thread pool, keeping long simulations and exports
+# off the Dash request threads. Job state lives in a SQLite table (path may be a file
+# shared by several app processes, or ":memory:"), so status, progress and
+# cancellation requests can be read and written from any callback. A job is a
+# function called as function(progress, *args) whose JSON-serializable return value
+# is stored as the job result; submitting the key of a job still queued or running
+# returns that job instead of starting another one.
+class JobManager:
+    def __init__(self, path=":memory:", max_workers=1, max_age=3600):
+        self.max_age = max_age
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._cancelled = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="job"
+        )
+        with self._lock, self._connection:
+            self._connection.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    kind TEXT,
+                    key TEXT,
+                    status TEXT,
+                    done INTEGER DEFAULT 0,
+                    total INTEGER DEFAULT 0,
+                    estimate TEXT,
+                    result TEXT,
+                    error TEXT,
+                    cancel_requested INTEGER DEFAULT 0,
+                    created REAL,
+                    updated REAL
+                )
+                """)
+
+    def _update(self, job_id, **fields):
+        fields["updated"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._lock, self._connection:
+            self._connection.execute(
+                f"UPDATE jobs SET {assignments} WHERE id = ?",
+                (*fields.values(), job_id),
+            )
+
+    def submit(self, kind, key, function, *args):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM jobs WHERE status NOT IN (?, ?) AND updated < ?",
+                (*ACTIVE_STATES, now - self.max_age),
+            )
+            row = self._connection.execute(
+                "SELECT id FROM jobs WHERE key = ? AND status IN (?, ?) "
+                "AND cancel_requested = 0",
+                (key, *ACTIVE_STATES),
+            ).fetchone()
+            if row is not None:
+                return row[0]
+            job_id = uuid.uuid4().hex
+            self._connection.execute(
+                "INSERT INTO jobs (id, kind, key, status, created, updated) "
+                "VALUES (?, ?, ?, 'queued', ?, ?)",
+                (job_id, kind, key, now, now),
+            )
+        self._executor.submit(self._run, job_id, function, args)
+        return job_id
+
+    def _run(self, job_id, function, args):
+        if self.cancelled(job_id):
+            self._update(job_id, status="cancelled")
+            return
+        self._update(job_id, status="running")
+        try:
+            result = function(JobProgress(self, job_id), *args)
+        except JobCancelled:
+            self._update(job_id, status="cancelled")
+        except Exception as error:
+            self._update(
+                job_id, status="failed", error=f"{type(error).__name__}: {error}"
+            )
+        else:
+            self._update(job_id, status="done", result=json.dumps(result))
+        finally:
+            with self._lock:
+                self._cancelled.discard(job_id)
+
+    # Function to return the state of a job as a dict (None for unknown jobs)
+    def get(self, job_id):
+        with self._lock:
+            cursor = self._connection.execute(
+                "SELECT * FROM jobs WHERE id = ?", (job_id,)
+            )
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            job = dict(zip([column[0] for column in cursor.description], row))
+        for name in ("estimate", "result"):
+            job[name] = None if job[name] is None else json.loads(job[name])
+        job["cancel_requested"] = bool(job["cancel_requested"])
+        return job
+
+    # Function to request the cancellation of a job. Queued jobs never start; running
+    # jobs stop at their next progress report.
+    def cancel(self, job_id):
+        with self._lock, self._connection:
+            cursor = self._connection.execute(
+                "UPDATE jobs SET cancel_requested = 1, updated = ? "
+                "WHERE id = ? AND status IN (?, ?)",
+                (time.time(), job_id, *ACTIVE_STATES),
+            )
+            if cursor.rowcount:
+                self._cancelled.add(job_id)
+
+    # Function to tell whether cancellation of a job was requested, by this process
+    # or (through the job table) by another one
+    def cancelled(self, job_id):
+        with self._lock:
+            if job_id in self._cancelled:
+                return True
+            row = self._connection.execute(
+                "SELECT cancel_requested FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return bool(row and row[0])
+
+    # Function to cancel every active job and stop the pool without waiting
+    def shutdown(self):
+        with self._lock:
+            active = [
+                row[0]
+                for row in self._connection.execute(
+                    "SELECT id FROM jobs WHERE status IN (?, ?)", ACTIVE_STATES
+                )
+            ]
+        for job_id in active:
+            self.cancel(job_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        # Queued jobs dropped by the pool never reach _run
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE jobs SET status = 'cancelled', updated = ? "
+                "WHERE status = 'queued'",
+                (time.time(),),
+            )
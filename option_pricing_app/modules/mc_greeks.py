@@ -0,0 +1,212 @@
+import numpy as np
+from modules.exotics import EXOTIC_PAYOFFS, exotic_payoffs
+from modules.pricing import VarianceReducedEstimator, estimator_units
+
+GREEK_NAMES = ("delta", "gamma", "vega", "rho", "theta")
+# Reported units, as in calculations.greeks: vega and rho per 1% move, theta per day
+GREEK_SCALES = {"delta": 1.0, "gamma": 1.0, "vega": 0.01, "rho": 0.01, "theta": 1 / 365}
+
+
+# Monte Carlo Greeks of calls and puts estimated from the same paths as the price, one
+# streaming estimator (with its standard error) per option type and Greek. Chunks are
+# either terminal prices (payoff "european") or exotics.PathAggregates.
+# Pathwise estimators are used where the payoff is continuous in the path (European,
+# Asian, lookback): each path contributes the derivative of its discounted payoff,
+# through dS_i/dS0 = S_i / S0, dS_i/dsigma = S_i (log(S_i / S0) - (r + sigma^2/2) t_i)
+# / sigma, dS_i/dr = S_i t_i and dS_i/dT = S_i (log(S_i / S0) + (r - sigma^2/2) t_i)
+# / (2T) (the time grid scales with T). Gamma applies the likelihood ratio of the first
+# step to the pathwise delta. Barrier payoffs are discontinuous, so all their Greeks
+# are likelihood-ratio estimators: the payoff times the score of the path density.
+# Scores assume i.i.d. normal draws; with moment matching they are approximate.
+class MonteCarloGreeks:
+    def __init__(
+        self,
+        S0,
+        K,
+        r,
+        sigma,
+        T,
+        payoff="european",
+        barrier=None,
+        barrier_type="up-and-out",
+        batch_means=False,
+    ):
+        if payoff != "european" and payoff not in EXOTIC_PAYOFFS:
+            raise ValueError(f"payoff must be 'european' or one of {EXOTIC_PAYOFFS}")
+        self.S0 = S0
+        self.K = K
+        self.r = r
+        self.sigma = sigma
+        self.T = T
+        self.payoff = payoff
+        self.barrier = barrier
+        self.barrier_type = barrier_type
+        self.estimators = {
+            (option_type, greek): VarianceReducedEstimator(None, batch_means)
+            for option_type in ("call", "put")
+            for greek in GREEK_NAMES
+        }
+
+    # Function to add the Greek contributions of a chunk, one Greek at a time so only a
+    # few temporaries of the chunk size are alive at once
+    def update(self, chunk, antithetic=False):
+        if self.payoff == "european":
+            contributions = self._european(chunk)
+        elif self.payoff == "barrier":
+            contributions = self._likelihood_ratio(chunk)
+        else:
+            contributions = self._pathwise(chunk)
+        for key, values in contributions:
+            estimator = self.estimators[key]
+            estimator.update(values, estimator_units(values, None, antithetic)[0])
+
+    def merge(self, other):
+        for key, estimator in self.estimators.items():
+            estimator.merge(other.estimators[key])
+
+    # Function to return the Greeks and their standard errors, e.g. "call_delta" and
+    # "call_delta_std_error"
+    def result(self):
+        result = {}
+        for (option_type, greek), estimator in self.estimators.items():
+            estimate = estimator.result(GREEK_SCALES[greek])
+            result[f"{option_type}_{greek}"] = estimate["price"]
+            result[f"{option_type}_{greek}_std_error"] = estimate["std_error"]
+        return result
+
+    # Function to compute S * dlog(S)/dtheta for prices S observed at times t (with
+    # log_prices = log(S / S0)), for theta in S0, sigma, r and T
+    def _sensitivities(self, prices, log_prices, times):
+        r, sigma, T = self.r, self.sigma, self.T
+        return {
+            "S0": prices / self.S0,
+            "sigma": prices * (log_prices - (r + 0.5 * sigma**2) * times) / sigma,
+            "r": prices * times,
+            "T": prices * (log_prices + (r - 0.5 * sigma**2) * times) / (2 * T),
+        }
+
+    # Function to yield the pathwise Greeks of discounted payoffs given the payoffs,
+    # derivative(option_type, theta) returning the derivatives of the undiscounted
+    # payoffs, and the first-step score (the likelihood ratio of S0 times S0)
+    def _pathwise_greeks(self, payoffs, derivative, score):
+        discount = np.exp(-self.r * self.T)
+        for option_type in ("call", "put"):
+            delta = discount * derivative(option_type, "S0")
+            yield (option_type, "delta"), delta
+            yield (option_type, "gamma"), delta * (score - 1) / self.S0
+            yield (option_type, "vega"), discount * derivative(option_type, "sigma")
+            yield (option_type, "rho"), discount * (
+                derivative(option_type, "r") - self.T * payoffs[option_type]
+            )
+            yield (option_type, "theta"), -discount * (
+                derivative(option_type, "T") - self.r * payoffs[option_type]
+            )
+
+    # Function to yield the pathwise Greeks of payoffs on an underlying (terminal price
+    # or average) given its sensitivities
+    def _vanilla_greeks(self, underlying, sensitivities, score):
+        payoffs = {
+            "call": np.maximum(underlying - self.K, 0),
+            "put": np.maximum(self.K - underlying, 0),
+        }
+        slopes = {
+            "call": np.where(underlying > self.K, 1.0, 0.0),
+            "put": np.where(underlying < self.K, -1.0, 0.0),
+        }
+        return self._pathwise_greeks(
+            payoffs,
+            lambda option_type, name: slopes[option_type] * sensitivities[name],
+            score,
+        )
+
+    def _european(self, terminal):
+        terminal = np.asarray(terminal, dtype=np.float64)
+        log_prices = np.log(terminal / self.S0)
+        drift = (self.r - 0.5 * self.sigma**2) * self.T
+        score = (log_prices - drift) / (self.sigma**2 * self.T)
+        return self._vanilla_greeks(
+            terminal, self._sensitivities(terminal, log_prices, self.T), score
+        )
+
+    def _pathwise(self, aggregates):
+        num_steps = aggregates.num_steps
+        dt = self.T / num_steps
+        score = aggregates.first_normal / (self.sigma * np.sqrt(dt))
+        if self.payoff == "lookback":
+            terminal = aggregates.terminal
+            extremes = {
+                "terminal": self._sensitivities(
+                    terminal, np.log(terminal / self.S0), self.T
+                ),
+                "maximum": self._sensitivities(
+                    aggregates.maximum,
+                    np.log(aggregates.maximum / self.S0),
+                    aggregates.max_step * dt,
+                ),
+                "minimum": self._sensitivities(
+                    aggregates.minimum,
+                    np.log(aggregates.minimum / self.S0),
+                    aggregates.min_step * dt,
+                ),
+            }
+            payoffs = {
+                "call": terminal - aggregates.minimum,
+                "put": aggregates.maximum - terminal,
+            }
+            # S_T - min for the call, max - S_T for the put
+            legs = {"call": ("terminal", "minimum"), "put": ("maximum", "terminal")}
+            return self._pathwise_greeks(
+                payoffs,
+                lambda option_type, name: extremes[legs[option_type][0]][name]
+                - extremes[legs[option_type][1]][name],
+                score,
+            )
+        if self.payoff == "asian_geometric":
+            average = aggregates.geometric_average()
+            mean_time = self.T * (num_steps + 1) / (2 * num_steps)
+            sensitivities = self._sensitivities(
+                average, aggregates.log_total / num_steps, mean_time
+            )
+            return self._vanilla_greeks(average, sensitivities, score)
+        # Arithmetic average: the sensitivities are averages of the price sensitivities
+        r, sigma = self.r, self.sigma
+        average = aggregates.arithmetic_average()
+        price_log_mean = aggregates.price_log_total / num_steps
+        price_time_mean = aggregates.price_time_total / num_steps
+        sensitivities = {
+            "S0": average / self.S0,
+            "sigma": (price_log_mean - (r + 0.5 * sigma**2) * price_time_mean) / sigma,
+            "r": price_time_mean,
+            "T": (price_log_mean + (r - 0.5 * sigma**2) * price_time_mean)
+            / (2 * self.T),
+        }
+        return self._vanilla_greeks(average, sensitivities, score)
+
+    def _likelihood_ratio(self, aggregates):
+        r, sigma, T = self.r, self.sigma, self.T
+        num_steps = aggregates.num_steps
+        sqrt_dt = np.sqrt(T / num_steps)
+        drift = (r - 0.5 * sigma**2) * T
+        first = aggregates.first_normal
+        # Sum of the normal draws, recovered from the terminal log-price
+        normal_total = (np.log(aggregates.terminal / self.S0) - drift) / (
+            sigma * sqrt_dt
+        )
+        squares = aggregates.normal_sq_total - num_steps
+        scores = {
+            "delta": first / (self.S0 * sigma * sqrt_dt),
+            "gamma": ((first**2 - 1) / (sigma * sqrt_dt) - first)
+            / (self.S0**2 * sigma * sqrt_dt),
+            "vega": squares / sigma - sqrt_dt * normal_total,
+            "rho": sqrt_dt * normal_total / sigma - T,
+            "theta": r
+            - squares / (2 * T)
+            - (r - 0.5 * sigma**2) * sqrt_dt * normal_total / (sigma * T),
+        }
+        call_payoffs, put_payoffs = exotic_payoffs(
+            aggregates, "barrier", self.K, self.barrier, self.barrier_type
+        )
+        discount = np.exp(-r * T)
+        for option_type, payoffs in (("call", call_payoffs), ("put", put_payoffs)):
+            for greek in GREEK_NAMES:
+                yield (option_type, greek), discount * payoffs * scores[greek]
@@ -0,0 +1,219 @@
+import numpy as np
+
+
+# Function to fill out with standard normals along its last axis, optionally as
+# antithetic pairs (column i mirrored in column half + i) and/or moment matched
+# so that each row has exactly zero mean and unit variance. The rows of out may be
+# slices of a wider array (e.g. a block of columns of shared paths); they are then
+# drawn one by one, which takes the same random numbers as one draw in C order.
+def draw_normals(rng, out, antithetic=False, moment_matching=False):
+    if antithetic:
+        n = out.shape[-1]
+        half = (n + 1) // 2
+        first = rng.standard_normal(out.shape[:-1] + (half,), dtype=out.dtype)
+        out[..., :half] = first
+        np.negative(first[..., : n - half], out=out[..., half:])
+    elif out.flags.c_contiguous:
+        rng.standard_normal(out=out, dtype=out.dtype)
+    else:
+        for index in np.ndindex(out.shape[:-1]):
+            rng.standard_normal(out=out[index], dtype=out.dtype)
+    if moment_matching and out.shape[-1] > 1:
+        out -= out.mean(axis=-1, keepdims=True)
+        out /= out.std(axis=-1, keepdims=True)
+    return out
+
+
+# Model kernels simulate log-price increments under the risk-neutral measure. Each
+# kernel fills (num_steps, n) increments for the path generator (fill_increments) and
+# (n,) terminal log-returns log(S_T / S0) without keeping the paths
+# (terminal_log_returns), drawing every random number from rng in the dtype of the
+# output. sigma is the volatility input of the app; antithetic and moment_matching
+# apply to the diffusion normals.
+
+
+# Geometric Brownian motion with constant volatility sigma
+class GBMModel:
+    name = "gbm"
+
+    def params(self):
+        return {}
+
+    def fill_increments(
+        self, out, r, sigma, dt, rng, antithetic=False, moment_matching=False
+    ):
+        draw_normals(rng, out, antithetic, moment_matching)
+        out *= sigma * np.sqrt(dt)
+        out += (r - 0.5 * sigma**2) * dt
+        return out
+
+    # The terminal log-return is drawn directly from its normal law
+    def terminal_log_returns(
+        self, out, r, sigma, T, num_steps, rng, antithetic=False, moment_matching=False
+    ):
+        return self.fill_increments(out, r, sigma, T, rng, antithetic, moment_matching)
+
+
+# Heston stochastic volatility: dv = kappa (theta - v) dt + xi sqrt(v) dW_v with
+# corr(dW_S, dW_v) = rho, discretized with the full-truncation Euler scheme (the
+# variance may go negative, its positive part drives both equations). The initial
+# variance v0 defaults to sigma^2. All paths advance together one step at a time, so
+# terminal log-returns need only a few arrays of the chunk size.
+class HestonModel:
+    name = "heston"
+
+    def __init__(self, kappa=2.0, theta=0.04, xi=0.3, rho=-0.7, v0=None):
+        self.kappa = kappa
+        self.theta = theta
+        self.xi = xi
+        self.rho = rho
+        self.v0 = v0
+
+    def params(self):
+        return {
+            "kappa": self.kappa,
+            "theta": self.theta,
+            "xi": self.xi,
+            "rho": self.rho,
+            "v0": self.v0,
+        }
+
+    # Function to yield the log-price increments of n paths, one step at a time, in a
+    # reused buffer
+    def _iter_increments(
+        self, n, num_steps, r, sigma, dt, rng, dtype, antithetic, moment_matching
+    ):
+        v0 = sigma**2 if self.v0 is None else self.v0
+        variance = np.full(n, v0, dtype=dtype)
+        normals = np.empty((2, n), dtype=dtype)
+        positive = np.empty(n, dtype=dtype)
+        scale = np.empty(n, dtype=dtype)
+        increment = np.empty(n, dtype=dtype)
+        independent = np.sqrt(1 - self.rho**2)
+        for _ in range(num_steps):
+            # normals[0] drives the variance, normals[1] the independent part of S
+            draw_normals(rng, normals, antithetic, moment_matching)
+            np.maximum(variance, 0, out=positive)
+            np.multiply(positive, dt, out=scale)
+            np.sqrt(scale, out=scale)
+            np.multiply(normals[1], independent, out=increment)
+            increment += self.rho * normals[0]
+            increment *= scale
+            increment += r * dt
+            increment -= 0.5 * dt * positive
+            yield increment
+            positive -= self.theta
+            positive *= -self.kappa * dt
+            variance += positive
+            scale *= normals[0]
+            scale *= self.xi
+            variance += scale
+
+    def fill_increments(
+        self, out, r, sigma, dt, rng, antithetic=False, moment_matching=False
+    ):
+        num_steps, n = out.shape
+        for row, increment in zip(
+            out,
+            self._iter_increments(
+                n, num_steps, r, sigma, dt, rng, out.dtype, antithetic, moment_matching
+            ),
+        ):
+            row[:] = increment
+        return out
+
+    def terminal_log_returns(
+        self, out, r, sigma, T, num_steps, rng, antithetic=False, moment_matching=False
+    ):
+        out[:] = 0
+        for increment in self._iter_increments(
+            out.size,
+            num_steps,
+            r,
+            sigma,
+            T / num_steps,
+            rng,
+            out.dtype,
+            antithetic,
+            moment_matching,
+        ):
+            out += increment
+        return out
+
+
+# Merton jump-diffusion: GBM with volatility sigma plus Poisson(intensity) jumps whose
+# log sizes are normal(jump_mean, jump_std), the drift being compensated so discounted
+# prices stay martingales. Jump counts are drawn for a whole time step at once and
+# jump sizes only for the paths that jump; given its count N, the sum of N log jumps is
+# normal(N jump_mean, N jump_std^2). Terminal log-returns are sampled exactly.
+class MertonModel:
+    name = "merton"
+
+    def __init__(self, intensity=0.1, jump_mean=-0.1, jump_std=0.15):
+        self.intensity = intensity
+        self.jump_mean = jump_mean
+        self.jump_std = jump_std
+
+    def params(self):
+        return {
+            "intensity": self.intensity,
+            "jump_mean": self.jump_mean,
+            "jump_std": self.jump_std,
+        }
+
+    def _compensator(self):
+        return self.intensity * (np.exp(self.jump_mean + 0.5 * self.jump_std**2) - 1)
+
+    # Function to add the log jumps of one period of length dt to each entry of row
+    def _add_jumps(self, row, dt, rng):
+        counts = rng.poisson(self.intensity * dt, row.size)
+        jumping = np.flatnonzero(counts)
+        if jumping.size:
+            counts = counts[jumping]
+            row[jumping] += counts * self.jump_mean + np.sqrt(
+                counts
+            ) * self.jump_std * rng.standard_normal(jumping.size)
+
+    def fill_increments(
+        self, out, r, sigma, dt, rng, antithetic=False, moment_matching=False
+    ):
+        GBMModel().fill_increments(
+            out, r - self._compensator(), sigma, dt, rng, antithetic, moment_matching
+        )
+        for row in out:
+            self._add_jumps(row, dt, rng)
+        return out
+
+    def terminal_log_returns(
+        self, out, r, sigma, T, num_steps, rng, antithetic=False, moment_matching=False
+    ):
+        GBMModel().fill_increments(
+            out, r - self._compensator(), sigma, T, rng, antithetic, moment_matching
+        )
+        self._add_jumps(out, T, rng)
+        return out
+
+
+MODELS = {model.name: model for model in (GBMModel, HestonModel, MertonModel)}
+
+
+# Function to return the kernel of a model given as None (GBM), a name, a dict
+# {"name": ..., **params} as produced by describe_model, or a kernel instance
+def get_model(model=None):
+    if model is None:
+        return GBMModel()
+    if isinstance(model, str):
+        model = {"name": model}
+    if isinstance(model, dict):
+        params = dict(model)
+        name = params.pop("name")
+        if name not in MODELS:
+            raise ValueError(f"model must be one of {tuple(MODELS)}")
+        return MODELS[name](**params)
+    return model
+
+
+# Function to describe a model as a JSON-serializable dict accepted by get_model
+def describe_model(model=None):
+    model = get_model(model)
+    return {"name": model.name, **model.params()}
@@ -0,0 +1,300 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from modules.pricing import (
+    european_statistics,
+    simulate_terminal_prices,
+    stream_european_payoffs,
+    streaming_chunk_size,
+)
+from modules.simulations import generate_scenarios
+
+# Simulations per block. Blocks, not workers, own the random streams, so a seeded run
+# gives bit-identical results whatever the number of workers.
+BLOCK_SIZE = 2**16
+
+
+# NumPy array backed by a named shared memory segment, created by the parent and
+# attached by name in the workers so they can write their blocks in place
+class SharedArray:
+    def __init__(self, shape, dtype=np.float64, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        if name is None:
+            nbytes = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+            self.shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    def close(self):
+        self.array = None
+        self.shm.close()
+
+    def unlink(self):
+        self.close()
+        self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.unlink()
+
+
+# Function to split num_simulations into (start, size) blocks of block_size
+def split_blocks(num_simulations, block_size=BLOCK_SIZE):
+    return [
+        (start, min(block_size, num_simulations - start))
+        for start in range(0, num_simulations, block_size)
+    ]
+
+
+# Function to yield the results of tasks in order as they complete, in-process for a
+# single worker, otherwise from a pool. Closing the generator early (e.g. when the
+# consumer raises) cancels the tasks not started yet.
+def _iter_tasks(function, tasks, num_workers):
+    if num_workers is None:
+        num_workers = os.cpu_count() or 1
+    num_workers = min(num_workers, len(tasks))
+    if num_workers <= 1:
+        for task in tasks:
+            yield function(task)
+        return
+    executor = ProcessPoolExecutor(max_workers=num_workers)
+    try:
+        yield from executor.map(function, tasks)
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+
+# Function to run tasks in order and return their results
+def _run_tasks(function, tasks, num_workers):
+    return list(_iter_tasks(function, tasks, num_workers))
+
+
+def _generate_block(task):
+    name, shape, dtype, start, size, params, stream, model = task
+    shared = SharedArray(shape, dtype, name=name)
+    try:
+        # The block's columns of the shared paths are filled in place, without a
+        # private copy of the block
+        generate_scenarios(
+            *params,
+            size,
+            dtype=dtype,
+            out=shared.array[:, start : start + size],
+            seed=np.random.default_rng(stream),
+            model=model,
+        )
+    finally:
+        shared.close()
+
+
+# Function to generate price paths across a process pool into shared memory.
+# Returns a SharedArray whose .array has the generate_scenarios shape; the caller
+# owns the segment and must unlink it (or use it as a context manager).
+def parallel_generate_scenarios(
+    S0,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    seed=None,
+    num_workers=None,
+    block_size=BLOCK_SIZE,
+    dtype=np.float64,
+    model=None,
+):
+    blocks = split_blocks(num_simulations, block_size)
+    streams = np.random.SeedSequence(seed).spawn(len(blocks))
+    shared = SharedArray((num_steps + 1, num_simulations), dtype)
+    params = (S0, r, sigma, T, num_steps)
+    tasks = [
+        (shared.name, shared.shape, shared.dtype, start, size, params, stream, model)
+        for (start, size), stream in zip(blocks, streams)
+    ]
+    try:
+        _run_tasks(_generate_block, tasks, num_workers)
+    except BaseException:
+        shared.unlink()
+        raise
+    return shared
+
+
+def _price_block(task):
+    index, size, stream, setup, options = task
+    stats = european_statistics(*setup)
+    stream_european_payoffs(
+        stats,
+        *options["params"],
+        size,
+        options["chunk_size"],
+        np.random.default_rng(stream),
+        options["terminal_only"],
+        options["num_paths_to_display"] if index == 0 else 0,
+        options["dtype"],
+        options["antithetic"],
+        options["moment_matching"],
+        options["control_variate"],
+        options["model"],
+    )
+    return stats
+
+
+# Function to price European calls and puts by Monte Carlo across a process pool.
+# Each block streams its payoffs with its own spawned random stream and sends back
+# only its running statistics (plus the display paths for the first block); the
+# parent merges them in block order. memory_budget (bytes) applies per worker.
+def parallel_price_european(
+    S0,
+    K,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    seed=None,
+    num_workers=None,
+    block_size=BLOCK_SIZE,
+    memory_budget=64 * 2**20,
+    terminal_only=True,
+    num_paths_to_display=10,
+    bins=50,
+    dtype=np.float64,
+    antithetic=False,
+    moment_matching=False,
+    control_variate=None,
+    min_batches=16,
+    model=None,
+):
+    setup = (S0, K, r, sigma, T, bins, control_variate, moment_matching)
+    stats = european_statistics(*setup)
+    if antithetic:
+        block_size += block_size % 2
+    num_simulations, chunk_size = streaming_chunk_size(
+        memory_budget,
+        num_steps,
+        num_simulations,
+        dtype,
+        terminal_only,
+        antithetic,
+        moment_matching,
+        min_batches,
+    )
+    chunk_size = min(chunk_size, block_size)
+    options = {
+        "params": (S0, K, r, sigma, T, num_steps),
+        "chunk_size": chunk_size,
+        "terminal_only": terminal_only,
+        "num_paths_to_display": num_paths_to_display,
+        "dtype": dtype,
+        "antithetic": antithetic,
+        "moment_matching": moment_matching,
+        "control_variate": control_variate,
+        "model": model,
+    }
+    blocks = split_blocks(num_simulations, block_size)
+    streams = np.random.SeedSequence(seed).spawn(len(blocks))
+    tasks = [
+        (index, size, stream, setup, options)
+        for index, ((_, size), stream) in enumerate(zip(blocks, streams))
+    ]
+    for block_stats in _run_tasks(_price_block, tasks, num_workers):
+        stats.merge(block_stats)
+
+    result = stats.result(r, T)
+    result["num_simulations"] = num_simulations
+    result["num_blocks"] = len(blocks)
+    return result
+
+
+def _simulate_block(task):
+    index, size, stream, params, options = task
+    options = dict(options)
+    if index:
+        options["num_paths_to_display"] = 0
+    return simulate_terminal_prices(
+        *params, size, seed=np.random.default_rng(stream), **options
+    )
+
+
+# Function to simulate terminal prices across a process pool, the parallel
+# counterpart of simulate_terminal_prices. Only the terminal prices (the part of the
+# simulation the caller keeps) and the first block's display paths come back;
+# progress is called after every block.
+def parallel_simulate_terminal_prices(
+    S0,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    seed=None,
+    num_workers=None,
+    block_size=BLOCK_SIZE,
+    memory_budget=64 * 2**20,
+    terminal_only=True,
+    num_paths_to_display=10,
+    dtype=np.float64,
+    antithetic=False,
+    moment_matching=False,
+    min_batches=16,
+    fan_bins=None,
+    progress=None,
+    model=None,
+):
+    if antithetic:
+        num_simulations += num_simulations % 2
+        block_size += block_size % 2
+    blocks = split_blocks(num_simulations, block_size)
+    streams = np.random.SeedSequence(seed).spawn(len(blocks))
+    # Keep at least min_batches batches overall for moment-matched runs
+    batches_per_block = -(-min_batches // len(blocks))
+    tasks = [
+        (
+            index,
+            size,
+            stream,
+            (S0, r, sigma, T, num_steps),
+            {
+                "memory_budget": memory_budget,
+                "terminal_only": terminal_only,
+                "num_paths_to_display": num_paths_to_display,
+                "dtype": dtype,
+                "antithetic": antithetic,
+                "moment_matching": moment_matching,
+                "min_batches": batches_per_block,
+                "fan_bins": fan_bins,
+                "model": model,
+            },
+        )
+        for index, ((_, size), stream) in enumerate(zip(blocks, streams))
+    ]
+    terminal = np.empty(num_simulations, dtype=dtype)
+    batch_sizes = []
+    price_paths = fan = None
+    for (start, size), block in zip(
+        blocks, _iter_tasks(_simulate_block, tasks, num_workers)
+    ):
+        terminal[start : start + size] = block["terminal"]
+        if progress is not None:
+            progress(start + size, num_simulations, block["terminal"])
+        batch_sizes.extend(block["batch_sizes"])
+        if price_paths is None:
+            price_paths = block["price_paths"]
+        if fan is None:
+            fan = block["path_fan"]
+        elif block["path_fan"] is not None:
+            fan.merge(block["path_fan"])
+    return {
+        "terminal": terminal,
+        "price_paths": price_paths,
+        "batch_sizes": batch_sizes,
+        "batch_means": moment_matching,
+        "antithetic": antithetic,
+        "path_fan": fan,
+    }
@@ -1,18 +1,75 @@
+import numpy as np
 import plotly.graph_objs as go
-import plotly.io as pio
 
 
-def plot_price_paths(price_paths, num_paths_to_display=10):
+# Function to lay out paths as one NaN-separated line so that any number of paths
+# is a single WebGL trace
+def path_bundle(price_paths):
+    num_points, num_paths = price_paths.shape
+    x = np.empty((num_paths, num_points + 1))
+    x[:, :-1] = np.arange(num_points)
+    x[:, -1] = np.nan
+    y = np.empty((num_paths, num_points + 1))
+    y[:, :-1] = price_paths.T
+    y[:, -1] = np.nan
+    return x.ravel(), y.ravel()
+
+
+# Paths are drawn as one Scattergl trace. bands, an optional
+# (len(percentiles), num_steps + 1) array of price percentiles per time step computed
+# from the full path set (see pricing.PathFan), is drawn as filled fan bands.
+def plot_price_paths(
+    price_paths, num_paths_to_display=10, bands=None, percentiles=(5, 25, 50, 75, 95)
+):
     fig = go.Figure()
-    for i in range(num_paths_to_display):
-        fig.add_trace(
-            go.Scatter(
-                x=list(range(len(price_paths))),
-                y=price_paths[:, i],
-                mode="lines",
-                showlegend=False,
+    if bands is not None:
+        steps = np.arange(bands.shape[1])
+        for low, high in zip(range(len(bands) // 2), range(len(bands) - 1, 0, -1)):
+            name = f"{percentiles[low]}e - {percentiles[high]}e percentile"
+            fig.add_trace(
+                go.Scatter(
+                    x=steps,
+                    y=bands[low],
+                    mode="lines",
+                    line={"width": 0},
+                    legendgroup=name,
+                    showlegend=False,
+                    hoverinfo="skip",
+                )
             )
+            fig.add_trace(
+                go.Scatter(
+                    x=steps,
+                    y=bands[high],
+                    mode="lines",
+                    line={"width": 0},
+                    fill="tonexty",
+                    fillcolor="rgba(99, 110, 250, 0.2)",
+                    legendgroup=name,
+                    name=name,
+                )
+            )
+        if len(bands) % 2:
+            fig.add_trace(
+                go.Scatter(
+                    x=steps,
+                    y=bands[len(bands) // 2],
+                    mode="lines",
+                    line={"dash": "dash"},
+                    name=f"{percentiles[len(bands) // 2]}e percentile",
+                )
+            )
+    x, y = path_bundle(price_paths[:, :num_paths_to_display])
+    fig.add_trace(
+        go.Scattergl(
+            x=x,
+            y=y,
+            mode="lines",
+            line={"width": 1},
+            name="Trajectoires",
+            showlegend=False,
         )
+    )
     fig.update_layout(
         title="Simulations Monte Carlo des trajectoires de prix",
         xaxis_title="Jours de bourse",
@@ -21,19 +78,60 @@ def plot_price_paths(price_paths, num_paths_to_display=10):
     return fig
 
 
-def plot_payoff_distribution(payoffs, option_type):
+# Payoffs are binned here with NumPy so that only the bin counts reach the browser
+def plot_payoff_distribution(payoffs, option_type, bins=50):
+    counts, edges = np.histogram(payoffs, bins=bins)
+    return plot_payoff_histogram(counts, edges, option_type)
+
+
+# title replaces the default title, e.g. to name an exotic payoff and its price
+def plot_payoff_histogram(counts, edges, option_type, title=None):
     fig = go.Figure(
         data=[
-            go.Histogram(
-                x=payoffs, nbinsx=50, name=f"{option_type.capitalize()} Payoffs"
+            go.Bar(
+                x=(edges[:-1] + edges[1:]) / 2,
+                y=counts,
+                width=np.diff(edges),
+                name=f"{option_type.capitalize()} Payoffs",
             )
         ]
     )
     fig.update_layout(
-        title=f"Distribution des payoffs de l'option {option_type}",
+        title=title or f"Distribution des payoffs de l'option {option_type}",
         xaxis_title="Payoff à l'échéance ($)",
         yaxis_title="Fréquence",
         legend_title_text="Payoffs",
+        bargap=0,
+    )
+    return fig
+
+
+# Function to plot P&L distributions binned by the risk engine, histograms mapping a
+# label (e.g. the risk horizon) to (counts, edges), with a dashed line at minus the
+# VaR of each distribution when var maps the same labels to it
+def plot_pnl_histogram(histograms, var=None, title=None):
+    fig = go.Figure()
+    for label, (counts, edges) in histograms.items():
+        fig.add_trace(
+            go.Bar(
+                x=(edges[:-1] + edges[1:]) / 2,
+                y=counts,
+                width=np.diff(edges),
+                name=label,
+                opacity=0.6,
+            )
+        )
+    for label, value in (var or {}).items():
+        fig.add_vline(
+            x=-value, line_dash="dash", annotation_text=f"VaR {label}: {value:.2f}"
+        )
+    fig.update_layout(
+        title=title or "Distribution des P&L du portefeuille",
+        xaxis_title="P&L ($)",
+        yaxis_title="Fréquence",
+        legend_title_text="Horizon",
+        barmode="overlay",
+        bargap=0,
     )
     return fig
 
@@ -51,3 +149,22 @@ def plot_greeks(price_paths, greeks, option_type):
         legend_title_text="Greeks",
     )
     return fig
+
+
+def plot_volatility_skew(option_data):
+    fig = go.Figure(
+        data=[
+            go.Scatter(
+                x=option_data["strike"],
+                y=option_data["volatility"],
+                mode="lines+markers",
+                name="Volatilité implicite",
+            )
+        ]
+    )
+    fig.update_layout(
+        title="Smile de volatilité implicite",
+        xaxis_title="Prix d'exercice ($)",
+        yaxis_title="Volatilité implicite",
+    )
+    return fig
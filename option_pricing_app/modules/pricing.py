@@ -0,0 +1,826 @@
+import numpy as np
+from scipy.special import ndtri
+from modules.models import get_model
+from modules.simulations import generate_scenarios
+
+# Controls of the European estimators. The terminal spot has the known mean S0 * exp(rT)
+# under any risk-neutral model; the closed-form price of the same vanilla option is no
+# control, since the payoff would be its own control (beta = 1, the closed form with
+# zero error).
+CONTROL_VARIATES = (None, "spot")
+
+
+# Running sums of a Monte Carlo sample, enough to recover its mean and standard error
+class MonteCarloAccumulator:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.total_sq = 0.0
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        self.count += values.size
+        self.total += float(np.sum(values))
+        self.total_sq += float(np.dot(values, values))
+
+    def merge(self, other):
+        self.count += other.count
+        self.total += other.total
+        self.total_sq += other.total_sq
+
+    def mean(self):
+        return self.total / self.count
+
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return max((self.total_sq - self.total**2 / self.count) / (self.count - 1), 0.0)
+
+    def std_error(self):
+        return np.sqrt(self.variance() / self.count)
+
+
+# Streaming estimator combining antithetic pairing, a control variate and batch
+# means. Units are the values averaged by the estimator (payoffs, or pair means of
+# antithetic payoffs); controls have the known expectation control_mean. Batch means
+# over chunks give the standard error when samples inside a chunk are dependent
+# (moment matching). Plain payoff statistics are kept to report the achieved
+# variance reduction factor against plain Monte Carlo with the same payoff count.
+class VarianceReducedEstimator:
+    def __init__(self, control_mean=None, batch_means=False):
+        self.control_mean = control_mean
+        self.batch_means = batch_means
+        self.plain = MonteCarloAccumulator()
+        self.units = MonteCarloAccumulator()
+        self.controls = MonteCarloAccumulator()
+        self.cross = 0.0
+        self.batches = []
+
+    def update(self, payoffs, units, controls=None):
+        self.plain.update(payoffs)
+        self.units.update(units)
+        if controls is not None:
+            self.controls.update(controls)
+            self.cross += float(np.dot(units, controls))
+        if self.batch_means:
+            self.batches.append(
+                (
+                    units.size,
+                    float(np.sum(units)),
+                    0.0 if controls is None else float(np.sum(controls)),
+                )
+            )
+
+    def merge(self, other):
+        self.plain.merge(other.plain)
+        self.units.merge(other.units)
+        self.controls.merge(other.controls)
+        self.cross += other.cross
+        self.batches.extend(other.batches)
+
+    def beta(self):
+        if self.control_mean is None or self.controls.variance() == 0:
+            return 0.0
+        n = self.units.count
+        covariance = (self.cross - self.units.total * self.controls.total / n) / (n - 1)
+        return covariance / self.controls.variance()
+
+    def result(self, discount=1.0):
+        beta = self.beta()
+        n = self.units.count
+        price = self.units.mean()
+        if self.control_mean is not None:
+            price -= beta * (self.controls.mean() - self.control_mean)
+        if self.batch_means and len(self.batches) > 1:
+            adjusted = np.array(
+                [
+                    (total - beta * control_total) / size
+                    for size, total, control_total in self.batches
+                ]
+            )
+            sizes = np.array([size for size, _, _ in self.batches])
+            centre = np.sum(sizes * adjusted) / n
+            variance = np.sum(sizes * (adjusted - centre) ** 2) / (len(sizes) - 1)
+        else:
+            covariance = beta * self.controls.variance()
+            variance = max(self.units.variance() - covariance * beta, 0.0)
+        std_error = np.sqrt(variance / n)
+        plain_variance = self.plain.variance() / self.plain.count
+        if std_error > 0:
+            factor = plain_variance / std_error**2
+        else:
+            factor = np.inf
+        return {
+            "price": discount * price,
+            "std_error": discount * std_error,
+            "variance_reduction_factor": factor,
+        }
+
+
+# Function to compute the number of simulations processed per chunk for a memory
+# budget. buffers is the number of per-path arrays kept besides the full paths: by
+# default the terminal prices plus the call and put payoff buffers.
+def chunk_size_for_budget(
+    memory_budget, num_steps, num_simulations, dtype, terminal_only, buffers=3
+):
+    itemsize = np.dtype(dtype).itemsize
+    bytes_per_path = buffers * itemsize
+    if not terminal_only:
+        bytes_per_path += (num_steps + 1) * itemsize
+    return int(min(num_simulations, max(1, memory_budget // bytes_per_path)))
+
+
+# Function to compute fixed histogram edges for the call and put payoffs.
+# Edges must be known before the first chunk, so they span +/- 6 standard
+# deviations of the terminal log-price; payoffs beyond them fall in the last bin.
+def payoff_histogram_edges(S0, K, r, sigma, T, bins=50):
+    mean_log = np.log(S0) + (r - 0.5 * sigma**2) * T
+    spread = 6 * sigma * np.sqrt(T)
+    low, high = np.exp(mean_log - spread), np.exp(mean_log + spread)
+    call_edges = np.linspace(0, max(high - K, 1e-8), bins + 1)
+    put_edges = np.linspace(0, max(K - low, 1e-8), bins + 1)
+    return call_edges, put_edges
+
+
+# Payoff statistics of a streamed European call/put run: one estimator and one
+# fixed-edge histogram per option type, plus the display paths. Statistics of
+# independent runs (chunks, blocks, workers) merge into the statistics of their union.
+class EuropeanStatistics:
+    def __init__(self, call_mean, put_mean, batch_means, call_edges, put_edges):
+        self.call = VarianceReducedEstimator(call_mean, batch_means)
+        self.put = VarianceReducedEstimator(put_mean, batch_means)
+        self.call_edges = call_edges
+        self.put_edges = put_edges
+        self.call_counts = np.zeros(len(call_edges) - 1, dtype=np.int64)
+        self.put_counts = np.zeros(len(put_edges) - 1, dtype=np.int64)
+        self.price_paths = None
+
+    def merge(self, other):
+        self.call.merge(other.call)
+        self.put.merge(other.put)
+        self.call_counts += other.call_counts
+        self.put_counts += other.put_counts
+        if self.price_paths is None:
+            self.price_paths = other.price_paths
+
+    def result(self, r, T):
+        discount = np.exp(-r * T)
+        call_result = self.call.result(discount)
+        put_result = self.put.result(discount)
+        return {
+            "call_price": call_result["price"],
+            "put_price": put_result["price"],
+            "call_std_error": call_result["std_error"],
+            "put_std_error": put_result["std_error"],
+            "call_variance_reduction_factor": call_result["variance_reduction_factor"],
+            "put_variance_reduction_factor": put_result["variance_reduction_factor"],
+            "call_histogram": (self.call_counts, self.call_edges),
+            "put_histogram": (self.put_counts, self.put_edges),
+            "price_paths": self.price_paths,
+        }
+
+
+# Percentiles drawn as fan bands around the displayed price paths
+FAN_PERCENTILES = (5, 25, 50, 75, 95)
+
+
+# Streaming percentile bands of a path set: one fixed-edge histogram of log-prices per
+# time step (+/- 6 standard deviations of the GBM log-price), so memory depends on
+# num_steps and bins only. Fans of independent runs merge into the fan of their union.
+class PathFan:
+    def __init__(self, S0, r, sigma, T, num_steps, bins=200):
+        times = np.linspace(0, T, num_steps + 1)
+        spread = np.maximum(6 * sigma * np.sqrt(times), 1e-12)
+        self.lower = np.log(S0) + (r - 0.5 * sigma**2) * times - spread
+        self.width = 2 * spread / bins
+        self.counts = np.zeros((num_steps + 1, bins), dtype=np.int64)
+
+    def update(self, paths):
+        bins = self.counts.shape[1]
+        # One time step at a time keeps the temporaries to a single row
+        for step, row in enumerate(paths):
+            index = np.log(row)
+            index -= self.lower[step]
+            index /= self.width[step]
+            np.clip(index, 0, bins - 1, out=index)
+            self.counts[step] += np.bincount(index.astype(np.intp), minlength=bins)
+
+    def merge(self, other):
+        self.counts += other.counts
+
+    # Function to interpolate the given percentiles of every time step, returned as a
+    # (len(percentiles), num_steps + 1) array of prices
+    def percentiles(self, percentiles=FAN_PERCENTILES):
+        cumulative = np.cumsum(self.counts, axis=1)
+        rows = np.arange(len(self.counts))
+        bands = np.empty((len(percentiles), len(self.counts)))
+        for i, percentile in enumerate(percentiles):
+            target = percentile / 100 * cumulative[:, -1]
+            index = np.minimum(
+                np.sum(cumulative < target[:, None], axis=1), self.counts.shape[1] - 1
+            )
+            below = np.where(index > 0, cumulative[rows, index - 1], 0)
+            in_bin = np.maximum(self.counts[rows, index], 1)
+            position = index + np.clip((target - below) / in_bin, 0, 1)
+            bands[i] = np.exp(self.lower + position * self.width)
+        return bands
+
+
+# Function to create empty European statistics for the selected control variate
+def european_statistics(
+    S0,
+    K,
+    r,
+    sigma,
+    T,
+    bins=50,
+    control_variate=None,
+    moment_matching=False,
+):
+    if control_variate not in CONTROL_VARIATES:
+        raise ValueError(f"control_variate must be one of {CONTROL_VARIATES}")
+    if control_variate == "spot":
+        call_mean = put_mean = S0 * np.exp(r * T)
+    else:
+        call_mean = put_mean = None
+    call_edges, put_edges = payoff_histogram_edges(S0, K, r, sigma, T, bins)
+    return EuropeanStatistics(
+        call_mean, put_mean, moment_matching, call_edges, put_edges
+    )
+
+
+# Function to choose the chunk size of a streamed run. Antithetic runs use an even
+# number of simulations (rounded up) and even chunks so pairs never straddle chunks;
+# moment-matched runs use at least min_batches chunks for the batch-means error.
+# Returns the (possibly rounded) number of simulations and the chunk size.
+def streaming_chunk_size(
+    memory_budget,
+    num_steps,
+    num_simulations,
+    dtype=np.float64,
+    terminal_only=True,
+    antithetic=False,
+    moment_matching=False,
+    min_batches=16,
+    buffers=3,
+):
+    if antithetic:
+        num_simulations += num_simulations % 2
+    chunk_size = chunk_size_for_budget(
+        memory_budget, num_steps, num_simulations, dtype, terminal_only, buffers
+    )
+    if moment_matching:
+        chunk_size = min(chunk_size, max(2, -(-num_simulations // min_batches)))
+    if antithetic:
+        chunk_size += chunk_size % 2
+    return num_simulations, chunk_size
+
+
+# Function to yield the terminal prices of num_simulations paths, chunk_size at a
+# time, in reused buffers, drawing every random number from rng. The first
+# num_paths_to_display full paths are yielded with the first chunk (None afterwards).
+# Full paths (terminal_only=False) are also added to fan when one is given. model is a
+# model kernel or description (see models.get_model, GBM by default).
+def iter_terminal_chunks(
+    S0,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    chunk_size,
+    rng,
+    terminal_only=True,
+    num_paths_to_display=10,
+    dtype=np.float64,
+    antithetic=False,
+    moment_matching=False,
+    fan=None,
+    model=None,
+):
+    model = get_model(model)
+    display_paths = None
+    if terminal_only:
+        if num_paths_to_display:
+            display_paths = generate_scenarios(
+                S0,
+                r,
+                sigma,
+                T,
+                num_steps,
+                num_paths_to_display,
+                dtype=dtype,
+                seed=rng,
+                model=model,
+            )
+        terminal = np.empty(chunk_size, dtype=dtype)
+    else:
+        paths = np.empty((num_steps + 1, chunk_size), dtype=dtype)
+
+    done = 0
+    while done < num_simulations:
+        n = min(chunk_size, num_simulations - done)
+        if terminal_only:
+            terminal_chunk = terminal[:n]
+            model.terminal_log_returns(
+                terminal_chunk, r, sigma, T, num_steps, rng, antithetic, moment_matching
+            )
+            np.exp(terminal_chunk, out=terminal_chunk)
+            terminal_chunk *= S0
+        else:
+            paths_chunk = (
+                paths if n == chunk_size else np.empty((num_steps + 1, n), dtype=dtype)
+            )
+            generate_scenarios(
+                S0,
+                r,
+                sigma,
+                T,
+                num_steps,
+                n,
+                dtype=dtype,
+                out=paths_chunk,
+                seed=rng,
+                antithetic=antithetic,
+                moment_matching=moment_matching,
+                model=model,
+            )
+            if done == 0 and num_paths_to_display:
+                display_paths = paths_chunk[:, :num_paths_to_display].copy()
+            if fan is not None:
+                fan.update(paths_chunk)
+            terminal_chunk = paths_chunk[-1]
+        yield terminal_chunk, display_paths
+        display_paths = None
+        done += n
+
+
+# Function to add the call and put payoffs of a chunk of terminal prices to stats,
+# using call_buffer and put_buffer (same size as the chunk) as scratch space
+def accumulate_payoffs(
+    stats,
+    terminal_chunk,
+    K,
+    call_buffer,
+    put_buffer,
+    control_variate=None,
+    antithetic=False,
+):
+    np.subtract(terminal_chunk, K, out=call_buffer)
+    np.maximum(call_buffer, 0, out=call_buffer)
+    np.subtract(K, terminal_chunk, out=put_buffer)
+    np.maximum(put_buffer, 0, out=put_buffer)
+    if control_variate == "spot":
+        call_controls = put_controls = terminal_chunk
+    else:
+        call_controls = put_controls = None
+    add_payoffs(stats, call_buffer, put_buffer, call_controls, put_controls, antithetic)
+
+
+# Function to add a chunk of call and put payoffs (with their controls, if any) to the
+# estimators and histograms of stats. The payoffs are clipped in place to the last
+# histogram edge once the estimators are updated.
+def add_payoffs(
+    stats,
+    call_payoffs,
+    put_payoffs,
+    call_controls=None,
+    put_controls=None,
+    antithetic=False,
+):
+    for estimator, chunk, controls in (
+        (stats.call, call_payoffs, call_controls),
+        (stats.put, put_payoffs, put_controls),
+    ):
+        estimator.update(chunk, *estimator_units(chunk, controls, antithetic))
+
+    np.minimum(call_payoffs, stats.call_edges[-1], out=call_payoffs)
+    np.minimum(put_payoffs, stats.put_edges[-1], out=put_payoffs)
+    stats.call_counts += np.histogram(call_payoffs, bins=stats.call_edges)[0]
+    stats.put_counts += np.histogram(put_payoffs, bins=stats.put_edges)[0]
+
+
+# Function to stream num_simulations European payoffs into stats, chunk_size at a
+# time, drawing every random number from rng
+def stream_european_payoffs(
+    stats,
+    S0,
+    K,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    chunk_size,
+    rng,
+    terminal_only=True,
+    num_paths_to_display=10,
+    dtype=np.float64,
+    antithetic=False,
+    moment_matching=False,
+    control_variate=None,
+    model=None,
+):
+    call_payoffs = np.empty(chunk_size, dtype=dtype)
+    put_payoffs = np.empty(chunk_size, dtype=dtype)
+    for terminal_chunk, display_paths in iter_terminal_chunks(
+        S0,
+        r,
+        sigma,
+        T,
+        num_steps,
+        num_simulations,
+        chunk_size,
+        rng,
+        terminal_only,
+        num_paths_to_display,
+        dtype,
+        antithetic,
+        moment_matching,
+        model=model,
+    ):
+        if display_paths is not None:
+            stats.price_paths = display_paths
+        n = terminal_chunk.size
+        accumulate_payoffs(
+            stats,
+            terminal_chunk,
+            K,
+            call_payoffs[:n],
+            put_payoffs[:n],
+            control_variate,
+            antithetic,
+        )
+    return stats
+
+
+# Function to price European calls and puts by streaming Monte Carlo.
+# Simulations are processed in chunks sized from memory_budget (bytes); only running
+# sums, histogram counts and the first num_paths_to_display paths are kept. With
+# terminal_only the terminal prices are sampled directly from the GBM law, otherwise
+# full paths are generated chunk by chunk with generate_scenarios.
+# Variance reduction: antithetic pairs (num_simulations is rounded up to an even
+# count), moment_matching of the normals within each chunk (the standard error then
+# comes from batch means, so at least min_batches chunks are used) and a control
+# variate on the terminal spot ("spot", mean S0 * exp(rT)).
+# model selects the dynamics (see models.get_model, GBM by default); terminal prices
+# of models without a closed-form law are stepped through time without keeping paths.
+def price_european_streaming(
+    S0,
+    K,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    memory_budget=64 * 2**20,
+    terminal_only=True,
+    num_paths_to_display=10,
+    bins=50,
+    dtype=np.float64,
+    seed=None,
+    antithetic=False,
+    moment_matching=False,
+    control_variate=None,
+    min_batches=16,
+    model=None,
+):
+    stats = european_statistics(
+        S0, K, r, sigma, T, bins, control_variate, moment_matching
+    )
+    num_simulations, chunk_size = streaming_chunk_size(
+        memory_budget,
+        num_steps,
+        num_simulations,
+        dtype,
+        terminal_only,
+        antithetic,
+        moment_matching,
+        min_batches,
+    )
+    stream_european_payoffs(
+        stats,
+        S0,
+        K,
+        r,
+        sigma,
+        T,
+        num_steps,
+        num_simulations,
+        chunk_size,
+        np.random.default_rng(seed),
+        terminal_only,
+        num_paths_to_display,
+        dtype,
+        antithetic,
+        moment_matching,
+        control_variate,
+        model,
+    )
+    result = stats.result(r, T)
+    result["num_simulations"] = num_simulations
+    result["chunk_size"] = chunk_size
+    return result
+
+
+# Function to simulate and keep the terminal prices only, so that the same simulation
+# can be priced for any strike or control variate with price_from_terminal.
+# The chunk layout is recorded in batch_sizes: antithetic pairs and moment-matched
+# batches live inside chunks. Draws match price_european_streaming for equal inputs.
+# With fan_bins, percentile bands of all the paths are streamed into a PathFan
+# ("path_fan"), which needs full paths (terminal_only=False). progress, when given, is
+# called as progress(done, num_simulations, terminal_chunk) after every chunk. model
+# selects the dynamics as in price_european_streaming.
+def simulate_terminal_prices(
+    S0,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    memory_budget=64 * 2**20,
+    terminal_only=True,
+    num_paths_to_display=10,
+    dtype=np.float64,
+    seed=None,
+    antithetic=False,
+    moment_matching=False,
+    min_batches=16,
+    fan_bins=None,
+    progress=None,
+    model=None,
+):
+    if fan_bins and terminal_only:
+        raise ValueError("Percentile bands need full paths (terminal_only=False)")
+    fan = PathFan(S0, r, sigma, T, num_steps, fan_bins) if fan_bins else None
+    num_simulations, chunk_size = streaming_chunk_size(
+        memory_budget,
+        num_steps,
+        num_simulations,
+        dtype,
+        terminal_only,
+        antithetic,
+        moment_matching,
+        min_batches,
+    )
+    terminal = np.empty(num_simulations, dtype=dtype)
+    batch_sizes = []
+    price_paths = None
+    done = 0
+    for terminal_chunk, display_paths in iter_terminal_chunks(
+        S0,
+        r,
+        sigma,
+        T,
+        num_steps,
+        num_simulations,
+        chunk_size,
+        np.random.default_rng(seed),
+        terminal_only,
+        num_paths_to_display,
+        dtype,
+        antithetic,
+        moment_matching,
+        fan,
+        model,
+    ):
+        if display_paths is not None:
+            price_paths = display_paths
+        terminal[done : done + terminal_chunk.size] = terminal_chunk
+        batch_sizes.append(terminal_chunk.size)
+        done += terminal_chunk.size
+        if progress is not None:
+            progress(done, num_simulations, terminal_chunk)
+    return {
+        "terminal": terminal,
+        "price_paths": price_paths,
+        "batch_sizes": batch_sizes,
+        "batch_means": moment_matching,
+        "antithetic": antithetic,
+        "path_fan": fan,
+    }
+
+
+# Function to price European calls and puts from a simulation returned by
+# simulate_terminal_prices (or its QMC and parallel counterparts). greeks, when given
+# (see mc_greeks.MonteCarloGreeks), is updated in the same pass over the chunks and
+# its estimates are added to the result.
+def price_from_terminal(
+    simulation, S0, K, r, sigma, T, control_variate=None, bins=50, greeks=None
+):
+    stats = european_statistics(
+        S0, K, r, sigma, T, bins, control_variate, simulation["batch_means"]
+    )
+    terminal = simulation["terminal"]
+    largest = max(simulation["batch_sizes"], default=0)
+    call_payoffs = np.empty(largest, dtype=terminal.dtype)
+    put_payoffs = np.empty(largest, dtype=terminal.dtype)
+    done = 0
+    for size in simulation["batch_sizes"]:
+        if greeks is not None:
+            greeks.update(terminal[done : done + size], simulation["antithetic"])
+        accumulate_payoffs(
+            stats,
+            terminal[done : done + size],
+            K,
+            call_payoffs[:size],
+            put_payoffs[:size],
+            control_variate,
+            simulation["antithetic"],
+        )
+        done += size
+    stats.price_paths = simulation["price_paths"]
+    result = stats.result(r, T)
+    result["num_simulations"] = terminal.size
+    if greeks is not None:
+        result.update(greeks.result())
+    return result
+
+
+# Function to compute the two-sided normal confidence interval of an MC estimate
+def confidence_interval(price, std_error, confidence=0.95):
+    half_width = float(ndtri(0.5 + 0.5 * confidence) * std_error)
+    return float(price) - half_width, float(price) + half_width
+
+
+# Function to tell whether the estimates of a pricing result (price_from_terminal or
+# EuropeanStatistics.result) of every option type reach the requested precision: a
+# standard error at most target_std_error and/or a confidence interval half-width at
+# most relative_tolerance times the price
+def precision_reached(
+    result,
+    target_std_error=None,
+    relative_tolerance=None,
+    confidence=0.95,
+    option_types=("call", "put"),
+):
+    for option_type in option_types:
+        price = result[f"{option_type}_price"]
+        std_error = result[f"{option_type}_std_error"]
+        if target_std_error is not None and std_error > target_std_error:
+            return False
+        if relative_tolerance is not None:
+            low, high = confidence_interval(price, std_error, confidence)
+            if 0.5 * (high - low) > relative_tolerance * abs(price):
+                return False
+    return True
+
+
+# Function to simulate terminal prices chunk by chunk until the call and put prices
+# for strike K reach the requested precision (see precision_reached) or
+# max_simulations paths were drawn. Running payoff statistics are updated after each
+# chunk of at most batch_size paths; moment-matched runs check only from min_batches
+# chunks on, their batch-means error needing several batches. Returns the simulation
+# in the format of simulate_terminal_prices (terminal prices of the paths actually
+# used), plus "converged". model selects the dynamics as in price_european_streaming.
+def simulate_terminal_prices_adaptive(
+    S0,
+    K,
+    r,
+    sigma,
+    T,
+    num_steps,
+    target_std_error=None,
+    relative_tolerance=None,
+    max_simulations=10**6,
+    batch_size=10000,
+    confidence=0.95,
+    memory_budget=64 * 2**20,
+    terminal_only=True,
+    num_paths_to_display=10,
+    dtype=np.float64,
+    seed=None,
+    antithetic=False,
+    moment_matching=False,
+    control_variate=None,
+    min_batches=8,
+    fan_bins=None,
+    progress=None,
+    model=None,
+):
+    if target_std_error is None and relative_tolerance is None:
+        raise ValueError("Give a target_std_error and/or a relative_tolerance")
+    if fan_bins and terminal_only:
+        raise ValueError("Percentile bands need full paths (terminal_only=False)")
+    fan = PathFan(S0, r, sigma, T, num_steps, fan_bins) if fan_bins else None
+    max_simulations, chunk_size = streaming_chunk_size(
+        memory_budget, num_steps, max_simulations, dtype, terminal_only, antithetic
+    )
+    chunk_size = min(chunk_size, batch_size)
+    if antithetic:
+        chunk_size += chunk_size % 2
+    stats = european_statistics(S0, K, r, sigma, T, 1, control_variate, moment_matching)
+    call_payoffs = np.empty(chunk_size, dtype=dtype)
+    put_payoffs = np.empty(chunk_size, dtype=dtype)
+    chunks = []
+    price_paths = None
+    converged = False
+    done = 0
+    for terminal_chunk, display_paths in iter_terminal_chunks(
+        S0,
+        r,
+        sigma,
+        T,
+        num_steps,
+        max_simulations,
+        chunk_size,
+        np.random.default_rng(seed),
+        terminal_only,
+        num_paths_to_display,
+        dtype,
+        antithetic,
+        moment_matching,
+        fan,
+        model,
+    ):
+        if display_paths is not None:
+            price_paths = display_paths
+        n = terminal_chunk.size
+        chunks.append(terminal_chunk.copy())
+        accumulate_payoffs(
+            stats,
+            terminal_chunk,
+            K,
+            call_payoffs[:n],
+            put_payoffs[:n],
+            control_variate,
+            antithetic,
+        )
+        done += n
+        if progress is not None:
+            progress(done, max_simulations, terminal_chunk)
+        if len(chunks) >= (min_batches if moment_matching else 1) and (
+            precision_reached(
+                stats.result(r, T), target_std_error, relative_tolerance, confidence
+            )
+        ):
+            converged = True
+            break
+    return {
+        "terminal": np.concatenate(chunks),
+        "price_paths": price_paths,
+        "batch_sizes": [chunk.size for chunk in chunks],
+        "batch_means": moment_matching,
+        "antithetic": antithetic,
+        "path_fan": fan,
+        "converged": converged,
+    }
+
+
+# Function to price European calls and puts by Monte Carlo to a requested precision
+# (see simulate_terminal_prices_adaptive). Next to the price_from_terminal outputs,
+# reports the paths actually used, whether the precision was reached and the final
+# confidence intervals ("call_ci", "put_ci").
+def price_european_adaptive(
+    S0,
+    K,
+    r,
+    sigma,
+    T,
+    num_steps,
+    target_std_error=None,
+    relative_tolerance=None,
+    max_simulations=10**6,
+    batch_size=10000,
+    confidence=0.95,
+    control_variate=None,
+    bins=50,
+    **options,
+):
+    simulation = simulate_terminal_prices_adaptive(
+        S0,
+        K,
+        r,
+        sigma,
+        T,
+        num_steps,
+        target_std_error,
+        relative_tolerance,
+        max_simulations,
+        batch_size,
+        confidence,
+        control_variate=control_variate,
+        **options,
+    )
+    result = price_from_terminal(simulation, S0, K, r, sigma, T, control_variate, bins)
+    result["converged"] = simulation["converged"]
+    result["confidence"] = confidence
+    for option_type in ("call", "put"):
+        result[f"{option_type}_ci"] = confidence_interval(
+            result[f"{option_type}_price"],
+            result[f"{option_type}_std_error"],
+            confidence,
+        )
+    return result
+
+
+# Function to turn a chunk of payoffs (and controls) into estimator units,
+# averaging antithetic pairs laid out as column i and column half + i
+def estimator_units(payoffs, controls, antithetic):
+    if not antithetic:
+        return payoffs, controls
+    half = payoffs.size // 2
+    units = 0.5 * (payoffs[:half] + payoffs[half:])
+    if controls is not None:
+        controls = 0.5 * (controls[:half] + controls[half:])
+    return units, controls
@@ -0,0 +1,302 @@
+import warnings
+import numpy as np
+from scipy.special import ndtri
+from modules.pricing import MonteCarloAccumulator, PathFan, payoff_histogram_edges
+
+
+# Function to build the Brownian-bridge construction order for num_steps equal steps.
+# Returns, for each Sobol dimension i, the time index it fills (bridge_index), the
+# neighbouring already-built indices (left_index is 0 for the origin, otherwise
+# the index + 1 of the left point) and the conditional mean weights and std deviations
+# in units of sqrt(dt).
+def brownian_bridge_plan(num_steps):
+    times = np.arange(1, num_steps + 1, dtype=np.float64)
+    filled = np.zeros(num_steps, dtype=bool)
+    bridge_index = np.zeros(num_steps, dtype=np.intp)
+    left_index = np.zeros(num_steps, dtype=np.intp)
+    right_index = np.zeros(num_steps, dtype=np.intp)
+    left_weight = np.zeros(num_steps)
+    right_weight = np.zeros(num_steps)
+    std_dev = np.zeros(num_steps)
+
+    filled[-1] = True
+    bridge_index[0] = num_steps - 1
+    std_dev[0] = np.sqrt(times[-1])
+    j = 0
+    for i in range(1, num_steps):
+        while filled[j]:
+            j += 1
+        k = j
+        while not filled[k]:
+            k += 1
+        l = j + ((k - 1 - j) >> 1)
+        filled[l] = True
+        bridge_index[i] = l
+        left_index[i] = j
+        right_index[i] = k
+        left_time = times[j - 1] if j else 0.0
+        left_weight[i] = (times[k] - times[l]) / (times[k] - left_time)
+        right_weight[i] = (times[l] - left_time) / (times[k] - left_time)
+        std_dev[i] = np.sqrt(
+            (times[l] - left_time) * (times[k] - times[l]) / (times[k] - left_time)
+        )
+        j = k + 1
+        if j >= num_steps:
+            j = 0
+    return {
+        "bridge_index": bridge_index,
+        "left_index": left_index,
+        "right_index": right_index,
+        "left_weight": left_weight,
+        "right_weight": right_weight,
+        "std_dev": std_dev,
+    }
+
+
+# Function to create a scrambled Sobol engine of dimension d seeded from seed.
+# scipy.stats is slow to import, so it is only imported on first use.
+def sobol_engine(d, seed=None):
+    from scipy.stats import qmc
+
+    return qmc.Sobol(d, scramble=True, seed=np.random.default_rng(seed))
+
+
+# Function to draw n scrambled Sobol points mapped to standard normals, shape (n, d).
+# Sobol balance properties are best with powers of two; other sizes are allowed.
+def sobol_normals(engine, n):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        points = engine.random(n)
+    return ndtri(points, out=points)
+
+
+# Function to build GBM paths in out (num_steps + 1, n) from normals of shape (n, d).
+# With bridge the first dimensions set the coarse shape of the path (terminal value
+# first), which keeps the effective dimension low; otherwise dimension i drives step i.
+def fill_qmc_paths(out, normals, S0, r, sigma, T, plan=None):
+    num_steps = out.shape[0] - 1
+    dt = T / num_steps
+    brownian = out[1:]
+    if plan is None:
+        brownian[...] = normals.T
+        np.cumsum(brownian, axis=0, out=brownian)
+    else:
+        brownian[plan["bridge_index"]] = normals.T
+        brownian[-1] *= plan["std_dev"][0]
+        for i in range(1, num_steps):
+            l = plan["bridge_index"][i]
+            j = plan["left_index"][i]
+            row = brownian[l]
+            row *= plan["std_dev"][i]
+            row += plan["right_weight"][i] * brownian[plan["right_index"][i]]
+            if j:
+                row += plan["left_weight"][i] * brownian[j - 1]
+    brownian *= sigma * np.sqrt(dt)
+    brownian += (r - 0.5 * sigma**2) * dt * np.arange(1, num_steps + 1)[:, None]
+    out[0] = 0
+    np.exp(out, out=out)
+    out *= S0
+    return out
+
+
+# Function to generate price paths from scrambled Sobol points, a drop-in alternative
+# to generate_scenarios returning the same (num_steps + 1, num_simulations) array
+def generate_qmc_scenarios(
+    S0,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    dtype=np.float64,
+    out=None,
+    seed=None,
+    bridge=True,
+):
+    if out is None:
+        out = np.empty((num_steps + 1, num_simulations), dtype=dtype)
+    engine = sobol_engine(num_steps, seed)
+    plan = brownian_bridge_plan(num_steps) if bridge else None
+    return fill_qmc_paths(
+        out, sobol_normals(engine, num_simulations), S0, r, sigma, T, plan
+    )
+
+
+# Function to split a randomized QMC run into num_replicates equal replicates and
+# choose the chunk size bounding paths plus the float64 Sobol points by memory_budget
+def qmc_layout(num_steps, num_simulations, memory_budget, num_replicates, dtype):
+    num_replicates = max(2, min(num_replicates, num_simulations))
+    replicate_size = num_simulations // num_replicates
+    bytes_per_path = (num_steps + 1) * np.dtype(dtype).itemsize + num_steps * 8
+    chunk_size = int(min(replicate_size, max(1, memory_budget // bytes_per_path)))
+    return num_replicates, replicate_size, chunk_size
+
+
+# Function to yield (replicate, paths chunk) over num_replicates independently
+# scrambled Sobol sequences of replicate_size paths each, chunk_size paths at a time
+def iter_qmc_chunks(
+    S0,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_replicates,
+    replicate_size,
+    chunk_size,
+    seed=None,
+    bridge=True,
+    dtype=np.float64,
+):
+    plan = brownian_bridge_plan(num_steps) if bridge else None
+    paths = np.empty((num_steps + 1, chunk_size), dtype=dtype)
+    for replicate, stream in enumerate(
+        np.random.SeedSequence(seed).spawn(num_replicates)
+    ):
+        engine = sobol_engine(num_steps, stream)
+        done = 0
+        while done < replicate_size:
+            n = min(chunk_size, replicate_size - done)
+            paths_chunk = (
+                paths if n == chunk_size else np.empty((num_steps + 1, n), dtype=dtype)
+            )
+            fill_qmc_paths(paths_chunk, sobol_normals(engine, n), S0, r, sigma, T, plan)
+            yield replicate, paths_chunk
+            done += n
+
+
+# Function to price European calls and puts by randomized quasi-Monte Carlo.
+# The simulations are split into num_replicates independently scrambled Sobol
+# sequences; the standard error comes from the spread of the replicate estimates.
+# Each replicate is streamed in chunks bounded by memory_budget (bytes).
+def price_european_qmc(
+    S0,
+    K,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    memory_budget=64 * 2**20,
+    num_replicates=16,
+    num_paths_to_display=10,
+    bins=50,
+    dtype=np.float64,
+    seed=None,
+    bridge=True,
+):
+    num_replicates, replicate_size, chunk_size = qmc_layout(
+        num_steps, num_simulations, memory_budget, num_replicates, dtype
+    )
+    num_simulations = replicate_size * num_replicates
+    call_edges, put_edges = payoff_histogram_edges(S0, K, r, sigma, T, bins)
+    call_counts = np.zeros(bins, dtype=np.int64)
+    put_counts = np.zeros(bins, dtype=np.int64)
+    call_stats = [MonteCarloAccumulator() for _ in range(num_replicates)]
+    put_stats = [MonteCarloAccumulator() for _ in range(num_replicates)]
+    display_paths = None
+
+    for replicate, paths_chunk in iter_qmc_chunks(
+        S0,
+        r,
+        sigma,
+        T,
+        num_steps,
+        num_replicates,
+        replicate_size,
+        chunk_size,
+        seed,
+        bridge,
+        dtype,
+    ):
+        if display_paths is None:
+            display_paths = paths_chunk[:, :num_paths_to_display].copy()
+        call_payoffs = np.maximum(paths_chunk[-1] - K, 0)
+        put_payoffs = np.maximum(K - paths_chunk[-1], 0)
+        call_stats[replicate].update(call_payoffs)
+        put_stats[replicate].update(put_payoffs)
+        call_counts += np.histogram(
+            np.minimum(call_payoffs, call_edges[-1]), bins=call_edges
+        )[0]
+        put_counts += np.histogram(
+            np.minimum(put_payoffs, put_edges[-1]), bins=put_edges
+        )[0]
+
+    discount = np.exp(-r * T)
+    result = {
+        "call_histogram": (call_counts, call_edges),
+        "put_histogram": (put_counts, put_edges),
+        "price_paths": display_paths,
+        "num_simulations": num_simulations,
+        "num_replicates": num_replicates,
+        "chunk_size": chunk_size,
+    }
+    for option_type, replicates in (("call", call_stats), ("put", put_stats)):
+        means = np.array([stats.mean() for stats in replicates])
+        plain = MonteCarloAccumulator()
+        for stats in replicates:
+            plain.merge(stats)
+        std_error = np.std(means, ddof=1) / np.sqrt(num_replicates)
+        result[f"{option_type}_price"] = discount * np.mean(means)
+        result[f"{option_type}_std_error"] = discount * std_error
+        result[f"{option_type}_variance_reduction_factor"] = (
+            plain.variance() / plain.count / std_error**2 if std_error > 0 else np.inf
+        )
+    return result
+
+
+# Function to simulate and keep the QMC terminal prices only, in the format of
+# pricing.simulate_terminal_prices; each replicate is one batch for the error estimate
+# (fan_bins streams percentile bands of all the paths and progress reports every
+# chunk as there)
+def simulate_qmc_terminal_prices(
+    S0,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    memory_budget=64 * 2**20,
+    num_replicates=16,
+    num_paths_to_display=10,
+    dtype=np.float64,
+    seed=None,
+    bridge=True,
+    fan_bins=None,
+    progress=None,
+):
+    num_replicates, replicate_size, chunk_size = qmc_layout(
+        num_steps, num_simulations, memory_budget, num_replicates, dtype
+    )
+    fan = PathFan(S0, r, sigma, T, num_steps, fan_bins) if fan_bins else None
+    terminal = np.empty(replicate_size * num_replicates, dtype=dtype)
+    display_paths = None
+    done = 0
+    for _, paths_chunk in iter_qmc_chunks(
+        S0,
+        r,
+        sigma,
+        T,
+        num_steps,
+        num_replicates,
+        replicate_size,
+        chunk_size,
+        seed,
+        bridge,
+        dtype,
+    ):
+        if display_paths is None:
+            display_paths = paths_chunk[:, :num_paths_to_display].copy()
+        if fan is not None:
+            fan.update(paths_chunk)
+        terminal[done : done + paths_chunk.shape[1]] = paths_chunk[-1]
+        done += paths_chunk.shape[1]
+        if progress is not None:
+            progress(done, terminal.size, paths_chunk[-1])
+    return {
+        "terminal": terminal,
+        "price_paths": display_paths,
+        "batch_sizes": [replicate_size] * num_replicates,
+        "batch_means": True,
+        "antithetic": False,
+        "path_fan": fan,
+    }
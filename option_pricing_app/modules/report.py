@@ -0,0 +1,75 @@
+import io
+from datetime import datetime
+from fpdf import FPDF, XPos, YPos
+
+
+class PDFReport(FPDF):
+    def header(self):
+        self.set_font("Helvetica", "B", 14)
+        self.cell(
+            0,
+            10,
+            "Rapport de Simulation d'Options",
+            0,
+            new_x=XPos.LMARGIN,
+            new_y=YPos.NEXT,
+            align="C",
+        )
+        self.ln(10)
+
+    def footer(self):
+        self.set_y(-15)
+        self.set_font("Helvetica", "I", 8)
+        self.cell(0, 10, f"Page {self.page_no()}", 0, align="C")
+
+    def chapter_title(self, title):
+        self.set_font("Helvetica", "B", 12)
+        self.set_fill_color(200, 220, 255)
+        self.cell(
+            0, 10, title, 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="L", fill=True
+        )
+        self.ln(5)
+
+    def chapter_body(self, body):
+        self.set_font("Helvetica", "", 12)
+        self.multi_cell(0, 10, body)
+        self.ln()
+
+    def add_graph(self, image, title):
+        self.chapter_title(title)
+        self.image(io.BytesIO(image), w=170)
+        self.ln()
+
+
+# Function to build the PDF report of a simulation in memory and return its bytes,
+# graphs mapping titles to PNG images (bytes); nothing is written to disk
+def generate_pdf_report(simulation_data, graphs):
+    pdf = PDFReport()
+    pdf.add_page()
+
+    # Title page
+    pdf.set_font("Helvetica", "B", 16)
+    pdf.cell(0, 10, "", 0, new_x=XPos.LMARGIN, new_y=YPos.NEXT, align="C")
+    pdf.ln(10)
+    pdf.set_font("Helvetica", "", 12)
+    pdf.cell(
+        0,
+        10,
+        f"Date: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+        0,
+        new_x=XPos.LMARGIN,
+        new_y=YPos.NEXT,
+        align="C",
+    )
+    pdf.ln(20)
+
+    # Summary
+    pdf.chapter_title("Résumé de la Simulation")
+    for key, value in simulation_data.items():
+        pdf.chapter_body(f"{key}: {value}")
+
+    # Add graphs
+    for title, image in graphs.items():
+        pdf.add_graph(image, title)
+
+    return bytes(pdf.output())
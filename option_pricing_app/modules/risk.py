@@ -0,0 +1,161 @@
+import numpy as np
+from modules.portfolio import iter_revaluation
+
+TRADING_DAYS = 252
+# Risk horizons (trading days) reported by the app
+HORIZONS = (1, 10)
+
+
+# Function to draw num_scenarios joint spot and volatility shocks over a horizon of
+# trading days in one bulk draw: correlated normal log-returns of the spot (with
+# annual volatility spot_volatility) and absolute changes of the implied volatilities
+# (annual standard deviation volatility_of_volatility). Returns the relative price
+# changes and the volatility changes, as taken by portfolio.iter_revaluation.
+def simulate_shocks(
+    num_scenarios,
+    horizon_days=1,
+    spot_volatility=0.2,
+    volatility_of_volatility=0.1,
+    correlation=-0.5,
+    seed=None,
+):
+    if not -1 <= correlation <= 1:
+        raise ValueError("correlation must be between -1 and 1")
+    rng = np.random.default_rng(seed)
+    scale = np.sqrt(horizon_days / TRADING_DAYS)
+    normals = rng.standard_normal((2, num_scenarios))
+    spot_scale = spot_volatility * scale
+    price_changes = normals[0] * spot_scale
+    price_changes -= 0.5 * spot_scale**2
+    np.expm1(price_changes, out=price_changes)
+    volatility_changes = normals[1]
+    volatility_changes *= np.sqrt(1 - correlation**2)
+    volatility_changes += correlation * normals[0]
+    volatility_changes *= volatility_of_volatility * scale
+    return price_changes, volatility_changes
+
+
+# Function to turn daily historical moves (relative price changes and absolute
+# volatility changes) into overlapping shocks over horizon_days: price changes
+# compound and volatility changes add up over each window
+def historical_shocks(price_changes, volatility_changes=0.0, horizon_days=1):
+    price_changes, volatility_changes = np.broadcast_arrays(
+        np.asarray(price_changes, dtype=np.float64),
+        np.asarray(volatility_changes, dtype=np.float64),
+    )
+    if price_changes.ndim != 1 or price_changes.size < horizon_days:
+        raise ValueError(
+            f"At least {horizon_days} daily returns are needed for this horizon"
+        )
+    log_returns = np.concatenate(([0.0], np.cumsum(np.log1p(price_changes))))
+    cumulative_volatility = np.concatenate(([0.0], np.cumsum(volatility_changes)))
+    return (
+        np.expm1(log_returns[horizon_days:] - log_returns[:-horizon_days]),
+        cumulative_volatility[horizon_days:] - cumulative_volatility[:-horizon_days],
+    )
+
+
+# Function to load daily market moves from a CSV file with a price_change column
+# (relative daily returns of the underlying) and an optional volatility_change
+# column, and to turn them into shocks over horizon_days
+def load_historical_shocks(path, horizon_days=1):
+    import pandas as pd
+
+    frame = pd.read_csv(path)
+    if "price_change" not in frame:
+        raise ValueError("The returns file needs a price_change column")
+    volatility_changes = (
+        frame["volatility_change"].to_numpy() if "volatility_change" in frame else 0.0
+    )
+    return historical_shocks(
+        frame["price_change"].to_numpy(), volatility_changes, horizon_days
+    )
+
+
+# Function to keep the num_tail largest losses (and their scenario indices) of the
+# losses seen so far and a new chunk of them
+def _merge_tail(tail_losses, tail_indices, losses, indices, num_tail):
+    tail_losses = np.concatenate((tail_losses, losses))
+    tail_indices = np.concatenate((tail_indices, indices))
+    if tail_losses.size > num_tail:
+        keep = np.argpartition(tail_losses, tail_losses.size - num_tail)[-num_tail:]
+        tail_losses = tail_losses[keep]
+        tail_indices = tail_indices[keep]
+    return tail_losses, tail_indices
+
+
+# Function to compute the value at risk and expected shortfall of a portfolio over
+# shocks (price_changes, volatility_changes) at a risk horizon of horizon_days, by full
+# revaluation of every position. The loss distribution is streamed in chunks of at
+# most memory_budget bytes: the first pass keeps only the worst (1 - confidence)
+# fraction of the losses, so VaR is the smallest of those and ES their mean; with
+# contributions or bins, a second pass revalues the chunks again for the component
+# ES of every position (its mean loss over the tail scenarios, summing to ES) and a
+# histogram of the P&L. Losses are positive numbers.
+def portfolio_risk(
+    portfolio,
+    price_changes,
+    volatility_changes,
+    confidence=0.99,
+    horizon_days=1,
+    memory_budget=64 * 2**20,
+    contributions=True,
+    bins=None,
+):
+    if not 0 < confidence < 1:
+        raise ValueError("confidence must be between 0 and 1")
+    num_scenarios = np.broadcast(
+        np.asarray(price_changes), np.asarray(volatility_changes)
+    ).size
+    num_tail = max(1, int(np.ceil((1 - confidence) * num_scenarios - 1e-9)))
+
+    def revaluation():
+        return iter_revaluation(
+            portfolio,
+            price_changes,
+            volatility_changes,
+            memory_budget,
+            horizon=horizon_days / TRADING_DAYS,
+        )
+
+    tail_losses = np.empty(0)
+    tail_indices = np.empty(0, dtype=np.intp)
+    lowest, highest = np.inf, -np.inf
+    for scenarios, _, position_pnl in revaluation():
+        pnl = position_pnl.sum(axis=1)
+        lowest = min(lowest, pnl.min())
+        highest = max(highest, pnl.max())
+        tail_losses, tail_indices = _merge_tail(
+            tail_losses,
+            tail_indices,
+            -pnl,
+            np.arange(scenarios.start, scenarios.stop),
+            num_tail,
+        )
+
+    result = {
+        "var": float(tail_losses.min()),
+        "es": float(tail_losses.mean()),
+        "confidence": confidence,
+        "horizon_days": horizon_days,
+        "num_scenarios": num_scenarios,
+    }
+    if not contributions and not bins:
+        return result
+
+    in_tail = np.zeros(num_scenarios, dtype=bool)
+    in_tail[tail_indices] = True
+    component_es = np.zeros(len(portfolio))
+    if bins:
+        edges = np.linspace(lowest, max(highest, lowest + 1e-9), bins + 1)
+        counts = np.zeros(bins, dtype=np.int64)
+    for scenarios, _, position_pnl in revaluation():
+        if contributions:
+            component_es -= position_pnl[in_tail[scenarios]].sum(axis=0)
+        if bins:
+            counts += np.histogram(position_pnl.sum(axis=1), edges)[0]
+    if contributions:
+        result["contributions"] = component_es / num_tail
+    if bins:
+        result["histogram"] = (counts, edges)
+    return result
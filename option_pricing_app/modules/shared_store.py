@@ -0,0 +1,305 @@
+import os
+import pickle
+import sqlite3
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+
+# Prefix of the shared memory segment names; the rest is the start of the result key
+SEGMENT_PREFIX = "optapp_"
+# Array buffers start on multiples of this many bytes inside a segment
+ALIGNMENT = 64
+_HEADER = struct.Struct("<QQ")
+_BUFFER = struct.Struct("<QQ")
+
+
+def segment_name(key):
+    return f"{SEGMENT_PREFIX}{key[:24]}"
+
+
+def _aligned(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+# Function to tell whether a process is still running
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# Shared memory segment whose close() leaves the mapping in place while arrays of a
+# result still point into it; the mapping then goes away with them or the process
+class _Segment(shared_memory.SharedMemory):
+    def close(self):
+        try:
+            super().close()
+        except BufferError:
+            pass
+
+
+# Function to open (create or attach) a shared memory segment that this store, not
+# multiprocessing's resource tracker, is responsible for: the tracker would unlink
+# segments when the process that created or attached them exits, while other server
+# processes still use them
+def _open_segment(name, size=0):
+    segment = _Segment(name=name, create=size > 0, size=size)
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+# Function to unlink a segment opened with _open_segment. SharedMemory.unlink() also
+# unregisters the name from the resource tracker, which expects it registered.
+def _unlink(segment):
+    segment.close()
+    resource_tracker.register(segment._name, "shared_memory")
+    segment.unlink()
+
+
+# Function to unlink a segment by name, ignoring segments already gone
+def _unlink_segment(name):
+    try:
+        segment = _open_segment(name)
+    except FileNotFoundError:
+        return
+    _unlink(segment)
+
+
+# Function to lay a result out in one segment: a header, the pickle of the result
+# with its contiguous arrays taken out of band, a table of (offset, size) of those
+# arrays, then the arrays themselves
+def _write_segment(key, value):
+    buffers = []
+    data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+    table_offset = _HEADER.size + len(data)
+    offset = _aligned(table_offset + _BUFFER.size * len(raws))
+    layout = []
+    for raw in raws:
+        layout.append((offset, raw.nbytes))
+        offset = _aligned(offset + raw.nbytes)
+    segment = _open_segment(segment_name(key), max(offset, 1))
+    try:
+        memory = segment.buf
+        _HEADER.pack_into(memory, 0, len(data), len(raws))
+        memory[_HEADER.size : table_offset] = data
+        for index, ((start, size), raw) in enumerate(zip(layout, raws)):
+            _BUFFER.pack_into(memory, table_offset + index * _BUFFER.size, start, size)
+            memory[start : start + size] = raw
+        del memory
+    except BaseException:
+        memory = None
+        _unlink(segment)
+        raise
+    return segment
+
+
+# Function to rebuild a result from its segment; its arrays are read-only views of
+# the shared memory, not copies
+def _read_segment(segment):
+    memory = segment.buf.toreadonly()
+    data_size, num_buffers = _HEADER.unpack_from(memory, 0)
+    table_offset = _HEADER.size + data_size
+    buffers = []
+    for index in range(num_buffers):
+        start, size = _BUFFER.unpack_from(memory, table_offset + index * _BUFFER.size)
+        buffers.append(memory[start : start + size])
+    return pickle.loads(memory[_HEADER.size : table_offset], buffers=buffers)
+
+
+# Cross-process store of simulation results in named shared memory segments, one per
+# result key, so the worker processes of a multi-process server map results another
+# worker computed instead of recomputing and copying them. The index (key, segment,
+# size, last use) and the references (which processes map which result) live in
+# SQLite tables of index_path, a file shared by the processes. A process holds a
+# reference from the time it publishes or maps a result until close(); the last
+# process to release a result unlinks its segment. Above max_bytes, publishing
+# unlinks the least recently used results: processes that mapped them keep valid
+# mappings, but they can no longer be mapped by key.
+class SharedResultStore:
+    def __init__(self, index_path, max_bytes=1024 * 2**20):
+        self.index_path = index_path
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self.pid = None
+        with self._lock, self._db:
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS results (
+                    key TEXT PRIMARY KEY,
+                    segment TEXT,
+                    nbytes INTEGER,
+                    created REAL,
+                    used REAL
+                )
+                """)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS refs (
+                    key TEXT,
+                    pid INTEGER,
+                    PRIMARY KEY (key, pid)
+                )
+                """)
+        self.collect()
+
+    # Function to give this process its own SQLite connection and mappings. Neither
+    # survives a fork (e.g. a server importing the app before forking its workers): a
+    # forked process opens its own connection and maps results again.
+    def _check_process(self):
+        if self.pid != os.getpid():
+            self.pid = os.getpid()
+            self._connection = sqlite3.connect(
+                self.index_path, timeout=30, check_same_thread=False
+            )
+            self._segments = {}
+            self._values = {}
+
+    @property
+    def _db(self):
+        self._check_process()
+        return self._connection
+
+    def __contains__(self, key):
+        with self._lock:
+            self._check_process()
+            if key in self._values:
+                return True
+            row = self._db.execute(
+                "SELECT 1 FROM results WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None
+
+    # Function to return the result published under key, mapped without copying its
+    # arrays (None when no process published it)
+    def get(self, key, default=None):
+        with self._lock:
+            self._check_process()
+            if key in self._values:
+                self._touch(key)
+                return self._values[key]
+            row = self._db.execute(
+                "SELECT segment FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return default
+            try:
+                segment = _open_segment(row[0])
+            except FileNotFoundError:
+                return default
+            value = _read_segment(segment)
+            self._segments[key] = segment
+            self._values[key] = value
+            with self._db:
+                self._db.execute(
+                    "INSERT OR IGNORE INTO refs (key, pid) VALUES (?, ?)",
+                    (key, self.pid),
+                )
+            self._touch(key)
+            return value
+
+    # Function to publish a result under key; a result already published by another
+    # process (or larger than max_bytes) is left as it is. Returns whether it was
+    # published.
+    def put(self, key, value):
+        with self._lock:
+            if key in self:
+                return False
+            try:
+                segment = _write_segment(key, value)
+            except FileExistsError:
+                # Another process is publishing the same key
+                return False
+            if segment.size > self.max_bytes:
+                _unlink(segment)
+                return False
+            now = time.time()
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO results (key, segment, nbytes, created, used) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, segment.name, segment.size, now, now),
+                )
+                self._db.execute(
+                    "INSERT OR IGNORE INTO refs (key, pid) VALUES (?, ?)",
+                    (key, self.pid),
+                )
+            self._segments[key] = segment
+            self._values[key] = _read_segment(segment)
+            self._evict()
+            return True
+
+    # Function to return the number of processes holding a reference to a result
+    def refcount(self, key):
+        with self._lock:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM refs WHERE key = ?", (key,)
+            ).fetchone()[0]
+
+    def stats(self):
+        with self._lock:
+            entries, nbytes = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(nbytes), 0) FROM results"
+            ).fetchone()
+            return {
+                "entries": entries,
+                "bytes": nbytes,
+                "mapped": len(self._values),
+                "max_bytes": self.max_bytes,
+            }
+
+    # Function to drop the references of processes that exited without closing the
+    # store (e.g. killed workers) and unlink the results nobody references anymore
+    def collect(self):
+        with self._lock, self._db:
+            pids = [row[0] for row in self._db.execute("SELECT DISTINCT pid FROM refs")]
+            for pid in pids:
+                if pid != self.pid and not _alive(pid):
+                    self._db.execute("DELETE FROM refs WHERE pid = ?", (pid,))
+            self._unlink_unreferenced()
+
+    # Function to release every result this process maps, unlinking those no other
+    # live process references (references left by processes that died without
+    # closing the store are dropped too); called when the server shuts down
+    def close(self):
+        with self._lock:
+            self._values.clear()
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+            with self._db:
+                self._db.execute("DELETE FROM refs WHERE pid = ?", (self.pid,))
+            self.collect()
+
+    def _touch(self, key):
+        with self._db:
+            self._db.execute(
+                "UPDATE results SET used = ? WHERE key = ?", (time.time(), key)
+            )
+
+    def _unlink_unreferenced(self):
+        rows = self._db.execute(
+            "SELECT key, segment FROM results "
+            "WHERE key NOT IN (SELECT key FROM refs)"
+        ).fetchall()
+        for key, name in rows:
+            self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+            _unlink_segment(name)
+
+    # Function to unlink the least recently used results above max_bytes
+    def _evict(self):
+        with self._db:
+            rows = self._db.execute(
+                "SELECT key, segment, nbytes FROM results ORDER BY used DESC"
+            ).fetchall()
+            total = 0
+            for key, name, nbytes in rows:
+                total += nbytes
+                if total <= self.max_bytes:
+                    continue
+                self._db.execute("DELETE FROM results WHERE key = ?", (key,))
+                self._db.execute("DELETE FROM refs WHERE key = ?", (key,))
+                _unlink_segment(name)
@@ -1,20 +1,56 @@
 import numpy as np
 from modules.calculations import call_price, put_price
-from scipy.optimize import brentq
-from scipy.stats import norm
-
-
-# Function to generate price paths using Monte Carlo simulation
-def generate_scenarios(S0, r, sigma, T, num_steps, num_simulations):
-    dt = T / num_steps
-    price_paths = np.zeros((num_steps + 1, num_simulations))
-    price_paths[0] = S0
-    for t in range(1, num_steps + 1):
-        z = np.random.standard_normal(num_simulations)
-        price_paths[t] = price_paths[t - 1] * np.exp(
-            (r - 0.5 * sigma**2) * dt + sigma * np.sqrt(dt) * z
+from modules.models import get_model
+from modules.portfolio import portfolio_from_records, revalue_portfolio
+from scipy.special import ndtr
+
+
+# Function to generate price paths using Monte Carlo simulation.
+# Paths are laid out as (num_steps + 1, num_simulations) in C order so that each
+# time step (and in particular the terminal row read by the payoff functions) is
+# contiguous. All log-increments are drawn directly into the output buffer by the
+# model kernel (see models.get_model; GBM by default, in one block), accumulated in
+# place in log space and exponentiated in place. out may also be a block of columns
+# of a wider path array (rows contiguous, e.g. shared memory written by a worker).
+def generate_scenarios(
+    S0,
+    r,
+    sigma,
+    T,
+    num_steps,
+    num_simulations,
+    dtype=np.float64,
+    out=None,
+    seed=None,
+    antithetic=False,
+    moment_matching=False,
+    model=None,
+):
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.float64):
+        raise ValueError("dtype must be float32 or float64")
+    shape = (num_steps + 1, num_simulations)
+    if out is None:
+        out = np.empty(shape, dtype=dtype)
+    elif (
+        out.shape != shape
+        or out.dtype != dtype
+        or out.strides[-1] != dtype.itemsize
+        or not out.flags.writeable
+    ):
+        raise ValueError(
+            f"out must be a {dtype} array of shape {shape} with contiguous rows, "
+            f"got {out.dtype} array of shape {out.shape}"
         )
-    return price_paths
+    rng = np.random.default_rng(seed)
+    get_model(model).fill_increments(
+        out[1:], r, sigma, T / num_steps, rng, antithetic, moment_matching
+    )
+    out[0] = 0
+    np.cumsum(out, axis=0, out=out)
+    np.exp(out, out=out)
+    out *= S0
+    return out
 
 
 # Function to calculate call payoffs
@@ -39,17 +75,15 @@ def simulate_option_value(option, condition):
 
 # Function to simulate different market scenarios
 def simulate_scenario(option_portfolio, market_conditions):
-    simulated_values = []
-    for condition in market_conditions:
-        portfolio_value = 0
-        for option in option_portfolio:
-            value = simulate_option_value(option, condition)
-            portfolio_value += value
-        simulated_values.append(portfolio_value)
-    return simulated_values
+    result = revalue_portfolio(
+        portfolio_from_records(option_portfolio),
+        [condition["price_change"] for condition in market_conditions],
+        [condition["volatility_change"] for condition in market_conditions],
+    )
+    return result["values"].tolist()
 
 
 def black_scholes_call(S, K, T, r, sigma):
     d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
     d2 = d1 - sigma * np.sqrt(T)
-    return S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2)
+    return S * ndtr(d1) - K * np.exp(-r * T) * ndtr(d2)
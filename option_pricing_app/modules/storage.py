@@ -0,0 +1,267 @@
+import json
+import os
+import time
+import numpy as np
+from modules.cache import make_key
+from modules.models import describe_model
+from modules.parallel import _iter_tasks, split_blocks
+from modules.pricing import PathFan
+from modules.simulations import generate_scenarios
+
+# Simulations per stored block. Each block is simulated with its own spawned random
+# stream (as in parallel_generate_scenarios), so a stored run is reproducible from
+# its seed and block size whatever the number of workers that wrote it.
+STORE_BLOCK_SIZE = 2**14
+
+
+# Function to yield (start, paths) column slices of at most chunk_size simulations
+# of a (num_steps + 1, num_simulations) path array; memory-mapped arrays are only
+# read from disk one slice at a time
+def iter_path_chunks(paths, chunk_size):
+    for start in range(0, paths.shape[1], chunk_size):
+        yield start, paths[:, start : start + chunk_size]
+
+
+def _write_block(task):
+    path, start, size, params, stream, options = task
+    paths = np.load(path, mmap_mode="r+")
+    try:
+        paths[:, start : start + size] = generate_scenarios(
+            *params, size, seed=np.random.default_rng(stream), **options
+        )
+        paths.flush()
+    finally:
+        del paths
+
+
+# On-disk store of simulated price paths. Each run is a memory-mapped .npy file in
+# the generate_scenarios layout, written block by block (so runs may exceed RAM) and
+# described by a JSON sidecar holding the model, its parameters, the seed and the
+# block layout. Runs are identified by a hash of that description, so the same
+# parameters (seed included) always map to the same run.
+class PathStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, extension):
+        return os.path.join(self.directory, f"{key}.{extension}")
+
+    # Function to describe a run: the effective number of simulations and block size
+    # (even for antithetic runs, at least min_batches blocks for moment-matched runs)
+    # and the key identifying it. Unseeded runs get a fresh seed recorded in the
+    # description. Models other than GBM also record their parameters
+    # ("model_params"), so GBM runs keep the keys they had before models existed.
+    def describe(
+        self,
+        S0,
+        r,
+        sigma,
+        T,
+        num_steps,
+        num_simulations,
+        seed=None,
+        dtype=np.float64,
+        antithetic=False,
+        moment_matching=False,
+        block_size=STORE_BLOCK_SIZE,
+        min_batches=16,
+        model=None,
+    ):
+        if seed is None:
+            seed = np.random.SeedSequence().entropy
+        if antithetic:
+            num_simulations += num_simulations % 2
+        if moment_matching:
+            block_size = min(block_size, max(2, -(-num_simulations // min_batches)))
+        if antithetic:
+            block_size += block_size % 2
+        model_params = describe_model(model)
+        description = {
+            "model": model_params.pop("name"),
+            "params": {
+                "S0": S0,
+                "r": r,
+                "sigma": sigma,
+                "T": T,
+                "num_steps": num_steps,
+                "num_simulations": num_simulations,
+            },
+            "seed": int(seed),
+            "dtype": np.dtype(dtype).name,
+            "antithetic": bool(antithetic),
+            "moment_matching": bool(moment_matching),
+            "block_size": block_size,
+        }
+        if model_params:
+            description["model_params"] = model_params
+        # Seeds may be 128-bit entropy, which the float keys of make_key would round
+        description["key"] = make_key(
+            **dict(description, seed=str(description["seed"]))
+        )
+        return description
+
+    # Function to simulate a run into the store (replacing any previous copy), blocks
+    # being written by num_workers processes; the sidecar marks the run complete only
+    # once every block is on disk, and an interrupted run is removed. progress is
+    # called as progress(done, num_simulations, terminal_block) after every block.
+    # Returns the run key.
+    def write(
+        self,
+        S0,
+        r,
+        sigma,
+        T,
+        num_steps,
+        num_simulations,
+        num_workers=1,
+        progress=None,
+        **options,
+    ):
+        description = self.describe(
+            S0, r, sigma, T, num_steps, num_simulations, **options
+        )
+        key = description["key"]
+        params = description["params"]
+        shape = (num_steps + 1, params["num_simulations"])
+        metadata = dict(description, shape=shape, created=time.time(), complete=False)
+        self._write_metadata(key, metadata)
+        path = self._path(key, "npy")
+        np.lib.format.open_memmap(path, mode="w+", dtype=metadata["dtype"], shape=shape)
+
+        blocks = split_blocks(params["num_simulations"], description["block_size"])
+        streams = np.random.SeedSequence(description["seed"]).spawn(len(blocks))
+        block_options = {
+            "dtype": metadata["dtype"],
+            "antithetic": description["antithetic"],
+            "moment_matching": description["moment_matching"],
+            "model": dict(
+                description.get("model_params", {}), name=description["model"]
+            ),
+        }
+        tasks = [
+            (path, start, size, (S0, r, sigma, T, num_steps), stream, block_options)
+            for (start, size), stream in zip(blocks, streams)
+        ]
+        try:
+            paths = np.load(path, mmap_mode="r")
+            for (start, size), _ in zip(
+                blocks, _iter_tasks(_write_block, tasks, num_workers)
+            ):
+                if progress is not None:
+                    progress(start + size, shape[1], paths[-1, start : start + size])
+        except BaseException:
+            self.delete(key)
+            raise
+        metadata["complete"] = True
+        self._write_metadata(key, metadata)
+        return key
+
+    # Function to return the key of the stored run for these parameters, simulating
+    # it first when it is not (completely) in the store
+    def get_or_create(
+        self,
+        S0,
+        r,
+        sigma,
+        T,
+        num_steps,
+        num_simulations,
+        num_workers=1,
+        progress=None,
+        **options,
+    ):
+        key = self.find(S0, r, sigma, T, num_steps, num_simulations, **options)
+        if key is not None:
+            return key
+        return self.write(
+            S0,
+            r,
+            sigma,
+            T,
+            num_steps,
+            num_simulations,
+            num_workers,
+            progress,
+            **options,
+        )
+
+    # Function to return the key of a complete stored run with these parameters, or
+    # None (unseeded parameters never match a stored run)
+    def find(self, S0, r, sigma, T, num_steps, num_simulations, **options):
+        if options.get("seed") is None:
+            return None
+        description = self.describe(
+            S0, r, sigma, T, num_steps, num_simulations, **options
+        )
+        return description["key"] if description["key"] in self else None
+
+    def __contains__(self, key):
+        metadata = self.metadata(key)
+        return metadata is not None and metadata["complete"]
+
+    def _write_metadata(self, key, metadata):
+        temporary = self._path(key, "json.tmp")
+        with open(temporary, "w") as file:
+            json.dump(metadata, file, indent=2)
+        os.replace(temporary, self._path(key, "json"))
+
+    def metadata(self, key):
+        try:
+            with open(self._path(key, "json")) as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return None
+
+    # Function to list the metadata of the complete runs, most recent first
+    def list_runs(self):
+        runs = []
+        for filename in os.listdir(self.directory):
+            if filename.endswith(".json"):
+                metadata = self.metadata(filename[: -len(".json")])
+                if metadata is not None and metadata["complete"]:
+                    runs.append(metadata)
+        return sorted(runs, key=lambda metadata: metadata["created"], reverse=True)
+
+    # Function to open the paths of a run read-only without loading them: slices of
+    # the returned memmap are read from disk on access
+    def open_paths(self, key):
+        if key not in self:
+            raise KeyError(f"No complete stored run {key}")
+        return np.load(self._path(key, "npy"), mmap_mode="r")
+
+    # Function to present a stored run like simulate_terminal_prices does, for
+    # price_from_terminal and the plots: the terminal prices are the (contiguous) last
+    # row of the memmap, batches are the stored blocks. Percentile fan bands, when
+    # requested, are streamed from the stored paths chunk by chunk.
+    def simulation(self, key, num_paths_to_display=10, fan_bins=None):
+        metadata = self.metadata(key)
+        paths = self.open_paths(key)
+        fan = None
+        if fan_bins:
+            params = metadata["params"]
+            fan = PathFan(
+                params["S0"],
+                params["r"],
+                params["sigma"],
+                params["T"],
+                params["num_steps"],
+                fan_bins,
+            )
+            for _, chunk in iter_path_chunks(paths, metadata["block_size"]):
+                fan.update(chunk)
+        return {
+            "terminal": paths[-1],
+            "price_paths": np.array(paths[:, :num_paths_to_display]),
+            "batch_sizes": [
+                size for _, size in split_blocks(paths.shape[1], metadata["block_size"])
+            ],
+            "batch_means": metadata["moment_matching"],
+            "antithetic": metadata["antithetic"],
+            "path_fan": fan,
+        }
+
+    def delete(self, key):
+        for extension in ("npy", "json"):
+            if os.path.exists(self._path(key, extension)):
+                os.remove(self._path(key, extension))
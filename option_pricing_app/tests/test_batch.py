@@ -0,0 +1,106 @@
+import csv
+import importlib.util
+import json
+import os
+import tempfile
+import unittest
+from modules.batch import (
+    CsvResultWriter,
+    RESULT_COLUMNS,
+    load_parameter_table,
+    price_row,
+    row_settings,
+    run_batch,
+)
+
+DEFAULTS = {
+    "num_simulations": 20000,
+    "num_steps": 12,
+    "seed": None,
+    "antithetic": True,
+    "moment_matching": False,
+    "control_variate": "spot",
+}
+
+
+class TestBatch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.rows = [
+            {"S0": 100, "K": K, "T": 1, "r": 0.05, "sigma": 0.2}
+            for K in range(80, 125, 5)
+        ]
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def read_csv(self, path):
+        with open(path, newline="") as file:
+            return list(csv.DictReader(file))
+
+    def test_load_parameter_table(self):
+        with open(self.path("params.json"), "w") as file:
+            json.dump(self.rows[:2], file)
+        rows = load_parameter_table(self.path("params.json"))
+        self.assertEqual(rows[1]["K"], 85)
+        with open(self.path("params.csv"), "w") as file:
+            file.write("S0,K,T,r\n100,100,1,0.05\n")
+        with self.assertRaises(ValueError):
+            load_parameter_table(self.path("params.csv"))
+
+    def test_row_settings(self):
+        settings = row_settings(3, {"seed": float("nan"), "num_steps": 4}, DEFAULTS, 0)
+        self.assertEqual(settings["num_steps"], 4)
+        self.assertEqual(settings, row_settings(3, {"num_steps": 4}, DEFAULTS, 0))
+        self.assertNotEqual(settings["seed"], row_settings(4, {}, DEFAULTS, 0)["seed"])
+        self.assertEqual(row_settings(3, {"seed": 7}, DEFAULTS, 0)["seed"], 7)
+
+    def test_price_row_matches_closed_form(self):
+        record = price_row(
+            (0, self.rows[4], row_settings(0, self.rows[4], DEFAULTS, 1), 2**20)
+        )
+        self.assertEqual(set(record), set(RESULT_COLUMNS))
+        self.assertLess(abs(record["call_z_score"]), 4)
+        self.assertLess(abs(record["put_z_score"]), 4)
+        self.assertAlmostEqual(record["bs_call"], 10.4506, places=4)
+
+    def test_interrupted_run_resumes(self):
+        output = self.path("results.csv")
+        full = run_batch(self.rows, self.path("reference.csv"), DEFAULTS, batch_size=4)
+        self.assertEqual(full, {"rows": 9, "skipped": 0, "priced": 9})
+
+        # First run stops after 5 rows, the last line being cut short by the crash
+        run_batch(self.rows[:5], output, DEFAULTS, batch_size=2)
+        with open(output, "a") as file:
+            file.write("5,100.0,105")
+        self.assertEqual(CsvResultWriter(output).completed, set(range(5)))
+        summary = run_batch(self.rows, output, DEFAULTS, batch_size=2)
+        self.assertEqual(summary, {"rows": 9, "skipped": 5, "priced": 4})
+
+        resumed = self.read_csv(output)
+        reference = self.read_csv(self.path("reference.csv"))
+        self.assertEqual([row["row"] for row in resumed], [str(i) for i in range(9)])
+        for resumed_row, reference_row in zip(resumed, reference):
+            self.assertEqual(resumed_row["mc_call"], reference_row["mc_call"])
+
+        restarted = run_batch(self.rows[:2], output, DEFAULTS, resume=False)
+        self.assertEqual(restarted["skipped"], 0)
+        self.assertEqual(len(self.read_csv(output)), 2)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow not installed")
+    def test_parquet_output(self):
+        import pandas as pd
+
+        output = self.path("results.parquet")
+        run_batch(self.rows[:3], output, DEFAULTS, batch_size=2)
+        summary = run_batch(self.rows, output, DEFAULTS, batch_size=2)
+        self.assertEqual(summary["skipped"], 3)
+        self.assertEqual(sorted(pd.read_parquet(output)["row"]), list(range(9)))
+
+
+if __name__ == "__main__":
+    unittest.main()
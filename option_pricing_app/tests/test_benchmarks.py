@@ -0,0 +1,44 @@
+import unittest
+from benchmarks.run_benchmarks import case_key, compare_results, measure
+
+
+class TestBenchmarks(unittest.TestCase):
+
+    def result(self, wall_time, peak, num_simulations=1000):
+        return {
+            "name": "generate_scenarios",
+            "params": {"num_steps": 52, "num_simulations": num_simulations},
+            "wall_time_median": wall_time,
+            "peak_memory_bytes": peak,
+        }
+
+    def test_case_key_is_order_independent(self):
+        self.assertEqual(
+            case_key(self.result(1, 1)),
+            "generate_scenarios[num_simulations=1000,num_steps=52]",
+        )
+
+    def test_compare_results(self):
+        baseline = {"results": [self.result(1.0, 1000), self.result(2.0, 1000, 10)]}
+        rows, regressed = compare_results(
+            {"results": [self.result(1.1, 1000), self.result(2.0, 1000, 99)]},
+            baseline,
+            threshold=0.2,
+        )
+        self.assertFalse(regressed)
+        self.assertEqual(len(rows), 1)
+        self.assertAlmostEqual(rows[0]["time_ratio"], 1.1)
+
+        for slower in (self.result(1.3, 1000), self.result(1.0, 2000)):
+            rows, regressed = compare_results({"results": [slower]}, baseline, 0.2)
+            self.assertTrue(regressed)
+            self.assertTrue(rows[0]["regressed"])
+
+    def test_measure(self):
+        times, peak = measure(lambda: bytearray(10**6), repeat=3)
+        self.assertEqual(len(times), 3)
+        self.assertGreaterEqual(peak, 10**6)
+
+
+if __name__ == "__main__":
+    unittest.main()
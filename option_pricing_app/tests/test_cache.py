@@ -0,0 +1,68 @@
+import tempfile
+import unittest
+import numpy as np
+from modules.cache import ResultCache, make_key, result_nbytes
+
+
+class TestCache(unittest.TestCase):
+
+    def test_make_key_normalizes_parameters(self):
+        self.assertEqual(
+            make_key(S0=100, sigma=0.2, widgets=["a", "b"], seed=1),
+            make_key(seed=1.0, widgets=("b", "a"), sigma=np.float64(0.2), S0=100.0),
+        )
+        self.assertNotEqual(make_key(S0=100, seed=1), make_key(S0=100, seed=2))
+        self.assertNotEqual(make_key(S0=100, seed=None), make_key(S0=100, seed=0))
+
+    def test_lru_eviction_by_bytes(self):
+        cache = ResultCache(max_bytes=3 * 8000 + 500)
+        for key in "abc":
+            cache.put(key, np.zeros(1000))
+        self.assertIsNotNone(cache.get("a"))
+        cache.put("d", np.zeros(1000))
+
+        self.assertIsNone(cache.get("b"))
+        for key in "acd":
+            self.assertIsNotNone(cache.get(key))
+        stats = cache.stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertEqual(stats["hits"], 4)
+        self.assertEqual(stats["misses"], 1)
+        self.assertLessEqual(stats["bytes"], cache.max_bytes)
+
+        cache.put("huge", np.zeros(10**5))
+        self.assertNotIn("huge", cache)
+        self.assertEqual(len(cache), 3)
+
+    def test_get_or_compute(self):
+        cache = ResultCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return {"price": 1.0, "paths": np.ones((3, 2))}
+
+        first = cache.get_or_compute("key", compute)
+        second = cache.get_or_compute("key", compute)
+        self.assertIs(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertGreaterEqual(result_nbytes(first), 48)
+
+    def test_disk_tier(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache = ResultCache(max_bytes=10**6, disk_dir=directory)
+            cache.put("key", {"paths": np.arange(5.0)})
+            restarted = ResultCache(max_bytes=10**6, disk_dir=directory)
+            self.assertIn("key", restarted)
+            np.testing.assert_array_equal(restarted.get("key")["paths"], np.arange(5.0))
+            self.assertEqual(restarted.stats()["disk_hits"], 1)
+            self.assertIsNotNone(restarted.get("key"))
+            self.assertEqual(restarted.stats()["hits"], 1)
+
+            bounded = ResultCache(disk_dir=directory, disk_max_bytes=1000)
+            bounded.put("large", np.zeros(1000))
+            self.assertNotIn("key", ResultCache(disk_dir=directory))
+
+
+if __name__ == "__main__":
+    unittest.main()
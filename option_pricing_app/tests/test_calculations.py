@@ -1,5 +1,7 @@
 import unittest
+import numpy as np
 from modules.calculations import (
+    greeks,
     call_price,
     put_price,
     call_delta,
@@ -62,6 +64,38 @@ class TestCalculations(unittest.TestCase):
         rho = put_rho(self.S, self.K, self.T, self.r, self.sigma)
         self.assertAlmostEqual(rho, -0.4189, places=4)
 
+    def test_greeks_matches_scalar_functions(self):
+        g = greeks(self.S, self.K, self.T, self.r, self.sigma)
+        self.assertAlmostEqual(g["call_price"], 10.4506, places=4)
+        self.assertAlmostEqual(g["put_price"], 5.5735, places=4)
+        self.assertAlmostEqual(g["call_delta"], 0.6368, places=4)
+        self.assertAlmostEqual(g["put_delta"], -0.3632, places=4)
+        self.assertAlmostEqual(g["gamma"], 0.01876, places=5)
+        self.assertAlmostEqual(g["vega"], 0.3752, places=4)
+        self.assertAlmostEqual(g["call_theta"], -0.0176, places=4)
+        self.assertAlmostEqual(g["put_theta"], -0.0045, places=4)
+        self.assertAlmostEqual(g["call_rho"], 0.5323, places=4)
+        self.assertAlmostEqual(g["put_rho"], -0.4189, places=4)
+
+    def test_greeks_broadcast_over_grids(self):
+        spots = np.linspace(80, 120, 5)[:, None, None]
+        vols = np.array([0.1, 0.2, 0.3])[None, :, None]
+        maturities = np.array([0.5, 1.0])[None, None, :]
+        g = greeks(spots, self.K, maturities, self.r, vols)
+        for name, values in g.items():
+            self.assertEqual(values.shape, (5, 3, 2), name)
+        self.assertAlmostEqual(
+            g["call_price"][2, 1, 1], call_price(100, self.K, 1.0, self.r, 0.2)
+        )
+        self.assertAlmostEqual(
+            g["put_theta"][0, 2, 0], put_theta(80, self.K, 0.5, self.r, 0.3)
+        )
+        # Put-call parity holds on the whole grid
+        np.testing.assert_allclose(
+            g["call_price"] - g["put_price"],
+            spots - self.K * np.exp(-self.r * maturities) + 0 * vols,
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
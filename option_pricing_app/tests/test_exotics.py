@@ -0,0 +1,133 @@
+import unittest
+import numpy as np
+from modules.exotics import (
+    geometric_asian_price,
+    iter_path_aggregates,
+    price_exotic_streaming,
+)
+from modules.simulations import generate_scenarios
+
+
+class TestExotics(unittest.TestCase):
+
+    def setUp(self):
+        self.params = (100, 100, 0.05, 0.2, 1, 52)
+
+    def test_aggregates_match_full_paths(self):
+        for antithetic in (False, True):
+            paths = generate_scenarios(
+                100, 0.05, 0.2, 1, 20, 500, seed=7, antithetic=antithetic
+            )
+            aggregates, display_paths = next(
+                iter_path_aggregates(
+                    100,
+                    0.05,
+                    0.2,
+                    1,
+                    20,
+                    500,
+                    500,
+                    np.random.default_rng(7),
+                    antithetic=antithetic,
+                )
+            )
+            np.testing.assert_allclose(
+                aggregates.arithmetic_average(), paths[1:].mean(0)
+            )
+            np.testing.assert_allclose(
+                aggregates.geometric_average(), np.exp(np.log(paths[1:]).mean(0))
+            )
+            np.testing.assert_array_equal(aggregates.maximum, paths.max(0))
+            np.testing.assert_array_equal(aggregates.minimum, paths.min(0))
+            np.testing.assert_array_equal(aggregates.terminal, paths[-1])
+            np.testing.assert_array_equal(display_paths, paths[:, :10])
+
+    def test_geometric_asian_matches_closed_form(self):
+        result = price_exotic_streaming(
+            *self.params, 100000, "asian_geometric", seed=1, antithetic=True
+        )
+        for option_type, is_call in (("call", True), ("put", False)):
+            exact = geometric_asian_price(100, 100, 1, 0.05, 0.2, 52, is_call)
+            self.assertLess(
+                abs(result[f"{option_type}_price"] - exact),
+                4 * result[f"{option_type}_std_error"],
+            )
+
+    def test_geometric_asian_control_variate(self):
+        plain, controlled = (
+            price_exotic_streaming(
+                *self.params,
+                20000,
+                "asian_arithmetic",
+                seed=5,
+                control_variate=control_variate,
+            )
+            for control_variate in (None, "geometric_asian")
+        )
+        for option_type in ("call", "put"):
+            self.assertLess(
+                abs(controlled[f"{option_type}_price"] - plain[f"{option_type}_price"]),
+                4 * plain[f"{option_type}_std_error"],
+            )
+            self.assertGreater(
+                controlled[f"{option_type}_variance_reduction_factor"], 100
+            )
+        with self.assertRaises(ValueError):
+            price_exotic_streaming(
+                *self.params, 100, "lookback", control_variate="geometric_asian"
+            )
+
+    def test_knock_in_and_knock_out_add_up_to_vanilla(self):
+        vanilla = price_exotic_streaming(
+            *self.params, 20000, "barrier", barrier=1e9, seed=2
+        )
+        for direction, barrier in (("up", 115), ("down", 90)):
+            knock_out, knock_in = (
+                price_exotic_streaming(
+                    *self.params,
+                    20000,
+                    "barrier",
+                    barrier=barrier,
+                    barrier_type=f"{direction}-and-{kind}",
+                    seed=2,
+                )
+                for kind in ("out", "in")
+            )
+            for option_type in ("call", "put"):
+                self.assertAlmostEqual(
+                    knock_out[f"{option_type}_price"]
+                    + knock_in[f"{option_type}_price"],
+                    vanilla[f"{option_type}_price"],
+                )
+
+    def test_lookback_dominates_vanilla(self):
+        lookback = price_exotic_streaming(*self.params, 20000, "lookback", seed=3)
+        vanilla = price_exotic_streaming(
+            *self.params, 20000, "barrier", barrier=1e9, seed=3
+        )
+        self.assertGreater(lookback["call_price"], vanilla["call_price"])
+        self.assertGreater(lookback["put_price"], vanilla["put_price"])
+
+    def test_memory_does_not_grow_with_steps(self):
+        chunks = [
+            price_exotic_streaming(
+                100, 100, 0.05, 0.2, 1, num_steps, 50000, memory_budget=2**20, seed=4
+            )["chunk_size"]
+            for num_steps in (10, 500)
+        ]
+        self.assertEqual(chunks[0], chunks[1])
+        self.assertLess(chunks[0], 50000)
+
+    def test_invalid_inputs(self):
+        with self.assertRaises(ValueError):
+            price_exotic_streaming(*self.params, 100, "digital")
+        with self.assertRaises(ValueError):
+            price_exotic_streaming(*self.params, 100, "barrier")
+        with self.assertRaises(ValueError):
+            price_exotic_streaming(
+                *self.params, 100, "barrier", barrier=120, barrier_type="sideways"
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
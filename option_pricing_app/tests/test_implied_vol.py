@@ -0,0 +1,84 @@
+import unittest
+import numpy as np
+from modules.calculations import black_scholes_price, call_price, put_price, vega
+from modules.implied_vol import IV_STATUS, implied_volatility
+
+
+class TestImpliedVol(unittest.TestCase):
+
+    def test_round_trip_chain(self):
+        rng = np.random.default_rng(0)
+        n = 20000
+        K = rng.uniform(60, 160, n)
+        T = rng.uniform(0.02, 3, n)
+        sigma = rng.uniform(0.05, 1.5, n)
+        is_call = rng.random(n) < 0.5
+        prices = black_scholes_price(100, K, T, 0.03, sigma, is_call)
+        result = implied_volatility(prices, 100, K, T, 0.03, is_call, block_size=4096)
+        converged = result["status"] == IV_STATUS.index("converged")
+        self.assertGreater(converged.mean(), 0.99)
+        np.testing.assert_allclose(
+            black_scholes_price(100, K, T, 0.03, result["sigma"], is_call)[converged],
+            prices[converged],
+            atol=1e-10,
+        )
+        # Volatility is only recoverable to 1e-6 where prices move with it
+        well_conditioned = converged & (vega(100, K, T, 0.03, sigma) > 1e-3)
+        np.testing.assert_allclose(
+            result["sigma"][well_conditioned], sigma[well_conditioned], atol=1e-6
+        )
+        self.assertLessEqual(result["iterations"].max(), 20)
+
+    def test_status_codes(self):
+        result = implied_volatility(
+            [
+                call_price(100, 100, 1, 0.05, 0.2),
+                put_price(100, 90, 0.5, 0.03, 0.3),
+                1.0,
+                150.0,
+                call_price(100, 100, 1, 0.05, 8.0),
+                np.nan,
+                5.0,
+            ],
+            100,
+            [100, 90, 50, 100, 100, 100, 100],
+            [1, 0.5, 1, 1, 1, 1, 0],
+            [0.05, 0.03, 0.05, 0.05, 0.05, 0.05, 0.05],
+            [True, False, True, True, True, True, True],
+        )
+        np.testing.assert_allclose(result["sigma"][:2], [0.2, 0.3])
+        self.assertEqual(
+            [IV_STATUS[code] for code in result["status"]],
+            [
+                "converged",
+                "converged",
+                "below_intrinsic",
+                "above_upper_bound",
+                "out_of_range",
+                "invalid_input",
+                "invalid_input",
+            ],
+        )
+        self.assertTrue(np.isnan(result["sigma"][2:]).all())
+
+    def test_deep_in_the_money_without_time_value(self):
+        # The out-of-the-money value is below the rounding of the quoted price
+        price = call_price(100, 51, 0.04, 0.03, 0.463)
+        result = implied_volatility([price, price + 0.5], 100, 51, 0.04, 0.03)
+        self.assertEqual(
+            [IV_STATUS[code] for code in result["status"]],
+            ["no_time_value", "converged"],
+        )
+        self.assertTrue(np.isnan(result["sigma"][0]))
+
+    def test_shape_is_preserved(self):
+        prices = call_price(
+            100, np.array([[90.0, 100.0], [110.0, 120.0]]), 1, 0.05, 0.25
+        )
+        result = implied_volatility(prices, 100, [[90, 100], [110, 120]], 1, 0.05)
+        self.assertEqual(result["sigma"].shape, (2, 2))
+        np.testing.assert_allclose(result["sigma"], 0.25)
+
+
+if __name__ == "__main__":
+    unittest.main()
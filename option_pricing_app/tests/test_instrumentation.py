@@ -0,0 +1,74 @@
+import time
+import unittest
+import numpy as np
+from flask import Flask
+from modules.instrumentation import (
+    RequestProfiler,
+    StageMetrics,
+    register_instrumentation,
+)
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def test_rolling_percentiles(self):
+        metrics = StageMetrics(window=10)
+        for seconds in range(20):
+            metrics.record("stage", float(seconds))
+        summary = metrics.summary()["stage"]
+        self.assertEqual(summary["count"], 20)
+        self.assertEqual(summary["p50"], 14.5)
+        self.assertEqual(summary["max"], 19.0)
+        self.assertNotIn("peak_memory_max", summary)
+
+    def test_nested_stages_and_memory_peaks(self):
+        metrics = StageMetrics(trace_memory=True)
+
+        @metrics.timed("inner")
+        def allocate():
+            return np.ones(10**6).sum()
+
+        with metrics.stage("outer"):
+            allocate()
+            time.sleep(0.01)
+        summary = metrics.summary()
+        self.assertGreaterEqual(summary["inner"]["peak_memory_max"], 8 * 10**6)
+        self.assertGreaterEqual(
+            summary["outer"]["peak_memory_max"], summary["inner"]["peak_memory_max"]
+        )
+        self.assertGreater(summary["outer"]["p50"], summary["inner"]["p50"])
+
+    def test_flask_routes(self):
+        server = Flask(__name__)
+
+        @server.route("/_dash-update-component", methods=["POST"])
+        def update():
+            return {"ok": sum(range(1000))}
+
+        metrics = StageMetrics()
+        profiler = register_instrumentation(
+            server, metrics, RequestProfiler(), ignore=("metrics-panel",)
+        )
+        client = server.test_client()
+        client.post("/_dash-update-component", json={"output": "graph.figure"})
+        client.post(
+            "/_dash-update-component", json={"output": "metrics-panel.children"}
+        )
+        self.assertEqual(
+            list(client.get("/metrics").get_json()), ["request:graph.figure"]
+        )
+
+        self.assertIn("No profile", client.get("/debug/profile").data.decode())
+        client.post("/debug/profile")
+        client.post("/_dash-update-component", json={"output": "graph.figure"})
+        self.assertIn("function calls", profiler.report)
+        self.assertEqual(
+            client.get(
+                "/metrics", environ_base={"REMOTE_ADDR": "10.0.0.2"}
+            ).status_code,
+            403,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import os
+import tempfile
+import threading
+import time
+import unittest
+from modules.jobs import JobManager
+
+
+def wait_for(manager, job_id, timeout=10):
+    deadline = time.time() + timeout
+    while manager.get(job_id)["status"] in ("queued", "running"):
+        if time.time() > deadline:
+            raise TimeoutError(job_id)
+        time.sleep(0.01)
+    return manager.get(job_id)
+
+
+class TestJobs(unittest.TestCase):
+
+    def setUp(self):
+        self.manager = JobManager(max_workers=1)
+
+    def tearDown(self):
+        self.manager.shutdown()
+
+    def test_job_reports_progress_and_result(self):
+        def job(progress, n):
+            for done in range(1, n + 1):
+                progress(done, n, {"price": done / n})
+            return {"total": n}
+
+        job_id = self.manager.submit("test", "key", job, 5)
+        state = wait_for(self.manager, job_id)
+        self.assertEqual(state["status"], "done")
+        self.assertEqual(state["result"], {"total": 5})
+        self.assertEqual((state["done"], state["total"]), (5, 5))
+        self.assertEqual(state["estimate"], {"price": 1.0})
+
+    def test_failed_job(self):
+        def job(progress):
+            raise ValueError("bad input")
+
+        state = wait_for(self.manager, self.manager.submit("test", "key", job))
+        self.assertEqual(state["status"], "failed")
+        self.assertIn("bad input", state["error"])
+
+    def test_cancel_running_and_queued_jobs(self):
+        started = threading.Event()
+        steps = []
+
+        def job(progress):
+            started.set()
+            for done in range(1000):
+                steps.append(done)
+                progress(done, 1000)
+                time.sleep(0.01)
+
+        running = self.manager.submit("test", "running", job)
+        queued = self.manager.submit("test", "queued", job)
+        # Same key as a job still active: no second job
+        self.assertEqual(self.manager.submit("test", "running", job), running)
+        started.wait(5)
+        self.manager.cancel(queued)
+        self.manager.cancel(running)
+        self.assertEqual(wait_for(self.manager, running)["status"], "cancelled")
+        self.assertEqual(wait_for(self.manager, queued)["status"], "cancelled")
+        self.assertLess(len(steps), 1000)
+
+    def test_cancellation_through_shared_job_table(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "jobs.sqlite")
+            manager = JobManager(path)
+            other = JobManager(path)
+            started = threading.Event()
+
+            def job(progress):
+                started.set()
+                while True:
+                    progress(0, 1)
+                    time.sleep(0.01)
+
+            job_id = manager.submit("test", "key", job)
+            started.wait(5)
+            other.cancel(job_id)
+            self.assertEqual(wait_for(other, job_id)["status"], "cancelled")
+            manager.shutdown()
+            other.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+from modules.calculations import greeks
+from modules.exotics import geometric_asian_price, price_exotic_streaming
+from modules.mc_greeks import GREEK_NAMES, MonteCarloGreeks
+from modules.pricing import price_from_terminal, simulate_terminal_prices
+
+
+class TestMonteCarloGreeks(unittest.TestCase):
+
+    def assertWithinStdErrors(self, result, name, expected, tolerance=4):
+        self.assertLess(
+            abs(result[name] - expected),
+            tolerance * result[f"{name}_std_error"] + 1e-12,
+            name,
+        )
+
+    def test_european_greeks_match_closed_form(self):
+        simulation = simulate_terminal_prices(
+            100, 0.05, 0.2, 1, 1, 200000, seed=1, antithetic=True
+        )
+        result = price_from_terminal(
+            simulation,
+            100,
+            100,
+            0.05,
+            0.2,
+            1,
+            greeks=MonteCarloGreeks(100, 100, 0.05, 0.2, 1),
+        )
+        exact = greeks(100, 100, 1, 0.05, 0.2)
+        for option_type in ("call", "put"):
+            for greek in GREEK_NAMES:
+                name = f"{option_type}_{greek}"
+                with self.subTest(name=name):
+                    self.assertWithinStdErrors(
+                        result, name, exact.get(name, exact.get(greek))
+                    )
+
+    def test_geometric_asian_greeks_match_finite_differences(self):
+        def price(S0=100, T=1, r=0.05, sigma=0.2):
+            return geometric_asian_price(S0, 100, T, r, sigma, 12)
+
+        h = 1e-4
+        expected = {
+            "delta": (price(S0=100 + h) - price(S0=100 - h)) / (2 * h),
+            "gamma": (price(S0=100.01) - 2 * price() + price(S0=99.99)) / 1e-4,
+            "vega": (price(sigma=0.2 + h) - price(sigma=0.2 - h)) / (2 * h) / 100,
+            "rho": (price(r=0.05 + h) - price(r=0.05 - h)) / (2 * h) / 100,
+            "theta": -(price(T=1 + h) - price(T=1 - h)) / (2 * h) / 365,
+        }
+        result = price_exotic_streaming(
+            100,
+            100,
+            0.05,
+            0.2,
+            1,
+            12,
+            100000,
+            "asian_geometric",
+            seed=2,
+            greeks=MonteCarloGreeks(100, 100, 0.05, 0.2, 1, "asian_geometric"),
+        )
+        for greek, value in expected.items():
+            with self.subTest(greek=greek):
+                self.assertWithinStdErrors(result, f"call_{greek}", value)
+
+    def test_barrier_likelihood_ratio_greeks(self):
+        # A barrier that is never reached leaves the vanilla option
+        result = price_exotic_streaming(
+            100,
+            100,
+            0.05,
+            0.2,
+            1,
+            4,
+            100000,
+            "barrier",
+            barrier=1e9,
+            seed=3,
+            greeks=MonteCarloGreeks(100, 100, 0.05, 0.2, 1, "barrier", barrier=1e9),
+        )
+        exact = greeks(100, 100, 1, 0.05, 0.2)
+        for greek in GREEK_NAMES:
+            with self.subTest(greek=greek):
+                self.assertWithinStdErrors(
+                    result,
+                    f"call_{greek}",
+                    exact.get(f"call_{greek}", exact.get(greek)),
+                )
+
+    def test_lookback_delta_is_price_over_spot(self):
+        # Lookback payoffs are homogeneous of degree one in the spot
+        result = price_exotic_streaming(
+            100,
+            100,
+            0.05,
+            0.2,
+            1,
+            12,
+            20000,
+            "lookback",
+            seed=4,
+            greeks=MonteCarloGreeks(100, 100, 0.05, 0.2, 1, "lookback"),
+        )
+        self.assertAlmostEqual(result["call_delta"], result["call_price"] / 100)
+        self.assertAlmostEqual(result["put_delta"], result["put_price"] / 100)
+        self.assertGreater(result["call_vega"], 0)
+
+    def test_invalid_payoff(self):
+        with self.assertRaises(ValueError):
+            MonteCarloGreeks(100, 100, 0.05, 0.2, 1, "digital")
+
+
+if __name__ == "__main__":
+    unittest.main()
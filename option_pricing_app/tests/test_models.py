@@ -0,0 +1,143 @@
+import tempfile
+import unittest
+import numpy as np
+from scipy.stats import poisson
+from modules.calculations import call_price
+from modules.models import HestonModel, MertonModel, describe_model, get_model
+from modules.parallel import parallel_generate_scenarios
+from modules.pricing import (
+    price_european_streaming,
+    price_from_terminal,
+    simulate_terminal_prices,
+)
+from modules.simulations import generate_scenarios
+from modules.storage import PathStore
+
+
+class TestModels(unittest.TestCase):
+
+    def assertPriceNear(self, result, option_type, expected, tolerance=4):
+        self.assertLess(
+            abs(result[f"{option_type}_price"] - expected),
+            tolerance * result[f"{option_type}_std_error"],
+        )
+
+    def test_gbm_is_the_default(self):
+        expected = generate_scenarios(100, 0.05, 0.2, 1, 12, 200, seed=1)
+        for model in ("gbm", {"name": "gbm"}, get_model()):
+            np.testing.assert_array_equal(
+                generate_scenarios(100, 0.05, 0.2, 1, 12, 200, seed=1, model=model),
+                expected,
+            )
+
+    def test_models_are_martingales(self):
+        for model in ("heston", "merton"):
+            with self.subTest(model=model):
+                paths = generate_scenarios(
+                    100, 0.05, 0.2, 1, 50, 100000, seed=2, model=model
+                )
+                discounted = np.exp(-0.05) * paths[-1]
+                self.assertLess(
+                    abs(discounted.mean() - 100),
+                    4 * discounted.std() / np.sqrt(discounted.size),
+                )
+
+    def test_heston_without_vol_of_vol_is_black_scholes(self):
+        model = HestonModel(kappa=1.0, theta=0.04, xi=0.0)
+        result = price_european_streaming(
+            100, 100, 0.05, 0.2, 1, 20, 100000, seed=3, model=model
+        )
+        self.assertPriceNear(result, "call", call_price(100, 100, 1, 0.05, 0.2))
+
+    def test_merton_matches_series_price(self):
+        model = MertonModel(intensity=0.5, jump_mean=-0.1, jump_std=0.15)
+        k = np.exp(model.jump_mean + 0.5 * model.jump_std**2) - 1
+        intensity = model.intensity * (1 + k)
+        expected = sum(
+            poisson.pmf(n, intensity)
+            * call_price(
+                100,
+                100,
+                1,
+                0.05 - model.intensity * k + n * np.log(1 + k),
+                np.sqrt(0.2**2 + n * model.jump_std**2),
+            )
+            for n in range(40)
+        )
+        simulation = simulate_terminal_prices(
+            100, 0.05, 0.2, 1, 1, 200000, seed=4, model=model
+        )
+        result = price_from_terminal(simulation, 100, 100, 0.05, 0.2, 1)
+        self.assertPriceNear(result, "call", expected)
+
+    def test_chunked_terminal_prices_are_reproducible(self):
+        for model in ("heston", "merton"):
+            with self.subTest(model=model):
+                runs = [
+                    price_european_streaming(
+                        100,
+                        100,
+                        0.05,
+                        0.2,
+                        1,
+                        10,
+                        20000,
+                        memory_budget=2**18,
+                        dtype=dtype,
+                        seed=5,
+                        model=model,
+                    )
+                    for dtype in (np.float64, np.float64, np.float32)
+                ]
+                self.assertEqual(runs[0]["call_price"], runs[1]["call_price"])
+                self.assertLess(runs[0]["chunk_size"], 20000)
+                self.assertAlmostEqual(
+                    runs[0]["call_price"], runs[2]["call_price"], delta=0.5
+                )
+                paths = generate_scenarios(
+                    100, 0.05, 0.2, 1, 10, 100, seed=5, dtype=np.float32, model=model
+                )
+                self.assertEqual(paths.dtype, np.float32)
+
+    def test_spot_control_variate(self):
+        # Discounted spot prices are martingales under every model
+        for model in ("heston", "merton"):
+            with self.subTest(model=model):
+                result = price_european_streaming(
+                    100,
+                    100,
+                    0.05,
+                    0.2,
+                    1,
+                    10,
+                    20000,
+                    seed=6,
+                    control_variate="spot",
+                    model=model,
+                )
+                self.assertGreater(result["call_variance_reduction_factor"], 1.5)
+                self.assertGreater(result["call_std_error"], 0)
+
+    def test_model_descriptions(self):
+        self.assertEqual(describe_model(), {"name": "gbm"})
+        description = describe_model(MertonModel(intensity=0.3))
+        self.assertEqual(get_model(description).intensity, 0.3)
+        with self.assertRaises(ValueError):
+            get_model("sabr")
+        with tempfile.TemporaryDirectory() as directory:
+            store = PathStore(directory)
+            gbm = store.describe(100, 0.05, 0.2, 1, 12, 100, seed=1)
+            heston = store.describe(100, 0.05, 0.2, 1, 12, 100, seed=1, model="heston")
+            self.assertNotIn("model_params", gbm)
+            self.assertEqual(heston["model_params"]["kappa"], 2.0)
+            self.assertNotEqual(gbm["key"], heston["key"])
+            key = store.write(100, 0.05, 0.2, 1, 12, 100, seed=1, model="heston")
+            # Same block streams as the shared-memory generator
+            with parallel_generate_scenarios(
+                100, 0.05, 0.2, 1, 12, 100, seed=1, num_workers=1, model="heston"
+            ) as shared:
+                np.testing.assert_array_equal(store.open_paths(key), shared.array)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import numpy as np
+from modules.calculations import call_price
+from modules.parallel import (
+    SharedArray,
+    parallel_generate_scenarios,
+    parallel_price_european,
+    parallel_simulate_terminal_prices,
+    split_blocks,
+)
+
+
+class TestParallel(unittest.TestCase):
+
+    def test_split_blocks(self):
+        self.assertEqual(split_blocks(10, 4), [(0, 4), (4, 4), (8, 2)])
+        self.assertEqual(split_blocks(8, 4), [(0, 4), (4, 4)])
+
+    def test_shared_array(self):
+        with SharedArray((3, 4)) as shared:
+            attached = SharedArray((3, 4), name=shared.name)
+            attached.array[1, 2] = 5.0
+            attached.close()
+            self.assertEqual(shared.array[1, 2], 5.0)
+
+    def test_price_is_identical_for_any_worker_count(self):
+        results = [
+            parallel_price_european(
+                100,
+                100,
+                0.05,
+                0.2,
+                1,
+                12,
+                50000,
+                seed=11,
+                num_workers=num_workers,
+                block_size=8192,
+                antithetic=True,
+                control_variate="spot",
+            )
+            for num_workers in (1, 3)
+        ]
+        self.assertEqual(results[0]["call_price"], results[1]["call_price"])
+        self.assertEqual(results[0]["put_std_error"], results[1]["put_std_error"])
+        np.testing.assert_array_equal(
+            results[0]["call_histogram"][0], results[1]["call_histogram"][0]
+        )
+        np.testing.assert_array_equal(
+            results[0]["price_paths"], results[1]["price_paths"]
+        )
+        self.assertEqual(results[0]["num_blocks"], 7)
+        self.assertAlmostEqual(
+            results[0]["call_price"],
+            call_price(100, 100, 1, 0.05, 0.2),
+            delta=5 * results[0]["call_std_error"],
+        )
+
+    def test_paths_are_identical_for_any_worker_count(self):
+        with parallel_generate_scenarios(
+            100, 0.05, 0.2, 1, 20, 10000, seed=5, num_workers=1, block_size=3000
+        ) as serial, parallel_generate_scenarios(
+            100, 0.05, 0.2, 1, 20, 10000, seed=5, num_workers=2, block_size=3000
+        ) as pooled:
+            self.assertEqual(serial.array.shape, (21, 10000))
+            self.assertTrue(np.all(serial.array[0] == 100))
+            np.testing.assert_array_equal(serial.array, pooled.array)
+
+    def test_terminal_prices_are_identical_for_any_worker_count(self):
+        simulations = [
+            parallel_simulate_terminal_prices(
+                100,
+                0.05,
+                0.2,
+                1,
+                12,
+                9001,
+                seed=4,
+                num_workers=num_workers,
+                block_size=3000,
+                antithetic=True,
+            )
+            for num_workers in (1, 2)
+        ]
+        np.testing.assert_array_equal(
+            simulations[0]["terminal"], simulations[1]["terminal"]
+        )
+        self.assertEqual(simulations[0]["terminal"].size, 9002)
+        self.assertEqual(sum(simulations[0]["batch_sizes"]), 9002)
+        self.assertEqual(simulations[0]["price_paths"].shape, (13, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
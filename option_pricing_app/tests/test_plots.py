@@ -5,6 +5,7 @@ from modules.plots import (
     plot_volatility_skew,
     plot_price_paths,
     plot_payoff_distribution,
+    path_bundle,
 )
 
 
@@ -30,6 +31,23 @@ class TestPlots(unittest.TestCase):
         plot_payoff_distribution(self.put_payoffs, "put")
         plt.close(fig)  # Close the plot to avoid displaying it during tests
 
+    def test_price_paths_single_trace(self):
+        x, y = path_bundle(self.price_paths[:, :3])
+        self.assertEqual(len(x), 3 * 253)
+        self.assertTrue(np.isnan(y[252]))
+        np.testing.assert_array_equal(y[253:505], self.price_paths[:, 1])
+        fig = plot_price_paths(self.price_paths)
+        self.assertEqual([trace.type for trace in fig.data], ["scattergl"])
+        bands = np.percentile(self.price_paths, (5, 25, 50, 75, 95), axis=1)
+        fig = plot_price_paths(self.price_paths, bands=bands)
+        self.assertEqual(len(fig.data), 6)
+
+    def test_payoff_distribution_is_binned(self):
+        payoffs = np.maximum(np.random.normal(100, 20, 10**5) - 100, 0)
+        fig = plot_payoff_distribution(payoffs, "call")
+        self.assertEqual(len(fig.data[0].y), 50)
+        self.assertEqual(fig.data[0].y.sum(), 10**5)
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import tracemalloc
+import unittest
+import numpy as np
+from modules.calculations import call_price, put_price
+from modules.portfolio import (
+    REVALUATION_BYTES,
+    Portfolio,
+    iter_revaluation,
+    load_portfolio,
+    portfolio_from_records,
+    revalue_portfolio,
+)
+from modules.simulations import simulate_option_value, simulate_scenario
+
+
+class TestPortfolio(unittest.TestCase):
+
+    def setUp(self):
+        self.option_portfolio = [
+            {"type": "call", "S": 100, "K": 100, "T": 1, "r": 0.05, "sigma": 0.2},
+            {"type": "put", "S": 100, "K": 90, "T": 0.5, "r": 0.03, "sigma": 0.25},
+            {
+                "type": "Call",
+                "S": 50,
+                "K": 55,
+                "T": 2,
+                "r": 0.05,
+                "sigma": 0.3,
+                "quantity": -3,
+            },
+        ]
+        self.market_conditions = [
+            {"price_change": 0.1, "volatility_change": 0.05},
+            {"price_change": -0.1, "volatility_change": -0.05},
+            {"price_change": 0.0, "volatility_change": 0.0},
+        ]
+
+    def test_portfolio_values(self):
+        portfolio = portfolio_from_records(self.option_portfolio)
+        self.assertEqual(len(portfolio), 3)
+        np.testing.assert_allclose(
+            portfolio.values(),
+            [
+                call_price(100, 100, 1, 0.05, 0.2),
+                put_price(100, 90, 0.5, 0.03, 0.25),
+                -3 * call_price(50, 55, 2, 0.05, 0.3),
+            ],
+        )
+
+    def test_unknown_type(self):
+        with self.assertRaises(ValueError):
+            portfolio_from_records([dict(self.option_portfolio[0], type="swap")])
+
+    def test_simulate_scenario_matches_scalar_pricing(self):
+        unit_portfolio = [
+            dict(self.option_portfolio[0]),
+            dict(self.option_portfolio[1]),
+            {"type": "call", "S": 50, "K": 55, "T": 2, "r": 0.05, "sigma": 0.3},
+        ]
+        expected = [
+            sum(simulate_option_value(option, condition) for option in unit_portfolio)
+            for condition in self.market_conditions
+        ]
+        np.testing.assert_allclose(
+            simulate_scenario(unit_portfolio, self.market_conditions), expected
+        )
+
+    def test_revalue_portfolio_chunks(self):
+        rng = np.random.default_rng(0)
+        portfolio = Portfolio(
+            rng.random(500) < 0.5,
+            100,
+            rng.uniform(80, 120, 500),
+            rng.uniform(0.1, 2, 500),
+            0.03,
+            rng.uniform(0.1, 0.4, 500),
+            rng.integers(-5, 5, 500),
+        )
+        price_changes = rng.normal(0, 0.05, 300)
+        volatility_changes = rng.normal(0, 0.02, 300)
+        full = revalue_portfolio(
+            portfolio, price_changes, volatility_changes, per_position=True
+        )
+        # Seven scenarios per chunk
+        memory_budget = REVALUATION_BYTES * 500 * 7
+        chunked = revalue_portfolio(
+            portfolio,
+            price_changes,
+            volatility_changes,
+            memory_budget=memory_budget,
+            per_position=True,
+        )
+        np.testing.assert_allclose(chunked["values"], full["values"])
+        np.testing.assert_allclose(chunked["position_pnl"], full["position_pnl"])
+        np.testing.assert_allclose(full["position_pnl"].sum(axis=1), full["pnl"])
+        self.assertEqual(
+            len(list(iter_revaluation(portfolio, price_changes, 0, memory_budget))),
+            43,
+        )
+
+    def test_revaluation_stays_within_memory_budget(self):
+        rng = np.random.default_rng(1)
+        portfolio = Portfolio(
+            rng.random(200) < 0.5,
+            100,
+            rng.uniform(80, 120, 200),
+            rng.uniform(0.1, 2, 200),
+            0.03,
+            rng.uniform(0.1, 0.4, 200),
+        )
+        price_changes = rng.normal(0, 0.05, 20000)
+        memory_budget = 2**22
+        # Other tests may have left tracing on (see instrumentation.StageMetrics)
+        tracing = tracemalloc.is_tracing()
+        if not tracing:
+            tracemalloc.start()
+        try:
+            tracemalloc.reset_peak()
+            start = tracemalloc.get_traced_memory()[0]
+            for _ in iter_revaluation(portfolio, price_changes, 0, memory_budget):
+                pass
+            peak = tracemalloc.get_traced_memory()[1] - start
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+        self.assertLessEqual(peak, 1.1 * memory_budget)
+        self.assertGreater(peak, 0.5 * memory_budget)
+
+    def test_load_portfolio_csv(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "book.csv")
+            with open(path, "w") as file:
+                file.write("type,quantity,S,K,T,r,sigma\n")
+                file.write("call,2,100,100,1,0.05,0.2\n")
+                file.write("put,1,100,100,1,0.05,0.2\n")
+            portfolio = load_portfolio(path)
+        self.assertEqual(portfolio.is_call.tolist(), [True, False])
+        np.testing.assert_allclose(
+            portfolio.values(),
+            [2 * call_price(100, 100, 1, 0.05, 0.2), put_price(100, 100, 1, 0.05, 0.2)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
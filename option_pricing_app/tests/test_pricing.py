@@ -0,0 +1,326 @@
+import unittest
+import numpy as np
+from modules.calculations import call_price, put_price
+from modules.simulations import generate_scenarios
+from modules.pricing import (
+    FAN_PERCENTILES,
+    MonteCarloAccumulator,
+    PathFan,
+    chunk_size_for_budget,
+    confidence_interval,
+    price_european_adaptive,
+    price_european_streaming,
+    price_from_terminal,
+    simulate_terminal_prices,
+)
+
+
+class TestPricing(unittest.TestCase):
+
+    def setUp(self):
+        self.S0 = 100
+        self.K = 100
+        self.r = 0.05
+        self.sigma = 0.2
+        self.T = 1
+        self.num_steps = 252
+
+    def test_accumulator_matches_numpy(self):
+        values = np.random.default_rng(0).exponential(size=1001)
+        stats = MonteCarloAccumulator()
+        stats.update(values[:400])
+        other = MonteCarloAccumulator()
+        other.update(values[400:])
+        stats.merge(other)
+
+        self.assertEqual(stats.count, values.size)
+        self.assertAlmostEqual(stats.mean(), np.mean(values))
+        self.assertAlmostEqual(stats.variance(), np.var(values, ddof=1))
+        self.assertAlmostEqual(
+            stats.std_error(), np.std(values, ddof=1) / np.sqrt(values.size)
+        )
+
+    def test_chunk_size_for_budget(self):
+        self.assertEqual(
+            chunk_size_for_budget(2**20, 252, 10**6, np.float64, False), 2**20 // 2048
+        )
+        self.assertEqual(
+            chunk_size_for_budget(2**30, 252, 1000, np.float64, True), 1000
+        )
+        self.assertEqual(chunk_size_for_budget(1, 252, 1000, np.float64, False), 1)
+
+    def test_streaming_terminal_only(self):
+        result = price_european_streaming(
+            self.S0,
+            self.K,
+            self.r,
+            self.sigma,
+            self.T,
+            self.num_steps,
+            200000,
+            memory_budget=2**20,
+            seed=1,
+        )
+        expected_call = call_price(self.S0, self.K, self.T, self.r, self.sigma)
+        expected_put = put_price(self.S0, self.K, self.T, self.r, self.sigma)
+        self.assertLess(result["chunk_size"], 200000)
+        self.assertAlmostEqual(
+            result["call_price"], expected_call, delta=4 * result["call_std_error"]
+        )
+        self.assertAlmostEqual(
+            result["put_price"], expected_put, delta=4 * result["put_std_error"]
+        )
+        self.assertEqual(result["call_histogram"][0].sum(), 200000)
+        self.assertEqual(result["put_histogram"][0].sum(), 200000)
+        self.assertEqual(result["price_paths"].shape, (self.num_steps + 1, 10))
+
+    def test_streaming_full_paths(self):
+        result = price_european_streaming(
+            self.S0,
+            self.K,
+            self.r,
+            self.sigma,
+            self.T,
+            self.num_steps,
+            20000,
+            memory_budget=2**20,
+            terminal_only=False,
+            dtype=np.float32,
+            seed=2,
+        )
+        expected_call = call_price(self.S0, self.K, self.T, self.r, self.sigma)
+        self.assertAlmostEqual(
+            result["call_price"], expected_call, delta=4 * result["call_std_error"]
+        )
+        self.assertEqual(result["price_paths"].shape, (self.num_steps + 1, 10))
+        self.assertEqual(result["price_paths"].dtype, np.float32)
+
+    def test_streaming_is_reproducible(self):
+        first = price_european_streaming(
+            self.S0, self.K, self.r, self.sigma, self.T, 12, 5000, seed=3
+        )
+        second = price_european_streaming(
+            self.S0, self.K, self.r, self.sigma, self.T, 12, 5000, seed=3
+        )
+        self.assertEqual(first["call_price"], second["call_price"])
+        np.testing.assert_array_equal(first["price_paths"], second["price_paths"])
+
+    def test_variance_reduction_modes(self):
+        expected_call = call_price(self.S0, self.K, self.T, self.r, self.sigma)
+        expected_put = put_price(self.S0, self.K, self.T, self.r, self.sigma)
+        for options in (
+            {"antithetic": True},
+            {"moment_matching": True},
+            {"control_variate": "spot"},
+            {"antithetic": True, "control_variate": "spot"},
+        ):
+            with self.subTest(options=options):
+                result = price_european_streaming(
+                    self.S0,
+                    self.K,
+                    self.r,
+                    self.sigma,
+                    self.T,
+                    12,
+                    100001,
+                    seed=4,
+                    **options,
+                )
+                self.assertAlmostEqual(
+                    result["call_price"],
+                    expected_call,
+                    delta=5 * result["call_std_error"],
+                )
+                self.assertAlmostEqual(
+                    result["put_price"], expected_put, delta=5 * result["put_std_error"]
+                )
+                self.assertGreater(result["call_variance_reduction_factor"], 1.5)
+
+        antithetic = price_european_streaming(
+            self.S0, self.K, self.r, self.sigma, self.T, 12, 1001, antithetic=True
+        )
+        self.assertEqual(antithetic["num_simulations"], 1002)
+
+    def test_invalid_control_variate(self):
+        # The closed-form price of the payoff itself is no control: it would return
+        # the closed form with a zero standard error
+        for control_variate in ("black_scholes", "x"):
+            with self.assertRaises(ValueError):
+                price_european_streaming(
+                    self.S0,
+                    self.K,
+                    self.r,
+                    self.sigma,
+                    self.T,
+                    12,
+                    1000,
+                    control_variate=control_variate,
+                )
+
+    def test_plain_variance_reduction_factor_is_one(self):
+        result = price_european_streaming(
+            self.S0, self.K, self.r, self.sigma, self.T, 12, 1000, seed=6
+        )
+        self.assertAlmostEqual(result["call_variance_reduction_factor"], 1.0)
+
+    def test_two_stage_pricing_matches_streaming(self):
+        for options in (
+            {},
+            {"antithetic": True, "control_variate": "spot"},
+            {"moment_matching": True, "control_variate": "spot"},
+        ):
+            with self.subTest(**options):
+                control_variate = options.pop("control_variate", None)
+                streamed = price_european_streaming(
+                    self.S0,
+                    self.K,
+                    self.r,
+                    self.sigma,
+                    self.T,
+                    12,
+                    5000,
+                    memory_budget=2**16,
+                    seed=8,
+                    control_variate=control_variate,
+                    **options,
+                )
+                simulation = simulate_terminal_prices(
+                    self.S0,
+                    self.r,
+                    self.sigma,
+                    self.T,
+                    12,
+                    5000,
+                    memory_budget=2**16,
+                    seed=8,
+                    **options,
+                )
+                priced = price_from_terminal(
+                    simulation,
+                    self.S0,
+                    self.K,
+                    self.r,
+                    self.sigma,
+                    self.T,
+                    control_variate,
+                )
+                for key in ("call_price", "put_price", "call_std_error"):
+                    self.assertAlmostEqual(priced[key], streamed[key], places=10)
+                np.testing.assert_array_equal(
+                    priced["call_histogram"][0], streamed["call_histogram"][0]
+                )
+
+    def test_path_fan_matches_percentiles(self):
+        paths = generate_scenarios(
+            self.S0, self.r, self.sigma, self.T, 20, 20000, seed=9
+        )
+        fan = PathFan(self.S0, self.r, self.sigma, self.T, 20)
+        halves = PathFan(self.S0, self.r, self.sigma, self.T, 20)
+        fan.update(paths)
+        halves.update(paths[:, :7000])
+        other = PathFan(self.S0, self.r, self.sigma, self.T, 20)
+        other.update(paths[:, 7000:])
+        halves.merge(other)
+        np.testing.assert_array_equal(halves.counts, fan.counts)
+        bands = fan.percentiles()
+        self.assertEqual(bands.shape, (len(FAN_PERCENTILES), 21))
+        np.testing.assert_allclose(bands[:, 0], self.S0)
+        np.testing.assert_allclose(
+            bands, np.percentile(paths, FAN_PERCENTILES, axis=1), rtol=5e-3
+        )
+
+    def test_simulation_fan_needs_full_paths(self):
+        with self.assertRaises(ValueError):
+            simulate_terminal_prices(
+                self.S0, self.r, self.sigma, self.T, 12, 100, fan_bins=100
+            )
+        simulation = simulate_terminal_prices(
+            self.S0,
+            self.r,
+            self.sigma,
+            self.T,
+            12,
+            1000,
+            memory_budget=2**14,
+            terminal_only=False,
+            fan_bins=100,
+        )
+        self.assertEqual(simulation["path_fan"].counts.sum(), 13 * 1000)
+
+    def test_simulation_reports_progress(self):
+        reports = []
+        simulation = simulate_terminal_prices(
+            100,
+            0.05,
+            0.2,
+            1,
+            12,
+            10000,
+            memory_budget=2**16,
+            seed=1,
+            progress=lambda done, total, chunk: reports.append(
+                (done, total, chunk.copy())
+            ),
+        )
+        self.assertEqual([total for _, total, _ in reports], [10000] * len(reports))
+        self.assertEqual(reports[-1][0], 10000)
+        np.testing.assert_array_equal(
+            np.concatenate([chunk for _, _, chunk in reports]), simulation["terminal"]
+        )
+
+    def test_adaptive_stops_at_target_std_error(self):
+        result = price_european_adaptive(
+            self.S0,
+            self.K,
+            self.r,
+            self.sigma,
+            self.T,
+            12,
+            target_std_error=0.1,
+            max_simulations=10**6,
+            batch_size=2000,
+            seed=3,
+        )
+        self.assertTrue(result["converged"])
+        self.assertLess(result["num_simulations"], 10**6)
+        self.assertEqual(result["num_simulations"] % 2000, 0)
+        self.assertLessEqual(result["call_std_error"], 0.1)
+        self.assertLessEqual(result["put_std_error"], 0.1)
+        low, high = result["call_ci"]
+        self.assertLess(low, result["call_price"])
+        self.assertGreater(high, result["call_price"])
+        self.assertLess(
+            abs(result["call_price"] - call_price(100, 100, 1, 0.05, 0.2)),
+            5 * result["call_std_error"],
+        )
+
+    def test_adaptive_respects_max_simulations(self):
+        result = price_european_adaptive(
+            self.S0,
+            self.K,
+            self.r,
+            self.sigma,
+            self.T,
+            12,
+            relative_tolerance=1e-4,
+            max_simulations=5000,
+            batch_size=2000,
+            seed=3,
+        )
+        self.assertFalse(result["converged"])
+        self.assertEqual(result["num_simulations"], 5000)
+
+    def test_adaptive_requires_a_target(self):
+        with self.assertRaises(ValueError):
+            price_european_adaptive(
+                self.S0, self.K, self.r, self.sigma, self.T, 12, seed=3
+            )
+
+    def test_confidence_interval(self):
+        low, high = confidence_interval(10.0, 0.5)
+        self.assertAlmostEqual(high - 10.0, 1.959964 * 0.5, places=5)
+        self.assertAlmostEqual(10.0 - low, high - 10.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import numpy as np
+from modules.calculations import call_price, put_price
+from modules.simulations import calculate_call_payoffs
+from modules.qmc import (
+    brownian_bridge_plan,
+    fill_qmc_paths,
+    generate_qmc_scenarios,
+    price_european_qmc,
+)
+
+
+class TestQMC(unittest.TestCase):
+
+    def test_brownian_bridge_plan(self):
+        for num_steps in (1, 7, 8, 252):
+            with self.subTest(num_steps=num_steps):
+                plan = brownian_bridge_plan(num_steps)
+                self.assertEqual(plan["bridge_index"][0], num_steps - 1)
+                self.assertEqual(
+                    sorted(plan["bridge_index"].tolist()), list(range(num_steps))
+                )
+
+    def test_bridge_covariance(self):
+        normals = np.random.default_rng(0).standard_normal((100000, 8))
+        paths = np.empty((9, 100000))
+        fill_qmc_paths(paths, normals, 1.0, 0.0, 1.0, 8.0, brownian_bridge_plan(8))
+        brownian = np.log(paths[1:]) + 0.5 * np.arange(1, 9)[:, None]
+        times = np.arange(1, 9)
+        np.testing.assert_allclose(
+            np.cov(brownian), np.minimum.outer(times, times), atol=0.15
+        )
+
+    def test_generate_qmc_scenarios(self):
+        price_paths = generate_qmc_scenarios(100, 0.05, 0.2, 1, 252, 4096, seed=1)
+        self.assertEqual(price_paths.shape, (253, 4096))
+        self.assertTrue(np.all(price_paths[0] == 100))
+        call_payoffs = calculate_call_payoffs(price_paths, 100)
+        self.assertAlmostEqual(
+            np.exp(-0.05) * np.mean(call_payoffs),
+            call_price(100, 100, 1, 0.05, 0.2),
+            delta=0.05,
+        )
+
+    def test_price_european_qmc(self):
+        for bridge in (True, False):
+            with self.subTest(bridge=bridge):
+                result = price_european_qmc(
+                    100,
+                    100,
+                    0.05,
+                    0.2,
+                    1,
+                    64,
+                    2**14,
+                    memory_budget=2**20,
+                    seed=2,
+                    bridge=bridge,
+                )
+                self.assertAlmostEqual(
+                    result["call_price"],
+                    call_price(100, 100, 1, 0.05, 0.2),
+                    delta=5 * result["call_std_error"],
+                )
+                self.assertAlmostEqual(
+                    result["put_price"],
+                    put_price(100, 100, 1, 0.05, 0.2),
+                    delta=5 * result["put_std_error"],
+                )
+                self.assertGreater(result["call_variance_reduction_factor"], 1)
+                self.assertEqual(result["call_histogram"][0].sum(), 2**14)
+                self.assertEqual(result["price_paths"].shape, (65, 10))
+
+
+if __name__ == "__main__":
+    unittest.main()
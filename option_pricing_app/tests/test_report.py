@@ -0,0 +1,28 @@
+import io
+import unittest
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from modules.report import generate_pdf_report
+
+
+class TestReport(unittest.TestCase):
+
+    def test_report_is_built_in_memory(self):
+        buffer = io.BytesIO()
+        fig, ax = plt.subplots()
+        ax.plot([100, 101, 99, 102])
+        fig.savefig(buffer, format="png")
+        plt.close(fig)
+        pdf = generate_pdf_report(
+            {"Prix Initial": 100, "Volatilité": 0.2},
+            {"Trajectoires de Prix": buffer.getvalue()},
+        )
+        self.assertIsInstance(pdf, bytes)
+        self.assertTrue(pdf.startswith(b"%PDF"))
+        self.assertIn(b"/Image", pdf)
+
+
+if __name__ == "__main__":
+    unittest.main()
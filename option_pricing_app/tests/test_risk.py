@@ -0,0 +1,121 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from modules.portfolio import Portfolio, iter_revaluation, revalue_portfolio
+from modules.risk import (
+    historical_shocks,
+    load_historical_shocks,
+    portfolio_risk,
+    simulate_shocks,
+)
+
+
+class TestRisk(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        size = 20
+        self.portfolio = Portfolio(
+            rng.random(size) < 0.5,
+            100,
+            rng.uniform(80, 120, size),
+            rng.uniform(0.1, 2, size),
+            0.03,
+            rng.uniform(0.15, 0.4, size),
+            rng.normal(0, 10, size),
+        )
+
+    def test_simulated_shocks(self):
+        price_changes, volatility_changes = simulate_shocks(
+            200000, horizon_days=10, spot_volatility=0.3, correlation=-0.6, seed=1
+        )
+        log_returns = np.log1p(price_changes)
+        scale = np.sqrt(10 / 252)
+        self.assertAlmostEqual(log_returns.std(), 0.3 * scale, delta=0.002)
+        self.assertAlmostEqual(volatility_changes.std(), 0.1 * scale, delta=0.001)
+        self.assertAlmostEqual(
+            np.corrcoef(log_returns, volatility_changes)[0, 1], -0.6, delta=0.01
+        )
+        # Spot shocks are martingale moves
+        self.assertAlmostEqual(price_changes.mean(), 0, delta=0.001)
+        np.testing.assert_array_equal(
+            simulate_shocks(100, seed=2)[0], simulate_shocks(100, seed=2)[0]
+        )
+        with self.assertRaises(ValueError):
+            simulate_shocks(100, correlation=1.5)
+
+    def test_historical_shocks(self):
+        daily = np.array([0.01, -0.02, 0.03, 0.005])
+        volatility = np.array([0.001, 0.002, -0.004, 0.0])
+        price_changes, volatility_changes = historical_shocks(daily, volatility, 2)
+        np.testing.assert_allclose(
+            price_changes, (1 + daily[1:]) * (1 + daily[:-1]) - 1
+        )
+        np.testing.assert_allclose(volatility_changes, volatility[1:] + volatility[:-1])
+        with self.assertRaises(ValueError):
+            historical_shocks(daily, horizon_days=5)
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "returns.csv")
+            with open(path, "w") as file:
+                file.write("date,price_change\n")
+                file.writelines(f"{day},{value}\n" for day, value in enumerate(daily))
+            loaded = load_historical_shocks(path, 2)
+            np.testing.assert_allclose(loaded[0], price_changes)
+            np.testing.assert_array_equal(loaded[1], 0)
+
+    def test_streaming_risk_matches_full_revaluation(self):
+        price_changes, volatility_changes = simulate_shocks(5000, seed=3)
+        full = revalue_portfolio(
+            self.portfolio, price_changes, volatility_changes, per_position=True
+        )
+        losses = -full["pnl"]
+        tail = np.argsort(losses)[::-1][:50]
+        # A small memory budget streams the scenarios in many chunks
+        result = portfolio_risk(
+            self.portfolio,
+            price_changes,
+            volatility_changes,
+            confidence=0.99,
+            horizon_days=0,
+            memory_budget=2**14,
+            bins=40,
+        )
+        self.assertAlmostEqual(result["var"], losses[tail].min(), places=8)
+        self.assertAlmostEqual(result["es"], losses[tail].mean(), places=8)
+        np.testing.assert_allclose(
+            result["contributions"],
+            -full["position_pnl"][tail].mean(axis=0),
+            rtol=1e-8,
+            atol=1e-10,
+        )
+        self.assertAlmostEqual(result["contributions"].sum(), result["es"], places=8)
+        counts, edges = result["histogram"]
+        self.assertEqual(counts.sum(), 5000)
+        self.assertAlmostEqual(edges[0], full["pnl"].min(), places=8)
+        self.assertGreaterEqual(result["es"], result["var"])
+
+    def test_longer_horizons_lose_more(self):
+        results = [
+            portfolio_risk(
+                self.portfolio,
+                *simulate_shocks(20000, horizon_days, seed=4),
+                horizon_days=horizon_days,
+                contributions=False,
+            )
+            for horizon_days in (1, 10)
+        ]
+        self.assertNotIn("contributions", results[0])
+        self.assertGreater(results[1]["var"], results[0]["var"])
+        with self.assertRaises(ValueError):
+            portfolio_risk(self.portfolio, [0.0], [0.0], confidence=1.0)
+
+    def test_extreme_shocks_are_priced(self):
+        chunks = list(
+            iter_revaluation(self.portfolio, [0.5, -0.5], [-1.0, 0.0], horizon=5.0)
+        )
+        self.assertTrue(np.isfinite(chunks[0][1]).all())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+import multiprocessing
+import os
+import tempfile
+import unittest
+import numpy as np
+from modules.cache import ResultCache
+from modules.shared_store import SharedResultStore, segment_name
+
+KEY = "a" * 64
+
+
+def map_result(index_path, queue):
+    store = SharedResultStore(index_path)
+    result = store.get(KEY)
+    queue.put(
+        (
+            float(result["paths"].sum()),
+            result["paths"].flags.writeable,
+            store.refcount(KEY),
+        )
+    )
+    store.close()
+
+
+# Maps the result and exits without closing the store, like a killed worker
+def map_result_and_exit(index_path, queue):
+    store = SharedResultStore(index_path)
+    store.get(KEY)
+    queue.put(store.refcount(KEY))
+    queue.close()
+    queue.join_thread()
+    os._exit(0)
+
+
+class TestSharedStore(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.index_path = os.path.join(directory.name, "shared.db")
+        self.store = SharedResultStore(self.index_path)
+        self.addCleanup(self.store.close)
+
+    def segment_exists(self, key):
+        return os.path.exists(os.path.join("/dev/shm", segment_name(key)))
+
+    def test_results_are_mapped_without_copies(self):
+        value = {
+            "paths": np.arange(12.0).reshape(3, 4),
+            "transposed": np.arange(12.0).reshape(3, 4).T,
+            "price": 1.5,
+            "histogram": (np.arange(3), np.ones(2, dtype=np.float32)),
+            "converged": None,
+        }
+        self.assertTrue(self.store.put(KEY, value))
+        self.assertFalse(self.store.put(KEY, value))
+        other = SharedResultStore(self.index_path)
+        # Results of the same process come back as the same mapping
+        result = self.store.get(KEY)
+        self.assertIs(result, self.store.get(KEY))
+        self.assertFalse(result["paths"].flags.owndata)
+        self.assertFalse(result["paths"].flags.writeable)
+        for name in ("paths", "transposed"):
+            np.testing.assert_array_equal(result[name], value[name])
+        self.assertEqual(result["histogram"][1].dtype, np.float32)
+        self.assertEqual(result["price"], 1.5)
+        self.assertIsNone(other.get("b" * 64))
+
+    def test_processes_share_results_and_references(self):
+        self.store.put(KEY, {"paths": np.ones((100, 10))})
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(target=map_result, args=(self.index_path, queue))
+        process.start()
+        total, writeable, refcount = queue.get(timeout=60)
+        process.join()
+        self.assertEqual(total, 1000.0)
+        self.assertFalse(writeable)
+        self.assertEqual(refcount, 2)
+        # The other process released its reference; this one still holds the result
+        self.assertEqual(self.store.refcount(KEY), 1)
+        self.assertTrue(self.segment_exists(KEY))
+        self.store.close()
+        self.assertEqual(self.store.refcount(KEY), 0)
+        self.assertNotIn(KEY, self.store)
+        self.assertFalse(self.segment_exists(KEY))
+
+    def test_close_collects_references_of_dead_processes(self):
+        self.store.put(KEY, {"paths": np.ones(10)})
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        process = context.Process(
+            target=map_result_and_exit, args=(self.index_path, queue)
+        )
+        process.start()
+        self.assertEqual(queue.get(timeout=60), 2)
+        process.join()
+        # The child's reference outlives it until a store collects it
+        self.assertEqual(self.store.refcount(KEY), 2)
+        self.store.close()
+        self.assertEqual(self.store.refcount(KEY), 0)
+        self.assertFalse(self.segment_exists(KEY))
+
+    def test_references_of_dead_processes_are_collected(self):
+        self.store.put(KEY, {"paths": np.ones(10)})
+        with self.store._db:
+            self.store._db.execute("UPDATE refs SET pid = ?", (2**22 + 1,))
+        other = SharedResultStore(self.index_path)
+        self.assertNotIn(KEY, other)
+        self.assertFalse(self.segment_exists(KEY))
+
+    def test_least_recently_used_results_are_unlinked(self):
+        store = SharedResultStore(self.index_path, max_bytes=20000)
+        self.addCleanup(store.close)
+        keys = [str(index) * 64 for index in range(3)]
+        for key in keys:
+            store.put(key, np.zeros(1000))
+        self.assertFalse(self.segment_exists(keys[0]))
+        self.assertTrue(self.segment_exists(keys[2]))
+        self.assertLessEqual(store.stats()["bytes"], 20000)
+        self.assertFalse(store.put("huge" * 16, np.zeros(10**4)))
+
+    def test_cache_tier(self):
+        cache = ResultCache(shared=self.store)
+        cache.put(KEY, {"paths": np.arange(5.0)})
+        other = ResultCache(shared=SharedResultStore(self.index_path))
+        self.assertIn(KEY, other)
+        np.testing.assert_array_equal(other.get(KEY)["paths"], np.arange(5.0))
+        self.assertEqual(other.stats()["shared_hits"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -72,6 +72,78 @@ class TestSimulations(unittest.TestCase):
                     std_final_price, expected_std, delta=expected_std * 0.1
                 )
 
+    def test_generate_scenarios_dtype_and_buffer(self):
+        price_paths = generate_scenarios(100, 0.05, 0.2, 1, 50, 1000, dtype=np.float32)
+        self.assertEqual(price_paths.dtype, np.float32)
+        self.assertEqual(price_paths.shape, (51, 1000))
+        self.assertTrue(price_paths.flags.c_contiguous)
+        self.assertTrue(np.all(price_paths[0] == 100))
+
+        buffer = np.empty((51, 1000))
+        result = generate_scenarios(100, 0.05, 0.2, 1, 50, 1000, out=buffer, seed=7)
+        self.assertIs(result, buffer)
+        np.testing.assert_array_equal(
+            result, generate_scenarios(100, 0.05, 0.2, 1, 50, 1000, seed=7)
+        )
+
+        with self.assertRaises(ValueError):
+            generate_scenarios(100, 0.05, 0.2, 1, 50, 1000, out=np.empty((50, 1000)))
+        with self.assertRaises(ValueError):
+            generate_scenarios(100, 0.05, 0.2, 1, 50, 1000, out=np.empty((1000, 51)).T)
+
+    def test_generate_scenarios_into_columns_of_a_wider_array(self):
+        for model in (None, "heston", "merton"):
+            for dtype, antithetic in ((np.float64, False), (np.float32, True)):
+                with self.subTest(model=model, dtype=dtype, antithetic=antithetic):
+                    paths = np.zeros((21, 3000), dtype=dtype)
+                    block = paths[:, 1000:2000]
+                    result = generate_scenarios(
+                        100,
+                        0.05,
+                        0.2,
+                        1,
+                        20,
+                        1000,
+                        dtype,
+                        block,
+                        3,
+                        antithetic,
+                        model=model,
+                    )
+                    self.assertIs(result, block)
+                    np.testing.assert_array_equal(
+                        block,
+                        generate_scenarios(
+                            100,
+                            0.05,
+                            0.2,
+                            1,
+                            20,
+                            1000,
+                            dtype,
+                            None,
+                            3,
+                            antithetic,
+                            model=model,
+                        ),
+                    )
+                    self.assertTrue(np.all(paths[:, :1000] == 0))
+                    self.assertTrue(np.all(paths[:, 2000:] == 0))
+
+    def test_generate_scenarios_variance_reduction(self):
+        price_paths = generate_scenarios(
+            100, 0.05, 0.2, 1, 10, 1000, seed=3, antithetic=True, moment_matching=True
+        )
+        log_returns = np.diff(np.log(price_paths), axis=0)
+        np.testing.assert_allclose(
+            log_returns[:, :500] + log_returns[:, 500:],
+            np.full((10, 500), 2 * (0.05 - 0.5 * 0.2**2) * 0.1),
+            atol=1e-12,
+        )
+        np.testing.assert_allclose(
+            np.std(log_returns, axis=1), np.full(10, 0.2 * np.sqrt(0.1)), rtol=1e-10
+        )
+
     def test_calculate_call_payoffs(self):
         for case in self.test_cases:
             with self.subTest(case=case):
@@ -0,0 +1,37 @@
+import unittest
+from benchmarks.import_times import (
+    DEFERRED_MODULES,
+    UI_MODULES,
+    WEB_MODULES,
+    check_startup,
+    import_times,
+)
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_import_times_are_recorded_per_module(self):
+        times, loaded = import_times("modules.calculations", repeat=1)
+        self.assertIn("modules.calculations", loaded)
+        self.assertIn("numpy", times)
+        self.assertGreaterEqual(times["modules.calculations"], times["numpy"])
+
+    def test_heavy_modules_are_not_imported_eagerly(self):
+        # Wall-clock budgets depend on the machine, so they are only checked by
+        # benchmarks/import_times.py; what each import pulls in is deterministic
+        for module in ("app", "modules.storage", "modules.qmc", "modules.pricing"):
+            with self.subTest(module=module):
+                _, loaded = import_times(module, repeat=1)
+                forbidden = DEFERRED_MODULES
+                if module not in UI_MODULES:
+                    forbidden += WEB_MODULES
+                self.assertEqual([name for name in forbidden if name in loaded], [])
+
+    def test_budget_overrun_fails(self):
+        records, failures = check_startup({"modules.cache": 1e-6}, repeat=1)
+        self.assertEqual(len(failures), 1)
+        self.assertIn("modules.cache", failures[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
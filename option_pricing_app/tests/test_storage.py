@@ -0,0 +1,91 @@
+import tempfile
+import unittest
+import numpy as np
+from modules.parallel import parallel_generate_scenarios
+from modules.pricing import price_from_terminal, simulate_terminal_prices
+from modules.simulations import calculate_call_payoffs
+from modules.storage import PathStore, iter_path_chunks
+
+
+class TestStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = PathStore(self.directory.name)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_stored_run_reopens_as_memmap(self):
+        key = self.store.write(100, 0.05, 0.2, 1, 12, 1000, seed=3, block_size=256)
+        paths = self.store.open_paths(key)
+        self.assertIsInstance(paths, np.memmap)
+        self.assertEqual(paths.shape, (13, 1000))
+        # Same block streams as the shared-memory generator
+        with parallel_generate_scenarios(
+            100, 0.05, 0.2, 1, 12, 1000, seed=3, num_workers=1, block_size=256
+        ) as shared:
+            np.testing.assert_array_equal(paths, shared.array)
+        np.testing.assert_array_equal(
+            calculate_call_payoffs(paths, 100), np.maximum(paths[-1] - 100, 0)
+        )
+        chunks = [chunk.shape[1] for _, chunk in iter_path_chunks(paths, 300)]
+        self.assertEqual(chunks, [300, 300, 300, 100])
+
+        metadata = self.store.metadata(key)
+        self.assertEqual(metadata["seed"], 3)
+        self.assertEqual(metadata["params"]["num_simulations"], 1000)
+        self.assertTrue(metadata["complete"])
+
+    def test_runs_are_found_by_parameters(self):
+        key = self.store.get_or_create(100, 0.05, 0.2, 1, 12, 500, seed=1)
+        self.assertEqual(self.store.find(100.0, 0.05, 0.2, 1.0, 12, 500, seed=1), key)
+        self.assertIsNone(self.store.find(100, 0.05, 0.2, 1, 12, 500, seed=2))
+        self.assertIsNone(self.store.find(100, 0.05, 0.2, 1, 12, 500))
+        created = self.store.metadata(key)["created"]
+        self.assertEqual(
+            self.store.get_or_create(100, 0.05, 0.2, 1, 12, 500, seed=1), key
+        )
+        self.assertEqual(self.store.metadata(key)["created"], created)
+        self.assertEqual([run["key"] for run in self.store.list_runs()], [key])
+
+        self.store.delete(key)
+        self.assertNotIn(key, self.store)
+        self.assertEqual(self.store.list_runs(), [])
+
+    def test_incomplete_runs_are_ignored(self):
+        key = self.store.write(100, 0.05, 0.2, 1, 12, 100, seed=5)
+        metadata = self.store.metadata(key)
+        metadata["complete"] = False
+        self.store._write_metadata(key, metadata)
+        self.assertIsNone(self.store.find(100, 0.05, 0.2, 1, 12, 100, seed=5))
+        with self.assertRaises(KeyError):
+            self.store.open_paths(key)
+
+    def test_stored_simulation_prices_like_streamed_one(self):
+        key = self.store.write(
+            100, 0.05, 0.2, 1, 12, 20000, seed=7, antithetic=True, moment_matching=True
+        )
+        simulation = self.store.simulation(key, fan_bins=50)
+        self.assertEqual(len(simulation["batch_sizes"]), 16)
+        self.assertEqual(simulation["price_paths"].shape, (13, 10))
+        self.assertEqual(simulation["path_fan"].counts.sum(), 13 * 20000)
+        stored = price_from_terminal(simulation, 100, 100, 0.05, 0.2, 1)
+        streamed = price_from_terminal(
+            simulate_terminal_prices(
+                100, 0.05, 0.2, 1, 12, 20000, seed=7, antithetic=True
+            ),
+            100,
+            100,
+            0.05,
+            0.2,
+            1,
+        )
+        self.assertLess(
+            abs(stored["call_price"] - streamed["call_price"]),
+            4 * (stored["call_std_error"] + streamed["call_std_error"]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()